@@ -0,0 +1,120 @@
+from qtpy.QtCore import Qt
+
+from napari_tiled_browser.models.tiled_listing import (
+    RUN_SUMMARY_COLUMNS,
+    ListingItem,
+)
+from napari_tiled_browser.qt.catalog_model import (
+    QTiledCatalogModel,
+    format_value,
+)
+
+
+class FakeNode:
+    def __init__(self, family="array"):
+        self.item = {"attributes": {"structure_family": family}}
+
+
+def make_block(offset, limit):
+    return [(f"key{i}", FakeNode()) for i in range(offset, offset + limit)]
+
+
+def test_catalog_model_requests_blocks_lazily(qtbot):
+    model = QTiledCatalogModel()
+    requests = []
+    model.block_requested.connect(
+        lambda offset, limit: requests.append((offset, limit))
+    )
+
+    model.reset_page(offset=1000, total=250, has_parent_row=True)
+    qtbot.waitUntil(lambda: requests == [(1000, 100)])
+    # ".." row plus the first block of entries
+    assert model.rowCount() == 101
+    assert model.canFetchMore()
+
+    model.set_block(1000, make_block(1000, 100))
+    assert model.key(0) is None
+    assert model.is_parent_row(0)
+    assert model.key(1) == "key1000"
+    assert model.headerData(1, 2) == "1001"
+
+    while model.canFetchMore():
+        model.fetchMore()
+    assert model.rowCount() == 251
+    # Rows of a block that was never loaded are requested when read
+    assert model.key(250) is None
+    qtbot.waitUntil(lambda: (1200, 50) in requests)
+
+
+def test_catalog_model_short_block_truncates_page(qtbot):
+    model = QTiledCatalogModel()
+    model.reset_page(offset=0, total=100)
+    model.set_block(0, make_block(0, 30))
+    assert model.rowCount() == 30
+    assert not model.canFetchMore()
+
+
+def test_catalog_model_appends_live_entries(qtbot):
+    model = QTiledCatalogModel()
+    model.reset_page(offset=0, total=3, has_parent_row=True)
+    model.set_block(0, make_block(0, 3))
+    assert model.append_entry(3, ("new", FakeNode()))
+    assert model.rowCount() == 5
+    assert model.key(4) == "new"
+    # Not at the end of the page
+    assert not model.append_entry(2, ("other", FakeNode()))
+    assert model.rowCount() == 5
+
+
+def test_catalog_model_shows_summary_columns(qtbot):
+    model = QTiledCatalogModel()
+    model.set_columns(RUN_SUMMARY_COLUMNS)
+    assert model.columnCount() == 5
+    assert model.headerData(0, Qt.Orientation.Horizontal) == "key"
+    assert model.headerData(1, Qt.Orientation.Horizontal) == "scan_id"
+
+    run = ListingItem(
+        {"id": "run", "attributes": {"structure_family": "container"}},
+        summary={"scan_id": 7, "detectors": ["det1", "det2"]},
+    )
+    model.reset_page(offset=0, total=1)
+    model.set_block(0, [("run", run)])
+    assert model.data(model.index(0, 1)) == "7"
+    assert model.data(model.index(0, 2)) == ""
+    assert model.data(model.index(0, 4)) == "det1, det2"
+
+
+def test_format_value():
+    assert format_value("scan_id", None) == ""
+    assert format_value("plan_name", "count") == "count"
+    assert format_value("time", 0) != "0"
+    assert format_value("exposure_time", "1 s") == "1 s"
+
+
+def test_catalog_model_limits_open_ended_page(qtbot):
+    model = QTiledCatalogModel()
+    model.reset_page(offset=0, total=2**62)
+    model.set_block(0, make_block(0, 100))
+    model.fetchMore()
+    assert model.rowCount() == 200
+    # The count arrives
+    model.limit_total(150)
+    assert model.rowCount() == 150
+    assert not model.canFetchMore()
+    model.limit_total(300)
+    assert model.rowCount() == 150
+
+
+def test_catalog_model_retries_failed_block(qtbot):
+    model = QTiledCatalogModel()
+    requests = []
+    model.block_requested.connect(
+        lambda offset, limit: requests.append((offset, limit))
+    )
+    model.reset_page(offset=0, total=50)
+    qtbot.waitUntil(lambda: requests == [(0, 50)])
+    # Already requested
+    assert model.key(0) is None
+    model.fail_block(0)
+    assert model.key(0) is None
+    qtbot.waitUntil(lambda: requests == [(0, 50), (0, 50)])
@@ -0,0 +1,19 @@
+from napari_tiled_browser.qt.metadata_tree import QTiledMetadataTree
+
+
+def test_metadata_tree_expands_lazily(qtbot):
+    tree = QTiledMetadataTree()
+    qtbot.addWidget(tree)
+    tree.set_metadata({"start": {"scan_id": 1, "detectors": ["det"]}, "n": 2})
+
+    assert tree.topLevelItemCount() == 2
+    start = tree.topLevelItem(0)
+    assert start.text(1) == "{...} 2 keys"
+    # Nothing below the top level is built until it is expanded
+    assert start.childCount() == 0
+
+    tree.expandItem(start)
+    assert start.childCount() == 2
+    assert start.child(0).text(0) == "scan_id"
+    assert start.child(0).text(1) == "1"
+    assert start.child(1).text(1) == "[...] 1 items"
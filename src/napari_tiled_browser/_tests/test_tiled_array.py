@@ -0,0 +1,132 @@
+import numpy
+import pytest
+
+from napari_tiled_browser.models.tiled_array import (
+    LazyTiledArray,
+    estimate_contrast_limits,
+    exact_contrast_limits,
+    multiscale_levels,
+)
+from napari_tiled_browser.models.tiled_disk_cache import ChunkDiskCache
+
+
+class FakeStructure:
+    def __init__(self, shape, chunks):
+        self.shape = shape
+        self.chunks = chunks
+
+
+class FakeArrayClient:
+    uri = "http://tiled/api/v1/metadata/array"
+
+    def __init__(self, array, chunks):
+        self.array = array
+        self.dtype = array.dtype
+        self._structure = FakeStructure(array.shape, chunks)
+        self.blocks_read = []
+
+    def structure(self):
+        return self._structure
+
+    # Same signatures as tiled's ArrayClient
+    def read_block(self, block, slice=None):  # noqa: A002
+        self.blocks_read.append(block)
+        index = tuple(
+            numpy.s_[sum(c[:b]) : sum(c[: b + 1])]
+            for b, c in zip(block, self._structure.chunks, strict=True)
+        )
+        return self.array[index][slice]
+
+    def read(self, slice=None):  # noqa: A002
+        return self.array[slice]
+
+
+@pytest.mark.parametrize(
+    "key",
+    [
+        3,
+        (3, slice(10, 40)),
+        (slice(1, 5), slice(None, None, 3), 7),
+        (..., 5),
+        (-1, -2, -3),
+        slice(4, 2),
+        slice(None, None, -1),
+    ],
+)
+def test_lazy_array_matches_numpy(key):
+    array = numpy.arange(6 * 50 * 40).reshape(6, 50, 40)
+    client = FakeArrayClient(array, ((2, 2, 2), (25, 25), (40,)))
+    lazy = LazyTiledArray(client)
+    numpy.testing.assert_array_equal(lazy[key], array[key])
+
+
+def test_lazy_array_reads_only_touched_blocks():
+    array = numpy.zeros((6, 50, 40))
+    client = FakeArrayClient(array, ((2, 2, 2), (25, 25), (40,)))
+    lazy = LazyTiledArray(client)
+    assert lazy.shape == (6, 50, 40)
+    lazy[3]
+    assert sorted(client.blocks_read) == [(1, 0, 0), (1, 1, 0)]
+    # Cached pieces are not fetched again
+    lazy[3]
+    assert len(client.blocks_read) == 2
+
+
+def test_contrast_limits(tmp_path):
+    array = numpy.arange(6 * 50 * 40, dtype=float).reshape(6, 50, 40)
+    client = FakeArrayClient(array, ((2, 2, 2), (25, 25), (40,)))
+    disk_cache = ChunkDiskCache(tmp_path)
+    lazy = LazyTiledArray(client, disk_cache=disk_cache)
+
+    low, high = estimate_contrast_limits(lazy, max_blocks=2, max_elements=100)
+    assert len(client.blocks_read) == 2
+    assert array.min() <= low <= high <= array.max()
+
+    sampled = len(disk_cache)
+    assert exact_contrast_limits(lazy) == (array.min(), array.max())
+    # A full pass leaves the disk cache alone
+    assert len(disk_cache) == sampled
+    assert exact_contrast_limits(lazy, is_cancelled=lambda: True) is None
+
+
+def test_multiscale_levels():
+    array = numpy.arange(2 * 100 * 60).reshape(2, 100, 60)
+    client = FakeArrayClient(array, ((1, 1), (100,), (60,)))
+    levels = multiscale_levels(LazyTiledArray(client), min_size=20)
+    assert [level.shape for level in levels] == [
+        (2, 100, 60),
+        (2, 50, 30),
+        (2, 25, 15),
+        (2, 13, 8),
+    ]
+    numpy.testing.assert_array_equal(levels[3][1], array[1, ::8, ::8])
+    numpy.testing.assert_array_equal(
+        levels[2][0, 3:9:2, -1], array[0, 12:36:8, -4]
+    )
+
+
+def test_read_queue_shares_immediate_reads(monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+    from threading import Event
+
+    from napari_tiled_browser.models import tiled_array
+    from napari_tiled_browser.models.tiled_cache import LRUCache
+
+    # Keep the only worker busy, so that reads stay queued
+    executor = ThreadPoolExecutor(max_workers=1)
+    release = Event()
+    executor.submit(release.wait)
+    monkeypatch.setattr(tiled_array, "_executor", executor)
+    monkeypatch.setattr(tiled_array, "_prefetch_executor", executor)
+    queue = tiled_array._ReadQueue(LRUCache(maxsize=4))
+
+    first = queue.submit("k", lambda: 1)
+    assert queue.submit("k", lambda: 2) is first
+    assert not first.cancelled()
+    # A queued prefetch is replaced by an immediate read
+    prefetch = queue.submit("p", lambda: 3, prefetch=True)
+    read = queue.submit("p", lambda: 4)
+    assert prefetch.cancelled() and read is not prefetch
+    release.set()
+    assert first.result() == 1 and read.result() == 4
+    executor.shutdown()
@@ -0,0 +1,39 @@
+from napari_tiled_browser.models.tiled_cache import LRUCache
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    # Touch "a" so that "b" becomes the eviction candidate
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert "a" in cache
+    assert "b" not in cache
+    assert "c" in cache
+    assert len(cache) == 2
+
+
+def test_lru_cache_ttl_expiry(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(
+        "napari_tiled_browser.models.tiled_cache.time.monotonic",
+        lambda: now[0],
+    )
+    cache = LRUCache(maxsize=4, ttl=10)
+    cache.put("a", 1)
+    now[0] += 5
+    assert cache.get("a") == 1
+    now[0] += 10
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_lru_cache_invalidate():
+    cache = LRUCache()
+    cache.put(("x", 0), 1)
+    cache.put(("x", 1), 2)
+    cache.put(("y", 0), 3)
+    assert cache.invalidate(lambda key: key[0] == "x") == 2
+    assert len(cache) == 1
+    assert cache.get(("y", 0)) == 3
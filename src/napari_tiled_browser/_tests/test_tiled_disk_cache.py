@@ -0,0 +1,31 @@
+import numpy
+
+from napari_tiled_browser.models.tiled_disk_cache import ChunkDiskCache
+
+
+def test_chunk_disk_cache_persists(tmp_path):
+    cache = ChunkDiskCache(tmp_path)
+    array = numpy.arange(12.0).reshape(3, 4)
+    cache.put(("uri", (0, 1), "v1"), array)
+
+    reopened = ChunkDiskCache(tmp_path)
+    assert len(reopened) == 1
+    numpy.testing.assert_array_equal(
+        reopened.get(("uri", (0, 1), "v1")), array
+    )
+    # Another data version is another entry
+    assert reopened.get(("uri", (0, 1), "v2")) is None
+
+
+def test_chunk_disk_cache_evicts_least_recently_used(tmp_path):
+    array = numpy.zeros(1000)
+    cache = ChunkDiskCache(tmp_path, max_bytes=int(2.5 * array.nbytes))
+    cache.put("a", array)
+    cache.put("b", array)
+    cache.get("a")
+    cache.put("c", array)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+    assert cache.total_bytes <= cache.max_bytes
+    assert len(list(tmp_path.iterdir())) == 2
@@ -0,0 +1,167 @@
+from types import SimpleNamespace
+from urllib.parse import urlencode
+
+import httpx
+import msgpack
+from tiled.client.utils import MSGPACK_MIME_TYPE, TiledResponse
+
+from napari_tiled_browser.models.tiled_listing import (
+    LISTING_FIELDS,
+    MAX_PAGE_SIZE,
+    RUN_SUMMARY_COLUMNS,
+    ListingItem,
+    fetch_listing,
+    select_metadata,
+)
+
+URL = "http://tiled/api/v1/search/raw"
+
+
+class FakeSearchServer:
+    """Stands in for context.http_client, serving a search endpoint.
+
+    Entries are paged by offset or by cursor, the key of the entry before
+    the page, like Tiled's links to the next page.
+    """
+
+    def __init__(self, count):
+        self.keys = [f"run{i:03}" for i in range(count)]
+        self.requests = []
+
+    @property
+    def http_client(self):
+        return self
+
+    def get(self, url, headers, params):
+        self.requests.append(params)
+        keys = self.keys
+        if params.get("sort") == ["-"]:
+            keys = keys[::-1]
+        if "page[cursor]" in params:
+            start = keys.index(params["page[cursor]"]) + 1
+        else:
+            start = int(params["page[offset]"])
+        page = keys[start : start + int(params["page[limit]"])]
+        data = [self.item(url, key, params) for key in page]
+        next_link = None
+        if start + len(page) < len(keys):
+            next_link = f"{url}?" + urlencode(
+                {"page[cursor]": page[-1], "page[limit]": len(page)}
+            )
+        content = {
+            "data": data,
+            "meta": {"count": len(keys)},
+            "links": {"next": next_link},
+        }
+        return TiledResponse(
+            200,
+            headers={"Content-Type": MSGPACK_MIME_TYPE},
+            content=msgpack.packb(content),
+            request=httpx.Request("GET", url),
+        )
+
+    @staticmethod
+    def item(url, key, params):
+        attributes = {"structure_family": "container", "specs": []}
+        if "fields" not in params:
+            attributes["metadata"] = {"sample": f"{key} of {url}"}
+        elif "select_metadata" in params:
+            # What the server's JMESPath selection gives
+            number = int(key[3:])
+            attributes["metadata"] = {
+                "selected": {"scan_id": number, "plan_name": "count"}
+            }
+        return {
+            "id": key,
+            "attributes": attributes,
+            "links": {"search": f"{url}/{key}"},
+        }
+
+
+class FakeContainer:
+    "Stands in for tiled's Container, as made for an item of a full listing"
+
+    def __init__(self, *, context, item, structure_clients, **kwargs):
+        self.context = context
+        self.item = item
+        self.structure_clients = structure_clients
+
+    @property
+    def structure_family(self):
+        return self.item["attributes"]["structure_family"]
+
+
+def node(server, **private):
+    return SimpleNamespace(
+        item={"links": {"search": URL}},
+        context=server,
+        structure_clients={"container": FakeContainer},
+        **private,
+    )
+
+
+def test_fetch_listing_slim_pages():
+    server = FakeSearchServer(400)
+    listing = fetch_listing(node(server), 0, 350)
+    assert listing.count == 400
+    assert [key for key, _ in listing.items] == server.keys[:350]
+    assert isinstance(listing.items[0][1], ListingItem)
+    assert listing.items[0][1].structure_family == "container"
+    # The second page follows the server's link from the first
+    first, second = server.requests
+    assert first["fields"] == list(LISTING_FIELDS)
+    assert (first["page[offset]"], first["page[limit]"]) == (0, MAX_PAGE_SIZE)
+    assert second["page[cursor]"] == "run299"
+    assert second["page[limit]"] == 50
+    # And the listing continues from the last entry returned
+    assert listing.cursor == "run349"
+
+    server.requests.clear()
+    listing = fetch_listing(node(server), 350, 100, cursor=listing.cursor)
+    assert [key for key, _ in listing.items] == server.keys[350:]
+    assert "page[offset]" not in server.requests[0]
+    assert listing.cursor is None
+
+
+def test_fetch_listing_selects_summary_columns():
+    server = FakeSearchServer(3)
+    columns = {"scan_id": "start.scan_id", "plan_name": "start.plan_name"}
+    listing = fetch_listing(node(server), 0, 3, columns=columns)
+    (params,) = server.requests
+    assert params["fields"] == [*LISTING_FIELDS, "metadata"]
+    assert params["select_metadata"] == (
+        '{"scan_id": "start"."scan_id", "plan_name": "start"."plan_name"}'
+    )
+    key, entry = listing.items[2]
+    assert entry.summary == {"scan_id": 2, "plan_name": "count"}
+    assert "metadata" not in entry.item["attributes"]
+
+
+def test_select_metadata_quotes_paths():
+    assert select_metadata(RUN_SUMMARY_COLUMNS).startswith(
+        '{"scan_id": "start"."scan_id", '
+    )
+    assert select_metadata({"a b": "x.y-z"}) == '{"a b": "x"."y-z"}'
+
+
+def test_fetch_listing_reverse():
+    server = FakeSearchServer(10)
+    listing = fetch_listing(node(server), 0, 3, reverse=True)
+    # The last entries, in the usual order
+    assert [key for key, _ in listing.items] == server.keys[7:]
+    assert server.requests[0]["sort"] == ["-"]
+
+    # Sorted nodes reverse their own sorting instead
+    server.requests.clear()
+    sorted_node = node(
+        server,
+        _queries_as_params={"filter[fulltext][condition][text]": ["scan"]},
+        _sorting_params={"sort": ["start.scan_id"]},
+        _reversed_sorting_params={"sort": ["-start.scan_id"]},
+        _include_data_sources=True,
+    )
+    fetch_listing(sorted_node, 0, 3, reverse=True)
+    (params,) = server.requests
+    assert params["sort"] == ["-start.scan_id"]
+    assert params["filter[fulltext][condition][text]"] == ["scan"]
+    assert params["include_data_sources"] is True
@@ -0,0 +1,163 @@
+from types import SimpleNamespace
+
+import httpx
+import numpy
+import pytest
+from tiled.client.stream import ArraySubscription
+
+from napari_tiled_browser.models.tiled_live import (
+    ArrayPatch,
+    LiveArrayBuffer,
+    read_patch,
+)
+from napari_tiled_browser.models.tiled_subscriber import (
+    LiveUpdateQueue,
+    QtArraySubscription,
+)
+
+
+def array_data(data, offset=None, block=None, sequence=None):
+    "Stand-in for tiled's LiveArrayData"
+    return SimpleNamespace(
+        type="array-data",
+        data=lambda: data,
+        offset=offset,
+        block=block,
+        sequence=sequence,
+    )
+
+
+def test_live_array_buffer_grows_geometrically():
+    live_array = LiveArrayBuffer()
+    expected = numpy.zeros((0, 3, 2))
+    capacities = set()
+    for i in range(10):
+        frame = numpy.full((1, 3, 2), i, dtype=float)
+        patch = read_patch(array_data(frame, offset=(i,)), live_array.shape)
+        region, resized = live_array.apply(patch)
+        assert resized
+        assert region == (slice(i, i + 1), slice(0, 3), slice(0, 2))
+        expected = numpy.concatenate([expected, frame])
+        numpy.testing.assert_array_equal(live_array.data, expected)
+        capacities.add(live_array.capacity)
+    # Reallocated at 1, 2, 4, 8 and 16 frames only
+    assert capacities == {1, 2, 4, 8, 16}
+
+    # A patch inside the array is written in place
+    view = live_array.data
+    region, resized = live_array.apply(
+        ArrayPatch((4, 1, 0), numpy.full((1, 1, 2), -1.0), (10, 3, 2))
+    )
+    assert not resized
+    assert live_array.data is view
+    assert view[4, 1].tolist() == [-1, -1]
+
+
+def test_read_patch_places_blocks():
+    block = numpy.ones((2, 4))
+    patch = read_patch(
+        array_data(block, block=(2, 1)), (4, 8), chunks=((2, 2), (4, 4))
+    )
+    # Past the known chunks, assuming regular chunking
+    assert patch.offset == (4, 4)
+    assert patch.shape == (6, 8)
+    # Without an offset or block, the whole array was written
+    patch = read_patch(array_data(block), (4, 8))
+    assert patch.offset == (0, 0)
+    assert patch.shape == (2, 4)
+
+
+def test_live_update_queue_coalesces(qtbot):
+    queue = LiveUpdateQueue(max_rate=1000)
+    updates = []
+    queue.updated.connect(lambda *args: updates.append(args))
+
+    for i in range(5):
+        frame = numpy.full((1, 2), i)
+        queue.put("det", ArrayPatch((i, 0), frame, (i + 1, 2)))
+    # Overwrites the last frame again
+    queue.put("det", ArrayPatch((4, 0), numpy.full((1, 2), 9), (5, 2)))
+    assert queue.depth == 5
+    qtbot.waitUntil(lambda: bool(updates))
+
+    ((live_array, path, region, resized),) = updates
+    assert path == "det"
+    assert region == (slice(0, 5), slice(0, 2))
+    assert resized
+    assert live_array.data[:, 0].tolist() == [0, 1, 2, 3, 9]
+    assert (queue.received, queue.merged, queue.dropped) == (6, 4, 1)
+    assert queue.depth == 0
+
+
+def test_array_subscription_reads_missed_rows():
+    server = numpy.arange(12.0).reshape(6, 2)
+    requests = []
+
+    def get(uri, headers, params):
+        requests.append((uri, params["slice"]))
+        rows = slice(*map(int, params["slice"].split(",")[0].split(":")))
+        return httpx.Response(
+            200,
+            content=server[rows].tobytes(),
+            request=httpx.Request("GET", uri),
+        )
+
+    context = SimpleNamespace(
+        api_uri=httpx.URL("http://localhost/api/v1/"),
+        http_client=SimpleNamespace(get=get),
+    )
+    sub = ArraySubscription(context, ["det"], executor=None)
+    # Resuming after update 3, with the 2 rows that it left
+    ts = QtArraySubscription(sub, start=4, shape=(2, 2))
+    patches = []
+    ts.new_data.connect(lambda path, patch: patches.append(patch))
+
+    # A replayed update is ignored
+    ts._emit_patch(array_data(server[1:2], offset=(1,), sequence=3))
+    assert patches == []
+    # Updates 4 and 5 were lost; only their rows are read
+    ts._emit_patch(array_data(server[5:6], offset=(5,), sequence=6))
+    assert requests == [("http://localhost/api/v1/array/full/det", "2:5,0:2")]
+    fill, patch = patches
+    assert fill.offset == (2, 0)
+    numpy.testing.assert_array_equal(fill.data, server[2:5])
+    assert patch.offset == (5, 0)
+    assert ts.sequence == 6
+
+
+def test_array_subscription_rereads_failed_update():
+    server = numpy.arange(12.0).reshape(6, 2)
+    requests = []
+
+    def get(uri, headers, params):
+        requests.append(params["slice"])
+        rows = slice(*map(int, params["slice"].split(",")[0].split(":")))
+        return httpx.Response(
+            200,
+            content=server[rows].tobytes(),
+            request=httpx.Request("GET", uri),
+        )
+
+    context = SimpleNamespace(
+        api_uri=httpx.URL("http://localhost/api/v1/"),
+        http_client=SimpleNamespace(get=get),
+    )
+    sub = ArraySubscription(context, ["det"], executor=None)
+    ts = QtArraySubscription(sub, start=4, shape=(2, 2))
+    patches = []
+    ts.new_data.connect(lambda path, patch: patches.append(patch))
+
+    def fail():
+        raise httpx.ConnectError("lost")
+
+    failed = array_data(None, offset=(2,), sequence=4)
+    failed.data = fail
+    with pytest.raises(httpx.ConnectError):
+        ts._emit_patch(failed)
+    assert ts.sequence == 3
+    # The next update reads the rows of the failed one
+    ts._emit_patch(array_data(server[3:4], offset=(3,), sequence=5))
+    assert requests == ["2:3,0:2"]
+    fill, patch = patches
+    numpy.testing.assert_array_equal(fill.data, server[2:3])
+    assert ts.sequence == 5
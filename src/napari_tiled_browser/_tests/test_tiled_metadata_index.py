@@ -0,0 +1,70 @@
+from napari_tiled_browser.models.tiled_listing import ListingItem
+from napari_tiled_browser.models.tiled_metadata_index import MetadataIndex
+
+SERVER = "http://localhost:8000/api/v1/"
+
+
+def item(key, metadata=None, family="container"):
+    attributes = {"structure_family": family, "specs": []}
+    if metadata is not None:
+        attributes["metadata"] = metadata
+    return {"id": key, "attributes": attributes}
+
+
+def keys(results):
+    return [key for key, _ in results]
+
+
+def test_metadata_index_searches(tmp_path):
+    index = MetadataIndex(tmp_path / "index.db")
+    index.add(
+        SERVER,
+        ("raw",),
+        [
+            ("a", item("a", {"start": {"plan_name": "count", "scan_id": 1}})),
+            ("b", item("b", {"start": {"plan_name": "grid scan"}})),
+            ("c", item("c", {"sample": "Silicon wafer"})),
+        ],
+    )
+    search = index.search
+    assert keys(search(SERVER, ("raw",), None, "scan", "full_text")) == ["b"]
+    assert keys(search(SERVER, ("raw",), None, "silicon", "full_text")) == [
+        "c"
+    ]
+    assert search(SERVER, ("raw",), None, "sil", "full_text") == []
+    assert keys(
+        search(SERVER, ("raw",), "start.plan_name", "count", "key_value")
+    ) == ["a"]
+    # Values entered are strings, as in Tiled
+    assert search(SERVER, ("raw",), "start.scan_id", "1", "key_value") == []
+    assert keys(
+        search(SERVER, ("raw",), "start.plan_name", "sc.n$", "regex")
+    ) == ["b"]
+    assert search(SERVER, ("raw",), "start.plan_name", "(", "regex") is None
+    # Only the children of the container searched
+    assert search(SERVER, (), None, "scan", "full_text") == []
+
+
+def test_metadata_index_keeps_complete_metadata(tmp_path):
+    index = MetadataIndex(tmp_path / "index.db", max_entries=2)
+    columns = {"plan_name": "start.plan_name"}
+    run = ListingItem(item("a"), summary={"plan_name": "count"})
+    index.add_listing(SERVER, ("raw",), [("a", run)], columns)
+    results = index.search(
+        SERVER, ("raw",), "start.plan_name", "count", "regex"
+    )
+    assert results[0][1]["attributes"]["metadata"] == {
+        "start": {"plan_name": "count"}
+    }
+
+    full = {"start": {"plan_name": "count", "detectors": ["det"]}}
+    index.add(SERVER, ("raw",), [("a", item("a", full))])
+    index.add_listing(SERVER, ("raw",), [("a", run)], columns)
+    assert keys(index.search(SERVER, ("raw",), None, "det", "full_text")) == [
+        "a"
+    ]
+
+    # The entries seen least recently are evicted
+    index.add(SERVER, ("raw",), [("b", item("b", {})), ("c", item("c", {}))])
+    assert len(index) == 2
+    assert index.search(SERVER, ("raw",), None, "det", "full_text") == []
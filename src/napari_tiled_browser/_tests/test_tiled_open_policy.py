@@ -0,0 +1,58 @@
+from napari_tiled_browser.models.tiled_open_policy import (
+    EAGER,
+    LAZY,
+    PREVIEW,
+    UNSUPPORTED,
+    OpenPolicy,
+    format_bytes,
+)
+
+
+def structure(*shape, itemsize=2):
+    return {
+        "shape": list(shape),
+        "chunks": [[n] for n in shape],
+        "data_type": {
+            "endianness": "little",
+            "kind": "u",
+            "itemsize": itemsize,
+        },
+    }
+
+
+def test_open_policy_plans_by_size():
+    policy = OpenPolicy(
+        eager_max_bytes=2**20, plane_max_bytes=2**24, assumed_rate=2**20
+    )
+    plan = policy.plan(structure(10, 100, 100))
+    assert plan.mode == EAGER
+    assert plan.nbytes == plan.first_bytes == 200_000
+
+    # 10 GB, read one 2 MB plane at a time
+    plan = policy.plan(structure(5000, 1000, 1000))
+    assert plan.mode == LAZY
+    assert plan.first_bytes == 2_000_000
+    assert plan.seconds == 2_000_000 / 2**20
+
+    # 200 GB in one plane; only a 49 x 489 level is read first
+    plan = policy.plan(structure(100_000, 1_000_000), rate=2**30)
+    assert plan.mode == PREVIEW
+    assert plan.nbytes == 2 * 10**11
+    assert plan.first_bytes == 49 * 489 * 2
+    assert plan.seconds < 0.01
+
+
+def test_open_policy_refuses_one_dimension():
+    policy = OpenPolicy(eager_max_bytes=2**20, plane_max_bytes=2**20)
+    # 8 GB, with no plane to read on its own
+    plan = policy.plan(structure(4 * 10**9))
+    assert plan.mode == UNSUPPORTED
+    assert plan.nbytes == 8 * 10**9
+    assert plan.first_bytes == 0
+    assert policy.plan(structure(10)).mode == UNSUPPORTED
+
+
+def test_format_bytes():
+    assert format_bytes(512) == "512 B"
+    assert format_bytes(3 * 2**29) == "1.5 GiB"
+    assert format_bytes(200 * 10**9) == "186.3 GiB"
@@ -0,0 +1,38 @@
+import concurrent.futures
+
+import numpy
+from napari.components import ViewerModel
+
+from napari_tiled_browser._tests.test_tiled_array import FakeArrayClient
+from napari_tiled_browser.models.tiled_array import LazyTiledArray
+from napari_tiled_browser.models.tiled_prefetch import SlicePrefetcher
+
+
+def test_slice_prefetcher_follows_slider():
+    array = numpy.random.default_rng(0).random((30, 8, 8))
+    client = FakeArrayClient(array, ((1,) * 30, (4, 4), (8,)))
+    data = LazyTiledArray(client)
+    viewer = ViewerModel()
+    layer = viewer.add_image(data, contrast_limits=(0, 1))
+    prefetcher = SlicePrefetcher(layer, viewer.dims, depth=3)
+
+    for z in (10, 11, 12):
+        viewer.dims.set_current_step(0, z)
+    assert all(plane[0] > 12 for plane in prefetcher._pending)
+    concurrent.futures.wait(
+        [f for futures in prefetcher._pending.values() for f in futures]
+    )
+    read = len(client.blocks_read)
+    assert (13, 0, 0) in client.blocks_read
+    viewer.dims.set_current_step(0, 13)
+    # Served from the blocks read ahead
+    assert (13, 0, 0) not in client.blocks_read[read:]
+    numpy.testing.assert_array_equal(layer._slice.image.raw, array[13])
+
+    # Turning around drops the planes ahead of the old direction
+    viewer.dims.set_current_step(0, 12)
+    assert all(plane[0] < 12 for plane in prefetcher._pending)
+
+    prefetcher.close()
+    viewer.dims.set_current_step(0, 20)
+    assert not prefetcher._pending
@@ -0,0 +1,69 @@
+import httpx
+import msgpack
+from tiled.client.utils import MSGPACK_MIME_TYPE, TiledResponse
+
+from napari_tiled_browser.models.tiled_response_cache import (
+    CACHED,
+    FETCHED,
+    MISSING,
+    NOT_MODIFIED,
+    ResponseDiskCache,
+    get_json,
+)
+
+
+class FakeServer:
+    """Stands in for context.http_client, honoring If-None-Match."""
+
+    def __init__(self, content):
+        self.content = content
+        self.requests = []
+
+    @property
+    def http_client(self):
+        return self
+
+    def get(self, url, headers, params):
+        self.requests.append(headers)
+        etag = str(hash(repr(self.content)))
+        if headers.get("If-None-Match") == etag:
+            status, body = 304, b""
+        else:
+            status, body = 200, msgpack.packb(self.content)
+        return TiledResponse(
+            status,
+            headers={"ETag": etag, "Content-Type": MSGPACK_MIME_TYPE},
+            content=body,
+            request=httpx.Request("GET", url),
+        )
+
+
+def test_response_cache_revalidates(tmp_path):
+    server = FakeServer({"data": [1, 2]})
+    url = "http://tiled/api/v1/search/a"
+
+    cache = ResponseDiskCache(tmp_path / "cache.db")
+    assert get_json(server, url, {}, cache, offline=True) == (None, MISSING)
+    assert get_json(server, url, {}, cache) == ({"data": [1, 2]}, FETCHED)
+
+    # A new session sees the response without asking the server
+    cache = ResponseDiskCache(tmp_path / "cache.db")
+    assert get_json(server, url, {}, cache, offline=True)[1] == CACHED
+    assert len(server.requests) == 1
+    assert get_json(server, url, {}, cache)[1] == NOT_MODIFIED
+
+    server.content = {"data": [1, 2, 3]}
+    assert get_json(server, url, {}, cache) == ({"data": [1, 2, 3]}, FETCHED)
+    # Other parameters are another request
+    assert get_json(server, url, {"fields": ["specs"]}, cache)[1] == FETCHED
+
+
+def test_response_cache_evicts_least_recently_used(tmp_path):
+    cache = ResponseDiskCache(tmp_path / "cache.db", max_entries=2)
+    cache.put("a", "1", b"a")
+    cache.put("b", "2", b"b")
+    cache.get("a")
+    cache.put("c", "3", b"c")
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("a").content == b"a"
@@ -0,0 +1,51 @@
+from napari_tiled_browser.models.tiled_selector import TiledSelector
+from napari_tiled_browser.qt.tiled_search import QTiledSearchWidget
+
+
+class FakeThreadPool:
+    "Collects runnables instead of running them"
+
+    def __init__(self):
+        self.runnables = []
+
+    def start(self, runnable):
+        self.runnables.append(runnable)
+
+    def tryTake(self, runnable):
+        return True
+
+
+def test_search_widget_applies_latest_search_only(qtbot):
+    model = TiledSelector(url="http://localhost:8000")
+    widget = QTiledSearchWidget(model)
+    qtbot.addWidget(widget)
+    widget.thread_pool = FakeThreadPool()
+
+    widget.key_entry.setText("plan_name")
+    widget.value_entry.setText("count")
+    widget.debounced_search()
+    widget.value_entry.setText("scan")
+    widget.debounced_search()
+    first, second = widget.thread_pool.runnables
+    assert first.is_cancelled
+    assert second.generation > first.generation
+
+    # The results of the first search arrive late, after the second's
+    second.signals.results.emit(second.generation, (), "scans", 2, 0.1)
+    first.signals.results.emit(first.generation, (), "counts", 5, 0.1)
+    assert model.search_results == "scans"
+    assert model.search_query == ("key_value", "plan_name", "scan")
+    assert model.node_len_hint == 2
+
+
+def test_search_widget_debounce_follows_latency(qtbot):
+    widget = QTiledSearchWidget(TiledSelector(url="http://localhost:8000"))
+    qtbot.addWidget(widget)
+    intervals = []
+    for elapsed in [0.001] * 5 + [10.0] * 20 + [0.3] * 40:
+        widget._update_debounce_interval(elapsed)
+        intervals.append(widget.debounce.interval())
+    assert min(intervals) == widget.MIN_DEBOUNCE_MS == 200
+    assert max(intervals) == widget.MAX_DEBOUNCE_MS == 1500
+    # Settles at twice the round trip
+    assert intervals[-1] == 600
@@ -0,0 +1,67 @@
+from types import SimpleNamespace
+
+from tiled.structures.core import Spec
+
+from napari_tiled_browser.models.tiled_selector import TiledSelector
+
+
+def node(family="container"):
+    return SimpleNamespace(
+        item={
+            "attributes": {
+                "structure_family": family,
+                "specs": [],
+                "metadata": {},
+            }
+        },
+        context=object(),
+    )
+
+
+def test_live_child_created_patches_cached_listing():
+    selector = TiledSelector(url="http://localhost:8000")
+    listing = selector.listing_key()
+    items = [("a", node()), ("b", node())]
+    selector.len_cache.put(listing, 2)
+    selector.page_cache.put(listing + (0, 5), items)
+    selector.page_cache.put(listing + (0, 2), list(items))
+    search = (*listing[:2], "query")
+    selector.len_cache.put(search, 1)
+    by_name = (*listing[:2], (None, ("name", 1)))
+    selector.page_cache.put(by_name + (0, 5), list(items))
+    search_key = selector.search_key(None, "scan", "full_text")
+    selector.search_cache.put(search_key, ("results", 1))
+
+    new = node()
+    assert selector.on_child_created((), "c", new) == 2
+    assert selector.len_cache.get(listing) == 3
+    assert [key for key, _ in selector.page_cache.get(listing + (0, 5))] == [
+        "a",
+        "b",
+        "c",
+    ]
+    # Only blocks as a request would return them
+    assert len(selector.page_cache.get(listing + (0, 2))) == 2
+    assert listing + (0, 3) not in selector.page_cache
+    assert listing + (2, 1) not in selector.page_cache
+    assert selector.node_cache.get(("c",)) is new
+    # Sorted, it may go anywhere
+    assert by_name + (0, 5) not in selector.page_cache
+    # Replayed
+    assert selector.on_child_created((), "c", new) is None
+    assert selector.len_cache.get(listing) == 3
+    # Search results may or may not include it
+    assert search not in selector.len_cache
+    assert search_key not in selector.search_cache
+
+    selector.on_child_metadata_updated(
+        (), "c", {"plan_name": "count"}, [Spec("BlueskyRun")]
+    )
+    attrs = new.item["attributes"]
+    assert attrs["metadata"] == {"plan_name": "count"}
+    assert attrs["specs"] == [{"name": "BlueskyRun", "version": None}]
+
+    # Without the new child, the listing is fetched again
+    assert selector.on_child_created(()) is None
+    assert listing not in selector.len_cache
+    assert listing + (0, 5) not in selector.page_cache
@@ -0,0 +1,113 @@
+import threading
+import time
+from datetime import datetime
+from types import SimpleNamespace
+from urllib.parse import parse_qs, urlparse
+
+import httpx
+import msgpack
+from tiled.client.stream import ContainerSubscription
+from websockets.sync.server import serve
+
+from napari_tiled_browser.models.tiled_stream import (
+    CLOSED,
+    StreamLoop,
+)
+
+
+class InlineExecutor:
+    def submit(self, f, *args):
+        f(*args)
+
+
+def metadata_updated(sequence):
+    return msgpack.packb(
+        {
+            "type": "container-child-metadata-updated",
+            "sequence": sequence,
+            "timestamp": datetime.now().isoformat(),
+            "key": "x",
+            "specs": [],
+            "metadata": {},
+        }
+    )
+
+
+def test_stream_loop_resumes_after_lost_connection():
+    starts = []
+
+    def handler(websocket):
+        start = int(
+            parse_qs(urlparse(websocket.request.path).query)["start"][0]
+        )
+        starts.append(start)
+        websocket.send(
+            msgpack.packb({"type": "container-schema", "version": 1})
+        )
+        if start == 1:
+            websocket.send(metadata_updated(1))
+            websocket.send(metadata_updated(2))
+            websocket.close(1011)  # lost
+        else:
+            websocket.send(metadata_updated(start))
+            websocket.close()  # end of stream
+
+    with serve(handler, "127.0.0.1", 0) as server:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        port = server.socket.getsockname()[1]
+        context = SimpleNamespace(
+            api_uri=httpx.URL(f"http://127.0.0.1:{port}/api/v1/"),
+            http_client=SimpleNamespace(),
+            server_info=SimpleNamespace(
+                authentication=SimpleNamespace(providers=[])
+            ),
+            api_key=None,
+        )
+        sub = ContainerSubscription(context, ["run"], InlineExecutor())
+        received = []
+        callback = received.append
+        sub.child_metadata_updated.add_callback(callback)
+
+        health = []
+        loop = StreamLoop(
+            backoff=0.01, on_health=lambda *args: health.append(args)
+        )
+        loop.add(sub, start=1)
+        deadline = time.monotonic() + 10
+        while loop.health().get("run") is None or (
+            loop.health()["run"].state != CLOSED
+        ):
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        loop.stop()
+        server.shutdown()
+
+    assert [update.sequence for update in received] == [1, 2, 3]
+    assert starts == [1, 3]
+    final = loop.health()["run"]
+    assert (final.received, final.last_sequence, final.reconnects) == (3, 3, 1)
+    assert [h.state for _, h in health] == [
+        "connecting",
+        "live",
+        "reconnecting",
+        "connecting",
+        "live",
+        "closed",
+    ]
+    assert not loop.running
+
+
+def test_stream_loop_stops_when_closing_times_out():
+    loop = StreamLoop()
+    loop.start()
+    thread = loop._thread
+
+    async def slow_to_close():
+        # Holds up the loop's thread past the timeout
+        time.sleep(0.5)
+
+    loop._cancel_all = slow_to_close
+    loop.stop(timeout=0.1)
+    thread.join(5)
+    assert not thread.is_alive()
+    assert not loop.running
@@ -0,0 +1,107 @@
+from types import SimpleNamespace
+
+import httpx
+from tiled.client.stream import ContainerSubscription
+
+from napari_tiled_browser.models.tiled_subscriber import SubscriptionManager
+from napari_tiled_browser.models.tiled_subscription_policy import (
+    SubscriptionPolicy,
+)
+
+
+def test_policy_admits():
+    policy = SubscriptionPolicy(max_depth=2, specs=["BlueskyRun"])
+    assert policy.admits(("run",), "container", ["BlueskyRun"])
+    assert not policy.admits(("run",), "container", [])
+    # Specs only filter containers
+    assert policy.admits(("run", "image"), "array")
+    assert not policy.admits(("run", "primary", "image"), "array")
+    assert not policy.admits(("run", "table"), "table")
+
+    policy = SubscriptionPolicy(paths=["*/primary/*"])
+    assert policy.admits(("run",), "container")
+    assert policy.admits(("run", "primary"), "container")
+    assert policy.admits(("run", "primary", "image"), "array")
+    assert not policy.admits(("run", "baseline"), "container")
+    # An array cannot lead further down
+    assert not policy.admits(("image",), "array")
+
+
+class FakeStreamLoop:
+    def __init__(self):
+        self.following = set()
+
+    def add(self, sub, start=None):
+        self.following.add(tuple(sub.segments))
+
+    def remove(self, sub):
+        self.following.discard(tuple(sub.segments))
+
+
+CONTEXT = SimpleNamespace(
+    api_uri=httpx.URL("http://localhost/api/v1/"),
+    http_client=SimpleNamespace(),
+)
+
+
+def node(*path_parts, structure_family="container"):
+    def subscribe(executor):
+        return ContainerSubscription(CONTEXT, list(path_parts), executor)
+
+    return SimpleNamespace(
+        path_parts=list(path_parts),
+        structure_family=structure_family,
+        specs=[],
+        subscribe=subscribe,
+    )
+
+
+def new_child(manager, parent, key):
+    manager.on_new_child(
+        SimpleNamespace(
+            subscription=manager.active_subs[parent].sub,
+            key=key,
+            child=lambda: node(*parent, key),
+        )
+    )
+
+
+def test_manager_follows_newest_children(qtbot):
+    policy = SubscriptionPolicy(
+        paths=["*/primary"], max_children=1, max_subscriptions=4
+    )
+    manager = SubscriptionManager(policy=policy)
+    manager.stream_loop = loop = FakeStreamLoop()
+    manager.on_create_subscription(node("raw"))
+
+    new_child(manager, ("raw",), "run1")
+    new_child(manager, ("raw", "run1"), "primary")
+    new_child(manager, ("raw", "run1"), "baseline")
+    assert loop.following == {
+        ("raw",),
+        ("raw", "run1"),
+        ("raw", "run1", "primary"),
+    }
+    # A newer run replaces the older one and its descendants
+    new_child(manager, ("raw",), "run2")
+    new_child(manager, ("raw", "run2"), "primary")
+    assert loop.following == {
+        ("raw",),
+        ("raw", "run2"),
+        ("raw", "run2", "primary"),
+    }
+
+
+def test_manager_evicts_least_recently_updated(qtbot):
+    manager = SubscriptionManager(
+        policy=SubscriptionPolicy(max_subscriptions=3)
+    )
+    manager.stream_loop = loop = FakeStreamLoop()
+    manager.on_create_subscription(node("raw"))
+    new_child(manager, ("raw",), "a")
+    new_child(manager, ("raw",), "b")
+    # "a" was updated more recently than "b"
+    new_child(manager, ("raw", "a"), "x")
+    assert loop.following == {("raw",), ("raw", "a"), ("raw", "a", "x")}
+    # The root is never evicted
+    assert ("raw",) in manager.roots
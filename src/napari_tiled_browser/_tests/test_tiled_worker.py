@@ -0,0 +1,264 @@
+import sqlite3
+from types import SimpleNamespace
+
+import httpx
+import numpy
+
+from napari_tiled_browser._tests.test_tiled_listing import (
+    URL,
+    FakeSearchServer,
+    node,
+)
+from napari_tiled_browser.models.tiled_cache import LRUCache
+from napari_tiled_browser.models.tiled_listing import Listing
+from napari_tiled_browser.models.tiled_metadata_index import MetadataIndex
+from napari_tiled_browser.models.tiled_worker import (
+    TiledArrayWorker,
+    TiledConnectWorker,
+    TiledContrastWorker,
+    TiledIndexWorker,
+    TiledInfoWorker,
+    TiledLengthWorker,
+    TiledMultiscaleWorker,
+    TiledSearchWorker,
+    TiledWorker,
+)
+
+
+def make_client_from_url(failures):
+    calls = []
+
+    def client_from_url(url, connect_timeout=None):
+        calls.append(url)
+        if len(calls) <= failures:
+            raise httpx.ConnectError("Connection refused")
+        return "client"
+
+    return client_from_url, calls
+
+
+def test_connect_worker_retries_then_connects():
+    client_from_url, calls = make_client_from_url(failures=2)
+    worker = TiledConnectWorker(
+        url="http://tiled",
+        client_from_url=client_from_url,
+        retries=2,
+        backoff=0,
+        generation=7,
+    )
+    connected, failed = [], []
+    worker.signals.connected.connect(lambda *args: connected.append(args))
+    worker.signals.failed.connect(lambda *args: failed.append(args))
+    worker.run()
+    assert len(calls) == 3
+    assert connected == [(7, "client")]
+    assert not failed
+
+
+def test_connect_worker_gives_up():
+    client_from_url, calls = make_client_from_url(failures=5)
+    worker = TiledConnectWorker(
+        url="http://tiled", client_from_url=client_from_url, backoff=0
+    )
+    failed = []
+    worker.signals.failed.connect(lambda *args: failed.append(args))
+    worker.run()
+    assert len(calls) == 2
+    assert failed == [(0, "Connection refused")]
+
+
+class Unreachable:
+    def __len__(self):
+        raise httpx.ConnectError("Connection refused")
+
+
+def test_length_worker_reports_failure():
+    cache = LRUCache()
+    worker = TiledLengthWorker(node=Unreachable(), cache=cache, cache_key="k")
+    results, failed = [], []
+    worker.signals.results.connect(lambda *args: results.append(args))
+    worker.signals.failed.connect(lambda *args: failed.append(args))
+    worker.run()
+    assert not results
+    assert failed == [("k", "Connection refused")]
+    assert "k" not in cache
+
+
+def test_info_worker_reports_failure():
+    def get_node_info(node_path_parts, revalidate=False):
+        raise httpx.ConnectError("Connection refused")
+
+    worker = TiledInfoWorker(
+        get_node_info=get_node_info, node_path_parts=("a",), revalidate=True
+    )
+    results, failed = [], []
+    worker.signals.results.connect(lambda *args: results.append(args))
+    worker.signals.failed.connect(lambda *args: failed.append(args))
+    worker.run()
+    assert not results
+    assert failed == [(("a",), "Connection refused")]
+
+
+def test_search_worker_reports_failure():
+    class Node:
+        def search(self, query):
+            raise httpx.ReadTimeout("timed out")
+
+    worker = TiledSearchWorker(
+        node=Node(), node_path_parts=(), query=None, generation=3
+    )
+    failed = []
+    worker.signals.failed.connect(lambda *args: failed.append(args))
+    worker.run()
+    assert failed == [(3, "timed out")]
+
+
+def level(family, shape=None):
+    return SimpleNamespace(
+        item={"attributes": {"structure_family": family}}, shape=shape
+    )
+
+
+def test_multiscale_worker_lists_array_levels():
+    levels = {
+        "1": level("array", (50, 50)),
+        "0": level("array", (100, 100)),
+        "metadata": level("table"),
+    }
+    node = SimpleNamespace(items=levels.items)
+    worker = TiledMultiscaleWorker(node=node)
+    results = []
+    worker.signals.results.connect(results.append)
+    worker.run()
+    assert results == [[levels["0"], levels["1"]]]
+
+    worker = TiledMultiscaleWorker(node=SimpleNamespace(items={}.items))
+    failed = []
+    worker.signals.failed.connect(failed.append)
+    worker.run()
+    assert failed == ["No array levels"]
+
+
+def test_array_worker_reads_whole_array():
+    reads = []
+
+    class Node:
+        def read(self):
+            reads.append(None)
+            if len(reads) > 1:
+                raise httpx.ReadTimeout("timed out")
+            return numpy.ones((4, 4))
+
+    results, failed = [], []
+    for _ in range(2):
+        worker = TiledArrayWorker(node=Node())
+        worker.signals.results.connect(results.append)
+        worker.signals.failed.connect(failed.append)
+        worker.run()
+    assert len(reads) == 2
+    numpy.testing.assert_array_equal(results[0], numpy.ones((4, 4)))
+    assert failed == ["timed out"]
+
+
+def test_contrast_worker_reports_failure(monkeypatch):
+    def unreachable(data):
+        raise httpx.ConnectError("Connection refused")
+
+    monkeypatch.setattr(
+        "napari_tiled_browser.models.tiled_worker.estimate_contrast_limits",
+        unreachable,
+    )
+    worker = TiledContrastWorker(data=None)
+    results, failed = [], []
+    worker.signals.results.connect(lambda *args: results.append(args))
+    worker.signals.failed.connect(failed.append)
+    worker.run()
+    assert not results
+    assert failed == ["Connection refused"]
+
+
+def test_index_worker_crawls_subtree(tmp_path):
+    server = FakeSearchServer(3)
+    index = MetadataIndex(tmp_path / "index.db")
+    worker = TiledIndexWorker(
+        get_node=lambda path: node(server),
+        node_path_parts=("raw",),
+        index=index,
+        server=URL,
+        page_size=2,
+    )
+    finished = []
+    worker.signals.finished.connect(lambda *args: finished.append(args))
+    worker.run()
+    # Three runs, and the three children of each, two per page
+    assert finished == [(("raw",), 12)]
+    assert len(server.requests) == 8
+    results = index.search(URL, ("raw", "run001"), None, "run002", "full_text")
+    assert [key for key, _ in results] == ["run002"]
+
+
+def test_index_worker_finishes_on_errors(tmp_path):
+    def deleted(path):
+        raise KeyError(path)
+
+    class BrokenIndex:
+        def add_listing(self, *args):
+            raise sqlite3.OperationalError("disk I/O error")
+
+    for get_node, index in [
+        (deleted, MetadataIndex(tmp_path / "index.db")),
+        (lambda path: node(FakeSearchServer(3)), BrokenIndex()),
+    ]:
+        worker = TiledIndexWorker(
+            get_node=get_node,
+            node_path_parts=("raw",),
+            index=index,
+            server=URL,
+        )
+        finished = []
+        worker.signals.finished.connect(
+            lambda *args, finished=finished: finished.append(args)
+        )
+        worker.run()
+        assert finished == [(("raw",), 0)]
+
+
+def test_worker_pages_with_cursors():
+    listing = ("server", (), None)
+    len_cache, cursors = LRUCache(), LRUCache()
+    len_cache.put(listing, 950)
+
+    def worker(offset, limit):
+        return TiledWorker(
+            client=None,
+            offset=offset,
+            limit=limit,
+            node_path_parts=(),
+            search_results=None,
+            display_search_results=False,
+            len_cache=len_cache,
+            len_key=listing,
+            cursors=cursors,
+        )
+
+    # The next page continues from the cursor of the previous one
+    first = worker(0, 100)
+    assert first.plan() == 100
+    first.store(Listing([("k", None)] * 100, 950, True, "c100"))
+    second = worker(100, 100)
+    assert second.plan() == 100
+    assert (second.cursor, second.reverse) == ("c100", False)
+
+    # The last page is the first one in reverse order
+    last = worker(900, 100)
+    assert last.plan() == 50
+    assert (last.cursor, last.reverse) == (None, True)
+    last.store(Listing([("k", None)] * 50, 950, True, "c899"))
+    before = worker(800, 100)
+    before.plan()
+    assert (before.cursor, before.reverse) == ("c899", True)
+
+    # No cursor leads here
+    middle = worker(400, 100)
+    middle.plan()
+    assert (middle.cursor, middle.reverse) == (None, False)
@@ -0,0 +1,541 @@
+"""Lazy, chunk-aware access to Tiled arrays for napari layers.
+
+Handing an ArrayClient straight to napari risks reading the whole array,
+e.g. when napari calls numpy.asarray() on it. LazyTiledArray only fetches
+the parts of the server-side chunks (blocks) that an index touches, so
+showing one plane of a large stack costs one plane of data.
+"""
+
+import hashlib
+import itertools
+import json
+import logging
+import math
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+
+import numpy
+from tiled.client.array import DaskArrayClient
+
+from napari_tiled_browser.models.tiled_cache import LRUCache
+from napari_tiled_browser.models.tiled_disk_cache import ChunkDiskCache
+
+_logger = logging.getLogger(__name__)
+
+# Shared by all arrays, so that opening many layers cannot flood the server
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="tiled-array")
+# Speculative reads get their own threads, so they never hold up a read
+# that napari is waiting for
+_prefetch_executor = ThreadPoolExecutor(
+    max_workers=4, thread_name_prefix="tiled-prefetch"
+)
+
+
+class TransferRate:
+    """Moving average of the throughput of array reads, in bytes/s."""
+
+    # Weight of the newest read
+    SMOOTHING = 0.3
+    # Smaller reads say more about latency than throughput
+    MIN_BYTES = 2**16
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.bytes_per_second = None
+
+    def record(self, nbytes: int, seconds: float) -> None:
+        if nbytes < self.MIN_BYTES or seconds <= 0:
+            return
+        rate = nbytes / seconds
+        with self._lock:
+            if self.bytes_per_second is None:
+                self.bytes_per_second = rate
+            else:
+                self.bytes_per_second += self.SMOOTHING * (
+                    rate - self.bytes_per_second
+                )
+
+
+# Throughput of the reads of every array, to estimate how long the next
+# one will take before it is opened
+transfer_rate = TransferRate()
+
+
+class _ReadQueue:
+    """Reads in flight, each stored in cache when it completes.
+
+    A read that is requested again while in flight is shared. A queued
+    prefetch is replaced by an immediate read when napari asks for it.
+    """
+
+    def __init__(self, cache: LRUCache):
+        self.cache = cache
+        # Re-entrant, as a future that is already done runs its callbacks
+        # in add_done_callback
+        self._lock = threading.RLock()
+        # Key -> (future, whether it was submitted as a prefetch)
+        self._pending = {}
+
+    def submit(self, key, read, prefetch=False) -> Future:
+        with self._lock:
+            pending = self._pending.get(key)
+            if pending is not None:
+                future, was_prefetch = pending
+                # Someone may be waiting on an immediate read; only a
+                # prefetch that has not started can be replaced
+                if prefetch or not was_prefetch or not future.cancel():
+                    return future
+            executor = _prefetch_executor if prefetch else _executor
+            future = executor.submit(self._run, key, read)
+            self._pending[key] = (future, prefetch)
+            future.add_done_callback(partial(self._forget, key))
+        return future
+
+    def _run(self, key, read):
+        value = read()
+        self.cache.put(key, value)
+        return value
+
+    def _forget(self, key, future):
+        with self._lock:
+            pending = self._pending.get(key)
+            if pending is not None and pending[0] is future:
+                del self._pending[key]
+
+
+class LazyTiledArray:
+    """Array-like view of a Tiled array that reads data on indexing.
+
+    Every index is split along the array's chunk boundaries and the
+    overlapping part of each block is fetched with one request (several
+    in parallel). Fetched pieces are kept in an LRU cache, so revisiting
+    a plane does not hit the server again.
+    """
+
+    def __init__(
+        self,
+        client: DaskArrayClient,
+        cache_size: int = 64,
+        disk_cache: ChunkDiskCache | None = None,
+    ):
+        self.client = client
+        # Blocks fetched from the server are also kept here, across sessions
+        self.disk_cache = disk_cache
+        self.version = data_version(client)
+        structure = client.structure()
+        self.shape = tuple(structure.shape)
+        self.dtype = numpy.dtype(client.dtype)
+        self.chunks = tuple(tuple(c) for c in structure.chunks)
+        # (block index, local index) -> numpy array
+        self.cache = LRUCache(maxsize=cache_size)
+        self._reads = _ReadQueue(self.cache)
+        self._bounds = tuple(
+            tuple(itertools.accumulate(c, initial=0)) for c in self.chunks
+        )
+
+    def __repr__(self):
+        return (
+            f"<{type(self).__name__} shape={self.shape} dtype={self.dtype} "
+            f"{self.client.uri!r}>"
+        )
+
+    @property
+    def ndim(self) -> int:
+        return len(self.shape)
+
+    @property
+    def size(self) -> int:
+        return math.prod(self.shape)
+
+    @property
+    def nbytes(self) -> int:
+        return self.size * self.dtype.itemsize
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __array__(self, dtype=None, copy=None):
+        array = self[...]
+        return array if dtype is None else array.astype(dtype, copy=False)
+
+    def __getitem__(self, key):
+        normalized = _normalize_key(key, self.shape)
+        if normalized is None:
+            # Fancy or reversed indexing; let tiled work it out
+            _logger.debug("Reading %s without chunk splitting", self)
+            return numpy.asarray(self.client.read(slice=key))
+        key = normalized
+
+        out_shape = tuple(
+            len(range(*index.indices(length)))
+            for index, length in zip(key, self.shape, strict=True)
+            if isinstance(index, slice)
+        )
+        out = numpy.empty(out_shape, dtype=self.dtype)
+        if 0 in out_shape:
+            return out
+
+        pieces = list(self._pieces(key))
+        futures = {}
+        for cache_key, args, _, piece in pieces:
+            if piece is None and cache_key not in futures:
+                futures[cache_key] = self._reads.submit(
+                    cache_key, partial(self._read_block, *args)
+                )
+        if futures:
+            _logger.debug("Fetching %d block(s) of %s", len(futures), self)
+
+        for cache_key, _, target, piece in pieces:
+            if piece is None:
+                piece = futures[cache_key].result()
+            out[target] = piece
+        if out.ndim == 0:
+            return out[()]
+        return out
+
+    def prefetch(self, key) -> list[Future]:
+        """Start reading the blocks of key that are not cached yet.
+
+        The reads run in the background and fill the in-memory cache.
+        Cancelling the returned futures drops reads that have not started.
+        """
+        key = _normalize_key(key, self.shape)
+        if key is None:
+            return []
+        return [
+            self._reads.submit(
+                cache_key, partial(self._read_block, *args), prefetch=True
+            )
+            for cache_key, args, _, piece in self._pieces(key)
+            if piece is None
+        ]
+
+    def _pieces(self, key):
+        """Yield (cache key, block and local index, target, cached piece).
+
+        The target is the index of the piece in the output of key.
+        """
+        per_axis = [
+            self._split_axis(axis, index) for axis, index in enumerate(key)
+        ]
+        for parts in itertools.product(*per_axis):
+            block = tuple(part[0] for part in parts)
+            local = tuple(part[1] for part in parts)
+            target = tuple(part[2] for part in parts if part[2] is not None)
+            cache_key = (block, _hashable(local))
+            yield cache_key, (block, local), target, self.cache.get(cache_key)
+
+    def _read_block(self, block, local, cache=True):
+        """Fetch (part of) one block, bypassing the in-memory cache.
+
+        With cache=False the disk cache is bypassed too, so that a pass over
+        the whole array does not evict everything else from it.
+        """
+        disk_key = None
+        if cache and self.disk_cache is not None:
+            local_key = None if local is None else _hashable(local)
+            disk_key = (self.client.uri, block, local_key, self.version)
+            array = self.disk_cache.get(disk_key)
+            if array is not None:
+                return array
+        start = time.monotonic()
+        array = numpy.asarray(self.client.read_block(block, slice=local))
+        transfer_rate.record(array.nbytes, time.monotonic() - start)
+        if disk_key is not None:
+            self.disk_cache.put(disk_key, array)
+        return array
+
+    def _split_axis(self, axis, index):
+        """List (block, index within block, index into output) for an axis.
+
+        The output index is None for an int index, which drops the axis.
+        """
+        bounds = self._bounds[axis]
+        if isinstance(index, int):
+            block = numpy.searchsorted(bounds, index, side="right") - 1
+            return [(int(block), index - bounds[block], None)]
+
+        parts = []
+        start, stop, step = index.start, index.stop, index.step
+        for block, (lo, hi) in enumerate(itertools.pairwise(bounds)):
+            end = min(hi, stop)
+            if start >= end:
+                continue
+            first = (
+                start
+                if start >= lo
+                else start + -(-(lo - start) // step) * step
+            )
+            if first >= end:
+                continue
+            count = len(range(first, end, step))
+            out_start = (first - start) // step
+            parts.append(
+                (
+                    block,
+                    slice(first - lo, end - lo, step),
+                    slice(out_start, out_start + count),
+                )
+            )
+        return parts
+
+
+def data_version(client) -> str:
+    """Token that changes whenever the data behind a Tiled array may have.
+
+    tiled does not version array data, so this digests what describes it:
+    the structure (shape, chunks, dtype) and the data sources.
+    """
+    attributes = getattr(client, "item", {}).get("attributes", {})
+    description = json.dumps(
+        [attributes.get("structure"), attributes.get("data_sources")],
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(description.encode()).hexdigest()[:16]
+
+
+def _normalize_key(key, shape):
+    """Expand key to one int or forward slice per axis, or None.
+
+    None means the key needs more than that, e.g. fancy or reversed indexing.
+    """
+    if not isinstance(key, tuple):
+        key = (key,)
+    if any(k is Ellipsis for k in key):
+        if sum(k is Ellipsis for k in key) > 1:
+            raise IndexError("an index can only have a single ellipsis")
+        i = next(i for i, k in enumerate(key) if k is Ellipsis)
+        fill = (slice(None),) * (len(shape) - len(key) + 1)
+        key = key[:i] + fill + key[i + 1 :]
+    if len(key) > len(shape):
+        raise IndexError(
+            f"too many indices for array: array is {len(shape)}-dimensional"
+            f", but {len(key)} were indexed"
+        )
+    key = key + (slice(None),) * (len(shape) - len(key))
+
+    normalized = []
+    for index, length in zip(key, shape, strict=True):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(length)
+            if step < 0:
+                return None
+            normalized.append(slice(start, max(start, stop), step))
+        elif isinstance(index, int | numpy.integer):
+            index = int(index)
+            if not -length <= index < length:
+                raise IndexError(
+                    f"index {index} is out of bounds for axis with "
+                    f"size {length}"
+                )
+            normalized.append(index % length)
+        else:
+            return None
+    return tuple(normalized)
+
+
+def _hashable(index):
+    """Make a tuple of ints and slices usable as a dictionary key."""
+    return tuple(
+        (i.start, i.stop, i.step) if isinstance(i, slice) else i for i in index
+    )
+
+
+class DownsampledTiledArray:
+    """Coarse level of a virtual pyramid, read with server-side strides.
+
+    Element i along an axis is element i * factor of the base array. Each
+    index is fetched as one strided slice of the whole array, so the server
+    does the decimation and only the coarse values are transferred.
+    """
+
+    def __init__(
+        self, base: LazyTiledArray, factors: tuple[int], cache_size: int = 16
+    ):
+        self.base = base
+        self.factors = tuple(factors)
+        self.shape = tuple(
+            -(-n // f) for n, f in zip(base.shape, self.factors, strict=True)
+        )
+        self.dtype = base.dtype
+        # Normalized index -> numpy array
+        self.cache = LRUCache(maxsize=cache_size)
+        self._reads = _ReadQueue(self.cache)
+
+    def __repr__(self):
+        return (
+            f"<{type(self).__name__} shape={self.shape} "
+            f"factors={self.factors} {self.base.client.uri!r}>"
+        )
+
+    @property
+    def ndim(self) -> int:
+        return len(self.shape)
+
+    @property
+    def size(self) -> int:
+        return math.prod(self.shape)
+
+    @property
+    def nbytes(self) -> int:
+        return self.size * self.dtype.itemsize
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __array__(self, dtype=None, copy=None):
+        array = self[...]
+        return array if dtype is None else array.astype(dtype, copy=False)
+
+    def __getitem__(self, key):
+        normalized = _normalize_key(key, self.shape)
+        if normalized is None:
+            # Fancy or reversed indexing; apply it to the whole level
+            return self[...][key]
+
+        cache_key = _hashable(normalized)
+        array = self.cache.get(cache_key)
+        if array is None:
+            array = self._reads.submit(
+                cache_key, partial(self._read, normalized)
+            ).result()
+        if array.ndim == 0:
+            return array[()]
+        return array
+
+    def prefetch(self, key) -> list[Future]:
+        """Start reading key in the background, unless it is cached."""
+        normalized = _normalize_key(key, self.shape)
+        if normalized is None:
+            return []
+        cache_key = _hashable(normalized)
+        if cache_key in self.cache:
+            return []
+        return [
+            self._reads.submit(
+                cache_key, partial(self._read, normalized), prefetch=True
+            )
+        ]
+
+    def _read(self, normalized):
+        base_key = []
+        for index, factor in zip(normalized, self.factors, strict=True):
+            if isinstance(index, int):
+                base_key.append(index * factor)
+            elif index.stop > index.start:
+                base_key.append(
+                    slice(
+                        index.start * factor,
+                        (index.stop - 1) * factor + 1,
+                        index.step * factor,
+                    )
+                )
+            else:
+                base_key.append(slice(0, 0))
+        _logger.debug("Reading %s at %s", self, base_key)
+        start = time.monotonic()
+        array = numpy.asarray(self.base.client.read(slice=tuple(base_key)))
+        transfer_rate.record(array.nbytes, time.monotonic() - start)
+        return array
+
+
+def multiscale_levels(
+    data: LazyTiledArray, min_size: int = 512, factor: int = 2
+) -> list:
+    """Virtual pyramid for data, for a napari multiscale image layer.
+
+    Each level halves (by default) the last two axes of the one before,
+    until both are at most min_size. Other axes, e.g. a stack or time
+    axis, keep full resolution so that every level has the same planes.
+    """
+    levels = [data]
+    for scale in pyramid_scales(data.shape, min_size, factor):
+        factors = (1,) * (data.ndim - 2) + (scale, scale)
+        levels.append(DownsampledTiledArray(data, factors))
+    return levels
+
+
+def pyramid_scales(
+    shape: tuple[int], min_size: int = 512, factor: int = 2
+) -> list[int]:
+    """Downsampling factors of the coarser levels of multiscale_levels()."""
+    scales = []
+    if len(shape) < 2:
+        return scales
+    scale = 1
+    while max(-(-n // scale) for n in shape[-2:]) > min_size:
+        scale *= factor
+        scales.append(scale)
+    return scales
+
+
+def estimate_contrast_limits(
+    data: LazyTiledArray, max_blocks: int = 8, max_elements: int = 2**20
+) -> tuple[float, float]:
+    """Estimate the range of values from a strided sample of a few blocks.
+
+    Up to max_blocks blocks, spread evenly over the array, are read with a
+    server-side stride that keeps the whole sample under max_elements.
+    """
+    if data.dtype == numpy.uint8:
+        return (0, 255)
+    grid = tuple(len(c) for c in data.chunks)
+    n_blocks = math.prod(grid)
+    if n_blocks == 0 or data.size == 0:
+        return (0, 1)
+    flat = numpy.unique(
+        numpy.linspace(0, n_blocks - 1, min(max_blocks, n_blocks)).round()
+    )
+    budget = max(max_elements // len(flat), 1)
+
+    samples = []
+    for index in flat:
+        block = tuple(int(i) for i in numpy.unravel_index(int(index), grid))
+        shape = [c[b] for c, b in zip(data.chunks, block, strict=True)]
+        stride = _stride_for_budget(shape, budget)
+        local = (slice(None, None, stride),) * data.ndim
+        samples.append(data._read_block(block, local).ravel())
+    return _data_range(numpy.concatenate(samples))
+
+
+def exact_contrast_limits(
+    data: LazyTiledArray, is_cancelled=None
+) -> tuple[float, float] | None:
+    """Compute the range of values by reading every block once.
+
+    Blocks are reduced one at a time and not cached, in memory or on disk,
+    so memory use stays at one block. Returns None if is_cancelled()
+    becomes true.
+    """
+    if data.dtype == numpy.uint8:
+        return (0, 255)
+    low, high = numpy.inf, -numpy.inf
+    for block in itertools.product(*(range(len(c)) for c in data.chunks)):
+        if is_cancelled is not None and is_cancelled():
+            return None
+        values = data._read_block(block, None, cache=False)
+        if values.size:
+            low = min(low, numpy.nanmin(values))
+            high = max(high, numpy.nanmax(values))
+    if low > high:
+        return (0, 1)
+    return _data_range(numpy.array([low, high]))
+
+
+def _stride_for_budget(shape, budget):
+    """Smallest stride, shared by every axis, keeping a read under budget."""
+    stride = max(int((math.prod(shape) / budget) ** (1 / len(shape))), 1)
+    while math.prod(-(-n // stride) for n in shape) > budget:
+        stride += 1
+    return stride
+
+
+def _data_range(values):
+    # Same conventions as napari's calc_data_range
+    low, high = float(numpy.nanmin(values)), float(numpy.nanmax(values))
+    if low == high:
+        low, high = min(low, 0), max(high, 1)
+    return (low, high)
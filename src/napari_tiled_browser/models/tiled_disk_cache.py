@@ -0,0 +1,130 @@
+"""Persistent on-disk cache of array chunks.
+
+Chunks are stored as .npy files and read back memory-mapped, so reopening
+a run costs a local file read instead of a round trip to the server.
+"""
+
+import contextlib
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from collections.abc import Hashable
+from pathlib import Path
+
+import numpy
+import platformdirs
+
+_logger = logging.getLogger(__name__)
+
+SUFFIX = ".npy"
+
+
+def default_cache_directory() -> Path:
+    return Path(platformdirs.user_cache_dir("napari-tiled")) / "chunks"
+
+
+class ChunkDiskCache:
+    """Directory of arrays bounded by total size, with LRU eviction.
+
+    Keys are hashed into file names, so they should identify the data
+    completely, e.g. (array URI, block index, slice, data version). A file's
+    modification time records its last use, so the eviction order survives
+    restarts.
+    """
+
+    def __init__(
+        self, directory: str | os.PathLike | None = None, max_bytes=2**30
+    ):
+        self.directory = Path(directory or default_cache_directory())
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # File name -> size in bytes, least recently used first
+        self._entries = OrderedDict()
+        self._total = 0
+
+        files = []
+        for path in self.directory.glob(f"*{SUFFIX}"):
+            with contextlib.suppress(OSError):
+                stat = path.stat()
+                files.append((stat.st_mtime, path.name, stat.st_size))
+        for _, name, size in sorted(files):
+            self._entries[name] = size
+            self._total += size
+        self._evict()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total
+
+    def get(self, key: Hashable) -> numpy.ndarray | None:
+        """Return the (read-only, memory-mapped) array stored for key."""
+        name = self._name(key)
+        with self._lock:
+            if name not in self._entries:
+                return None
+            self._entries.move_to_end(name)
+        path = self.directory / name
+        try:
+            array = numpy.load(path, mmap_mode="r", allow_pickle=False)
+            os.utime(path)
+        except (OSError, ValueError) as exception:
+            # Removed by another process, or a damaged file
+            _logger.debug("Dropping chunk cache entry %s: %s", name, exception)
+            self._discard(name)
+            return None
+        return array
+
+    def put(self, key: Hashable, array: numpy.ndarray) -> None:
+        """Store array for key, evicting the least recently used entries."""
+        array = numpy.asarray(array)
+        if array.dtype.hasobject or array.nbytes > self.max_bytes:
+            return
+        name = self._name(key)
+        path = self.directory / name
+        # Write to a private file first, so readers never see partial data
+        tmp = path.with_name(f"{name}.{os.getpid()}.{threading.get_ident()}")
+        try:
+            with open(tmp, "wb") as file:
+                numpy.save(file, array, allow_pickle=False)
+            os.replace(tmp, path)
+            size = path.stat().st_size
+        except OSError as exception:
+            _logger.warning("Could not write to chunk cache: %s", exception)
+            with contextlib.suppress(OSError):
+                tmp.unlink()
+            return
+        with self._lock:
+            self._total += size - self._entries.pop(name, 0)
+            self._entries[name] = size
+        self._evict()
+
+    def clear(self) -> None:
+        with self._lock:
+            names = list(self._entries)
+        for name in names:
+            self._discard(name)
+
+    def _evict(self):
+        while True:
+            with self._lock:
+                if self._total <= self.max_bytes or not self._entries:
+                    return
+                name = next(iter(self._entries))
+            self._discard(name)
+
+    def _discard(self, name):
+        with self._lock:
+            self._total -= self._entries.pop(name, 0)
+        with contextlib.suppress(OSError):
+            (self.directory / name).unlink()
+
+    @staticmethod
+    def _name(key):
+        return hashlib.sha256(repr(key).encode()).hexdigest() + SUFFIX
@@ -0,0 +1,227 @@
+"""Direct requests to the Tiled search and metadata endpoints.
+
+tiled's own `items()` always asks for every field of every child. The
+catalog table often needs far less than that, so these helpers can request
+only the fields it displays. They can also keep responses in a
+ResponseDiskCache, to be shown at once in a later session and revalidated
+against the server.
+"""
+
+import json
+from collections.abc import Mapping
+from typing import NamedTuple
+from urllib.parse import parse_qs, urlparse
+
+from httpx import codes
+from tiled.client.base import BaseClient
+from tiled.client.utils import ClientError, client_for_item
+
+from napari_tiled_browser.models.tiled_response_cache import (
+    FETCHED,
+    MISSING,
+    ResponseDiskCache,
+    get_json,
+)
+
+# Enough to show a key with the right icon and spot CatalogOfBlueskyRuns
+LISTING_FIELDS = ("structure_family", "specs")
+# Largest page[limit] accepted by the Tiled server
+MAX_PAGE_SIZE = 300
+# Summary columns of the runs of a CatalogOfBlueskyRuns, and where their
+# values are in the metadata of a run
+RUN_SUMMARY_COLUMNS = {
+    "scan_id": "start.scan_id",
+    "plan_name": "start.plan_name",
+    "time": "start.time",
+    "detectors": "start.detectors",
+}
+
+
+class ListingItem:
+    "Placeholder for a node of which only a few fields have been fetched"
+
+    def __init__(self, item: dict, summary: dict | None = None):
+        self.item = item
+        # Values of the summary columns, if they were selected
+        self.summary = summary
+
+    def __repr__(self):
+        return f"<{type(self).__name__} {self.item['id']!r}>"
+
+    @property
+    def structure_family(self):
+        return self.item["attributes"]["structure_family"]
+
+
+class Listing(NamedTuple):
+    items: list  # (key, client or ListingItem) pairs
+    count: int  # may be approximate above the server's exact_count_limit
+    modified: bool  # whether any response was new rather than from cache
+    # Continues the listing, in the direction fetched, after the last item;
+    # None if the server gave no cursor or the listing ended
+    cursor: str | None = None
+
+
+def fetch_listing(
+    node: BaseClient,
+    offset: int,
+    limit: int,
+    fields: tuple[str] | None = LISTING_FIELDS,
+    cache: ResponseDiskCache | None = None,
+    offline: bool = False,
+    cursor: str | None = None,
+    reverse: bool = False,
+    columns: Mapping[str, str] | None = None,
+) -> Listing | None:
+    """Fetch a window of the entries of a container or search result.
+
+    With fields=None, every field is requested and the entries are full
+    clients, as from `node.items()`. With offline=True, the listing is
+    only read from cache, and None is returned if it is not all there.
+
+    Given a cursor from an earlier Listing, the window starts there rather
+    than at offset, which the server finds as fast at any depth. With
+    reverse=True, the listing is read in reverse order, offset counting
+    from its end, but entries are returned in the usual order.
+
+    columns maps column names to metadata paths, such as
+    RUN_SUMMARY_COLUMNS. With fields given, the server selects just these
+    values from the metadata of each entry, for its summary.
+    """
+    # _queries_as_params, _sorting_params, _reversed_sorting_params and
+    # _include_data_sources are private to tiled's clients, and match
+    # tiled 0.2.18. Clients without them list unfiltered and unsorted.
+    params = {
+        # Search results and sorted nodes carry their query parameters
+        **getattr(node, "_queries_as_params", {}),
+        **getattr(node, "_sorting_params", {}),
+    }
+    if reverse:
+        # "-" alone reverses the server's default order
+        params.update(
+            getattr(node, "_reversed_sorting_params", None) or {"sort": ["-"]}
+        )
+    if fields is not None:
+        params["fields"] = list(fields)
+        if columns:
+            params["fields"].append("metadata")
+            params["select_metadata"] = select_metadata(columns)
+    include_data_sources = getattr(node, "_include_data_sources", False)
+    if include_data_sources:
+        params["include_data_sources"] = True
+    url = node.item["links"]["search"]
+    page = {"page[cursor]": cursor} if cursor else {"page[offset]": offset}
+    items = []
+    count = 0
+    modified = False
+    while page is not None and len(items) < limit:
+        page["page[limit]"] = min(limit - len(items), MAX_PAGE_SIZE)
+        content, outcome = get_json(
+            node.context, url, {**params, **page}, cache=cache, offline=offline
+        )
+        if outcome == MISSING:
+            return None
+        modified = modified or outcome == FETCHED
+        count = content["meta"]["count"]
+        for item in content["data"]:
+            if fields is None:
+                entry = client_for_item(
+                    node.context,
+                    node.structure_clients,
+                    item,
+                    include_data_sources=include_data_sources,
+                )
+            elif columns:
+                metadata = item["attributes"].pop("metadata", None) or {}
+                entry = ListingItem(item, metadata.get("selected") or {})
+            else:
+                entry = ListingItem(item)
+            items.append((item["id"], entry))
+        # Follow the server's link for anything past the first page
+        page = _next_page(content["links"]["next"])
+    cursor = None if page is None else page.get("page[cursor]")
+    items = items[:limit]
+    if reverse:
+        items.reverse()
+    return Listing(items, count, modified, cursor)
+
+
+def select_metadata(columns: Mapping[str, str]) -> str:
+    "JMESPath expression selecting a value for each column from metadata"
+    return (
+        "{"
+        + ", ".join(
+            f"{json.dumps(name)}: "
+            + ".".join(json.dumps(part) for part in path.split("."))
+            for name, path in columns.items()
+        )
+        + "}"
+    )
+
+
+def summarize(node, columns: Mapping[str, str]) -> dict:
+    """Values of the summary columns of a listed node.
+
+    They come from the listing if it selected them, or else from the
+    node's full metadata.
+    """
+    summary = getattr(node, "summary", None)
+    if summary is not None:
+        return summary
+    metadata = node.item["attributes"].get("metadata") or {}
+    summary = {}
+    for name, path in columns.items():
+        value = metadata
+        for part in path.split("."):
+            value = value.get(part) if isinstance(value, Mapping) else None
+        summary[name] = value
+    return summary
+
+
+def _next_page(link: str | None) -> dict | None:
+    "Page parameters of the server's link to the next page"
+    if link is None:
+        return None
+    query = parse_qs(urlparse(link).query)
+    return {
+        name: query[name][0]
+        for name in ("page[cursor]", "page[offset]")
+        if name in query
+    }
+
+
+def fetch_node(
+    root: BaseClient,
+    node_path_parts: tuple[str],
+    cache: ResponseDiskCache | None = None,
+    offline: bool = False,
+) -> BaseClient | None:
+    """Look up a node by path from the root, like `root[node_path_parts]`.
+
+    With offline=True the node is only read from cache, and None is
+    returned if it is not there. Raises KeyError if the server has no
+    such node.
+    """
+    url = root.item["links"]["self"].rstrip("/") + "".join(
+        f"/{key}" for key in node_path_parts
+    )
+    params = {}
+    include_data_sources = getattr(root, "_include_data_sources", False)
+    if include_data_sources:
+        params["include_data_sources"] = True
+    try:
+        content, outcome = get_json(
+            root.context, url, params, cache=cache, offline=offline
+        )
+    except ClientError as exception:
+        if exception.response.status_code == codes.NOT_FOUND:
+            raise KeyError(node_path_parts) from exception
+        raise
+    if outcome == MISSING:
+        return None
+    return client_for_item(
+        root.context,
+        root.structure_clients,
+        content["data"],
+        include_data_sources=include_data_sources,
+    )
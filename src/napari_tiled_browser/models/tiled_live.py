@@ -0,0 +1,199 @@
+"""Live array updates, applied in place to a growing buffer.
+
+Each websocket update of an array (array-data or array-ref) is reduced to
+an ArrayPatch: the new values of one region and the resulting shape of the
+whole array. LiveArrayBuffer writes patches into storage that grows
+geometrically along the first axis, so a detector appending frames costs
+the copy of the new frames, and the rest of the array is left alone.
+"""
+
+import logging
+import math
+from typing import NamedTuple
+
+import numpy
+from tiled.client.utils import handle_error, retry_context
+
+_logger = logging.getLogger(__name__)
+
+
+class ArrayPatch(NamedTuple):
+    offset: tuple[int]  # where data goes in the array
+    data: numpy.ndarray
+    shape: tuple[int]  # shape of the whole array after the patch
+
+
+def read_patch(update, previous_shape=None, chunks=None) -> ArrayPatch:
+    """Decode or fetch the data of a live array update.
+
+    previous_shape is the shape of the array before the update, and chunks
+    its chunks, used to place block writes. Fetching an array-ref only
+    downloads the region it refers to; a reference without a patch that
+    only grew the first axis is taken as an append.
+    """
+    if update.type == "array-data":
+        data = update.data()
+        if update.offset is not None:
+            offset = _pad(update.offset, data.ndim)
+        elif update.block is not None:
+            offset = _block_offset(update.block, chunks, data.shape)
+        else:
+            # The whole array was written
+            return ArrayPatch((0,) * data.ndim, data, data.shape)
+        previous_shape = previous_shape or (0,) * data.ndim
+        shape = tuple(
+            max(n, o + m)
+            for n, o, m in zip(previous_shape, offset, data.shape, strict=True)
+        )
+        return ArrayPatch(offset, data, shape)
+
+    shape = tuple(update.shape)
+    if update.patch is not None:
+        data = update.data()
+        return ArrayPatch(_pad(update.patch.offset, data.ndim), data, shape)
+    if (
+        previous_shape is not None
+        and len(previous_shape) == len(shape)
+        and previous_shape[1:] == shape[1:]
+        and previous_shape[0] < shape[0]
+    ):
+        offset = (previous_shape[0],) + (0,) * (len(shape) - 1)
+        data = _fetch_region(
+            update.subscription.context,
+            update.uri.split("?", 1)[0],
+            offset,
+            shape,
+            update.data_type.to_numpy_dtype(),
+        )
+        return ArrayPatch(offset, data, shape)
+    return ArrayPatch((0,) * len(shape), update.data(), shape)
+
+
+def read_missed(subscription, patch, previous_shape=None) -> ArrayPatch | None:
+    """Read what updates missed before patch could have written.
+
+    If the array had previous_shape and patch appends past its end, only
+    the rows in between are read. Otherwise the missed updates could have
+    written anywhere, and the whole array is read, unless patch itself
+    writes all of it. Returns None if there is nothing to read.
+    """
+    shape = tuple(patch.shape)
+    if patch.data.shape == shape:
+        return None
+    if (
+        previous_shape is not None
+        and len(previous_shape) == len(shape)
+        and previous_shape[1:] == shape[1:]
+        and previous_shape[0] <= patch.offset[0]
+    ):
+        if previous_shape[0] == patch.offset[0]:
+            return None
+        offset = (previous_shape[0],) + (0,) * (len(shape) - 1)
+        stop = (patch.offset[0], *shape[1:])
+    else:
+        offset, stop = (0,) * len(shape), shape
+    context = subscription.context
+    uri = f"{str(context.api_uri).rstrip('/')}/array/full/" + "/".join(
+        subscription.segments
+    )
+    data = _fetch_region(context, uri, offset, stop, patch.data.dtype)
+    return ArrayPatch(offset, data, shape)
+
+
+def _pad(offset, ndim):
+    """Offsets may be given for the leading axes only."""
+    return tuple(offset) + (0,) * (ndim - len(offset))
+
+
+def _fetch_region(context, uri, offset, stop, dtype):
+    """Fetch array[offset:stop] from the array node at uri."""
+    region = ",".join(f"{o}:{n}" for o, n in zip(offset, stop, strict=True))
+    _logger.debug("Fetching %s[%s]", uri, region)
+    for attempt in retry_context():
+        with attempt:
+            content = handle_error(
+                context.http_client.get(
+                    uri,
+                    headers={"Accept": "application/octet-stream"},
+                    params={"slice": region},
+                )
+            ).read()
+    region_shape = tuple(n - o for o, n in zip(offset, stop, strict=True))
+    return numpy.frombuffer(content, dtype=dtype).reshape(region_shape)
+
+
+def _block_offset(block, chunks, block_shape):
+    """Position of block in the array.
+
+    Blocks past the known chunks, e.g. of an array that has grown since,
+    are assumed to follow regular chunking.
+    """
+    if chunks is None:
+        return tuple(b * n for b, n in zip(block, block_shape, strict=True))
+    return tuple(
+        sum(c[:b]) + max(b - len(c), 0) * (c[0] if c else n)
+        for b, c, n in zip(block, chunks, block_shape, strict=True)
+    )
+
+
+class LiveArrayBuffer:
+    """Array that live updates are patched into, growing as needed.
+
+    Storage is allocated with room to spare along the first axis, growing
+    by a factor of growth when full, so appends are amortized O(new data).
+    data is a view of the valid part of the storage; it is the same object
+    until the shape changes.
+    """
+
+    def __init__(self, growth: float = 2.0):
+        self.growth = growth
+        self.shape = None
+        self.data = None
+        self._storage = None
+
+    @property
+    def capacity(self) -> int:
+        return 0 if self._storage is None else len(self._storage)
+
+    def apply(self, patch: ArrayPatch) -> tuple[tuple[slice], bool]:
+        """Write patch into the array.
+
+        Returns the region written, as slices into the array, and whether
+        the shape of the array changed.
+        """
+        shape = tuple(patch.shape)
+        resized = shape != self.shape
+        if resized:
+            self._resize(shape, patch.data.dtype)
+        region = tuple(
+            slice(o, o + n)
+            for o, n in zip(patch.offset, patch.data.shape, strict=True)
+        )
+        self.data[region] = patch.data
+        return region, resized
+
+    def _resize(self, shape, dtype):
+        storage = self._storage
+        if (
+            storage is None
+            or storage.dtype != dtype
+            or storage.shape[1:] != shape[1:]
+            or len(storage) < shape[0]
+        ):
+            capacity = shape[0]
+            if storage is not None and storage.shape[1:] == shape[1:]:
+                capacity = max(capacity, math.ceil(len(storage) * self.growth))
+            _logger.debug("Allocating %d frames of %s", capacity, shape[1:])
+            self._storage = numpy.zeros((capacity, *shape[1:]), dtype=dtype)
+            if storage is not None and storage.ndim == len(shape):
+                # Keep what overlaps the new shape
+                common = tuple(
+                    slice(0, min(a, b))
+                    for a, b in zip(self.shape, shape, strict=True)
+                )
+                self._storage[common] = storage[common]
+        elif shape[0] < self.shape[0]:
+            # Rows that may come back later should not show stale values
+            storage[shape[0] : self.shape[0]] = 0
+        self.shape = shape
+        self.data = self._storage[: shape[0]]
@@ -0,0 +1,304 @@
+"""Local full-text index of the metadata of visited Tiled nodes.
+
+Search-as-you-type needs an answer sooner than a Key, FullText or Regex
+query can come back from a busy server. MetadataIndex keeps the metadata
+that listings, selections and crawls have already fetched in a SQLite file,
+with an FTS5 table of its words, so a search of a container can be answered
+from disk at once, or offline, for the children seen so far.
+"""
+
+import contextlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections.abc import Iterable, Mapping
+from functools import lru_cache
+from pathlib import Path
+
+import platformdirs
+
+_logger = logging.getLogger(__name__)
+
+
+def default_index_path() -> Path:
+    return Path(platformdirs.user_cache_dir("napari-tiled")) / "metadata.db"
+
+
+class MetadataIndex:
+    """SQLite index of node metadata, bounded by entry count.
+
+    Entries are the children of containers on a server, keyed by
+    (server, parent path, key), and searched per parent like a Tiled query.
+    Metadata known only in part, such as summary columns, never replaces
+    complete metadata. The entries seen least recently are evicted first.
+    """
+
+    def __init__(
+        self, path: str | os.PathLike | None = None, max_entries=100_000
+    ):
+        self.path = Path(path or default_index_path())
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # Shared by the worker threads, one transaction at a time
+        self._connection = sqlite3.connect(
+            self.path, check_same_thread=False, isolation_level=None
+        )
+        self._connection.create_function(
+            "regexp", 2, _regexp, deterministic=True
+        )
+        with self._lock:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS nodes ("
+                "server TEXT, parent TEXT, key TEXT, item TEXT, "
+                "complete INTEGER, last_seen REAL, "
+                "PRIMARY KEY (server, parent, key))"
+            )
+            # Eviction finds the entries seen least recently
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS nodes_last_seen "
+                "ON nodes (last_seen)"
+            )
+            # Words of the string values in each node's metadata, by rowid
+            self._connection.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS words USING fts5(text)"
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._connection.execute(
+                "SELECT COUNT(*) FROM nodes"
+            ).fetchone()
+        return count
+
+    def add(
+        self,
+        server: str,
+        parent_path_parts: tuple[str],
+        items: Iterable[tuple[str, dict]],
+        complete: bool = True,
+    ) -> None:
+        """Index (key, item) pairs of the children of a container.
+
+        An item is a Tiled item dict; only its structure family, specs and
+        metadata are kept.
+        """
+        parent = "/".join(parent_path_parts)
+        now = time.time()
+        rows = []
+        for key, item in items:
+            attributes = item["attributes"]
+            metadata = attributes.get("metadata") or {}
+            slim = {
+                "id": key,
+                "attributes": {
+                    "structure_family": attributes["structure_family"],
+                    "specs": attributes.get("specs") or [],
+                    "metadata": metadata,
+                },
+            }
+            rows.append(
+                (
+                    key,
+                    json.dumps(slim, default=str),
+                    " ".join(_strings(metadata)),
+                )
+            )
+        if not rows:
+            return
+        with self._lock, self._transaction():
+            execute = self._connection.execute
+            for key, item, text in rows:
+                row = execute(
+                    "SELECT rowid, complete FROM nodes "
+                    "WHERE server = ? AND parent = ? AND key = ?",
+                    (server, parent, key),
+                ).fetchone()
+                if row is None:
+                    rowid = execute(
+                        "INSERT INTO nodes VALUES (?, ?, ?, ?, ?, ?)",
+                        (server, parent, key, item, complete, now),
+                    ).lastrowid
+                elif row[1] and not complete:
+                    execute(
+                        "UPDATE nodes SET last_seen = ? WHERE rowid = ?",
+                        (now, row[0]),
+                    )
+                    continue
+                else:
+                    rowid = row[0]
+                    execute(
+                        "UPDATE nodes SET item = ?, complete = ?, "
+                        "last_seen = ? WHERE rowid = ?",
+                        (item, complete, now, rowid),
+                    )
+                    execute("DELETE FROM words WHERE rowid = ?", (rowid,))
+                execute(
+                    "INSERT INTO words (rowid, text) VALUES (?, ?)",
+                    (rowid, text),
+                )
+            self._evict()
+
+    def add_listing(
+        self,
+        server: str,
+        parent_path_parts: tuple[str],
+        entries: Iterable[tuple[str, object]],
+        columns: Mapping[str, str] | None = None,
+    ) -> None:
+        """Index the (key, node) pairs of a listing page.
+
+        Nodes listed with full metadata are indexed completely, and those
+        with summary columns only by the columns, given by metadata path.
+        """
+        complete, partial = [], []
+        for key, node in entries:
+            item = node.item
+            summary = getattr(node, "summary", None)
+            if summary is not None and columns:
+                metadata = summary_metadata(summary, columns)
+                attributes = {**item["attributes"], "metadata": metadata}
+                partial.append((key, {**item, "attributes": attributes}))
+            elif "metadata" in item["attributes"]:
+                complete.append((key, item))
+        self.add(server, parent_path_parts, complete)
+        self.add(server, parent_path_parts, partial, complete=False)
+
+    def search(
+        self,
+        server: str,
+        parent_path_parts: tuple[str],
+        key: str | None,
+        value: str,
+        search_type: str,
+        limit: int = 1000,
+    ) -> list[tuple[str, dict]] | None:
+        """Indexed children of a container matching a search.
+
+        search_type is one of the search widget's "key_value", "full_text"
+        and "regex". Returns (key, item) pairs in the order they were first
+        seen, or None if the search cannot be answered locally.
+        """
+        parent = "/".join(parent_path_parts)
+        if search_type == "full_text":
+            words = value.split()
+            if not words:
+                return []
+            # Every word, as a whole word, like Tiled's SQL catalogs
+            match = " ".join(
+                '"{}"'.format(word.replace('"', '""')) for word in words
+            )
+            sql = (
+                "SELECT nodes.key, nodes.item FROM nodes "
+                "JOIN words ON words.rowid = nodes.rowid "
+                "WHERE nodes.server = ? AND nodes.parent = ? "
+                "AND words MATCH ? ORDER BY nodes.rowid LIMIT ?"
+            )
+            params = (server, parent, match, limit)
+        elif search_type in ("key_value", "regex"):
+            if search_type == "regex":
+                try:
+                    _compile(value)
+                except re.error:
+                    return None
+                condition = "regexp(?, json_extract(item, ?))"
+            else:
+                # As in Tiled, the value entered is compared as a string
+                condition = "json_extract(item, ?) = ?"
+            path = "$.attributes.metadata" + "".join(
+                '."{}"'.format(part.replace('"', '\\"'))
+                for part in key.split(".")
+            )
+            operands = (
+                (value, path) if search_type == "regex" else (path, value)
+            )
+            sql = (
+                "SELECT key, item FROM nodes "
+                "WHERE server = ? AND parent = ? "
+                f"AND {condition} ORDER BY rowid LIMIT ?"
+            )
+            params = (server, parent, *operands, limit)
+        else:
+            return None
+        with self._lock:
+            try:
+                rows = self._connection.execute(sql, params).fetchall()
+            except sqlite3.Error as exception:
+                _logger.debug("Local search failed: %s", exception)
+                return None
+        return [(key, json.loads(item)) for key, item in rows]
+
+    def clear(self) -> None:
+        with self._lock, self._transaction():
+            self._connection.execute("DELETE FROM nodes")
+            self._connection.execute("DELETE FROM words")
+
+    def close(self) -> None:
+        with self._lock, contextlib.suppress(sqlite3.Error):
+            self._connection.close()
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        self._connection.execute("BEGIN")
+        try:
+            yield
+        except BaseException:
+            self._connection.execute("ROLLBACK")
+            raise
+        self._connection.execute("COMMIT")
+
+    def _evict(self):
+        (count,) = self._connection.execute(
+            "SELECT COUNT(*) FROM nodes"
+        ).fetchone()
+        if count <= self.max_entries:
+            return
+        stale = "SELECT rowid FROM nodes ORDER BY last_seen LIMIT ?"
+        excess = count - self.max_entries
+        self._connection.execute(
+            f"DELETE FROM words WHERE rowid IN ({stale})", (excess,)
+        )
+        self._connection.execute(
+            f"DELETE FROM nodes WHERE rowid IN ({stale})", (excess,)
+        )
+
+
+def summary_metadata(summary: Mapping, columns: Mapping[str, str]) -> dict:
+    """Rebuild the part of a node's metadata that summary columns show."""
+    metadata = {}
+    for name, path in columns.items():
+        value = summary.get(name)
+        if value is None:
+            continue
+        *parents, last = path.split(".")
+        branch = metadata
+        for part in parents:
+            branch = branch.setdefault(part, {})
+        branch[last] = value
+    return metadata
+
+
+def _strings(value):
+    "Walk the string values of nested metadata"
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, Mapping):
+        for item in value.values():
+            yield from _strings(item)
+    elif isinstance(value, list | tuple):
+        for item in value:
+            yield from _strings(item)
+
+
+@lru_cache(maxsize=32)
+def _compile(pattern):
+    return re.compile(pattern)
+
+
+def _regexp(pattern, value):
+    # Only strings match, as in Tiled
+    return isinstance(value, str) and bool(_compile(pattern).search(value))
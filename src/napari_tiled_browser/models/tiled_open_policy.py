@@ -0,0 +1,111 @@
+"""How to open a Tiled array, decided from its structure alone.
+
+The shape, dtype and chunks of an array come with its listing, so its size
+is known before a single byte of data is read. An OpenPolicy uses that to
+pick a way of opening it that cannot stall napari: small arrays are read
+whole, arrays with reasonably sized planes are read a plane at a time, and
+arrays whose planes alone would take too long are shown as a downsampled
+pyramid, of which only the coarsest level is read at first. Arrays of
+fewer than two dimensions, which napari cannot show as images, are not
+opened at all.
+"""
+
+import math
+from collections.abc import Mapping
+from typing import NamedTuple
+
+from napari_tiled_browser.models.tiled_array import pyramid_scales
+
+# Ways to open an array
+EAGER = "eager"  # read it all into memory, then show it
+LAZY = "lazy"  # read the planes napari shows, as it shows them
+PREVIEW = "preview"  # a virtual pyramid; full resolution only when zoomed
+UNSUPPORTED = "unsupported"  # not opened: napari images need 2+ dimensions
+
+_UNITS = ("B", "KiB", "MiB", "GiB", "TiB", "PiB")
+
+
+class OpenPlan(NamedTuple):
+    mode: str  # one of the modes above
+    nbytes: int  # size of the whole array
+    first_bytes: int  # read before anything is shown
+    seconds: float  # estimated time to read first_bytes
+
+
+class OpenPolicy:
+    """Thresholds choosing between eager, lazy and preview opening.
+
+    - eager_max_bytes: arrays up to this size are read whole
+    - plane_max_bytes: larger arrays are read lazily if a plane (the last
+      two axes) is at most this size, and previewed otherwise
+    - assumed_rate: bytes per second to estimate with, until array reads
+      have been timed
+    - preview_size: pixels along each axis of the coarsest preview level
+    """
+
+    def __init__(
+        self,
+        eager_max_bytes: int = 64 * 2**20,
+        plane_max_bytes: int = 64 * 2**20,
+        assumed_rate: float = 10 * 2**20,
+        preview_size: int = 512,
+    ):
+        self.eager_max_bytes = eager_max_bytes
+        self.plane_max_bytes = plane_max_bytes
+        self.assumed_rate = assumed_rate
+        self.preview_size = preview_size
+
+    def __repr__(self):
+        return (
+            f"{type(self).__name__}("
+            f"eager_max_bytes={self.eager_max_bytes!r}, "
+            f"plane_max_bytes={self.plane_max_bytes!r}, "
+            f"assumed_rate={self.assumed_rate!r}, "
+            f"preview_size={self.preview_size!r})"
+        )
+
+    def plan(self, structure: Mapping, rate: float | None = None) -> OpenPlan:
+        """Choose how to open an array, given its structure as a dict.
+
+        rate is the measured throughput in bytes per second, if known.
+        """
+        shape = tuple(structure["shape"])
+        itemsize = structure["data_type"]["itemsize"]
+        nbytes = math.prod(shape) * itemsize
+        if len(shape) < 2:
+            # Nothing to read a plane of, or to downsample
+            return OpenPlan(UNSUPPORTED, nbytes, 0, 0.0)
+        plane_bytes = math.prod(shape[-2:]) * itemsize
+        if nbytes <= self.eager_max_bytes:
+            mode, first_bytes = EAGER, nbytes
+        elif plane_bytes <= self.plane_max_bytes:
+            mode, first_bytes = LAZY, plane_bytes
+        else:
+            mode = PREVIEW
+            # The coarsest level is shown first
+            scales = pyramid_scales(shape, self.preview_size)
+            scale = scales[-1] if scales else 1
+            first_bytes = (
+                math.prod(-(-n // scale) for n in shape[-2:]) * itemsize
+            )
+        seconds = first_bytes / (rate or self.assumed_rate)
+        return OpenPlan(mode, nbytes, first_bytes, seconds)
+
+
+def format_bytes(nbytes: int) -> str:
+    """Size in binary units, e.g. 1.5 GiB."""
+    size, unit = float(nbytes), 0
+    while size >= 1024 and unit < len(_UNITS) - 1:
+        size /= 1024
+        unit += 1
+    if unit == 0:
+        return f"{nbytes} B"
+    return f"{size:.1f} {_UNITS[unit]}"
+
+
+def format_seconds(seconds: float) -> str:
+    if seconds < 1:
+        return "under 1 s"
+    if seconds < 120:
+        return f"~{seconds:.0f} s"
+    return f"~{seconds / 60:.0f} min"
@@ -0,0 +1,164 @@
+"""Read ahead of a dims slider that is scrubbing through a Tiled layer.
+
+Every step of a z or time slider asks for a plane that is not in memory
+yet. SlicePrefetcher follows napari's dims events, works out which way and
+how fast the slider moves, and reads the next few planes in that direction
+in the background, so they are cached by the time napari asks for them.
+"""
+
+import logging
+import math
+import time
+
+_logger = logging.getLogger(__name__)
+
+# Weight of the latest step in the smoothed scrub speed
+SPEED_SMOOTHING = 0.5
+
+
+def slice_index(layer, dims, shape) -> tuple[int | None]:
+    """Index of the slice of layer in view; None for displayed axes.
+
+    shape is that of the layer's data, or of its current level if it is
+    multiscale.
+    """
+    offset = dims.ndim - layer.ndim
+    displayed = {axis - offset for axis in dims.displayed}
+    point = layer.world_to_data(dims.point)
+    if layer.multiscale:
+        point = point / layer.downsample_factors[layer.data_level]
+    return tuple(
+        (
+            None
+            if axis in displayed
+            else min(max(round(float(value)), 0), length - 1)
+        )
+        for axis, (value, length) in enumerate(zip(point, shape, strict=True))
+    )
+
+
+class SlicePrefetcher:
+    """Prefetch the planes ahead of the current slice of a napari layer.
+
+    The layer's data (or each level, for a multiscale layer) must have a
+    prefetch(key) method returning futures, like LazyTiledArray. At most
+    depth planes are read ahead: enough to cover the next lookahead seconds
+    at the current speed, spaced by the size of the latest step. Reads of
+    planes that are no longer ahead, e.g. after the slider turned around,
+    are cancelled.
+    """
+
+    def __init__(self, layer, dims, depth: int = 4, lookahead: float = 0.5):
+        self.layer = layer
+        self.dims = dims
+        self.depth = depth
+        self.lookahead = lookahead
+        # (time, data index) at the latest dims event
+        self._last = None
+        # Smoothed scrub speed in planes per second
+        self._speed = 0.0
+        # Index of each plane being read ahead -> its futures
+        self._pending = {}
+        dims.events.current_step.connect(self.on_dims_changed)
+
+    def close(self) -> None:
+        self.dims.events.current_step.disconnect(self.on_dims_changed)
+        self.cancel()
+
+    def cancel(self) -> None:
+        for futures in self._pending.values():
+            for future in futures:
+                future.cancel()
+        self._pending.clear()
+
+    def on_dims_changed(self, event=None):
+        data = self._data()
+        if not hasattr(data, "prefetch"):
+            return
+        index = slice_index(self.layer, self.dims, data.shape)
+        now = time.monotonic()
+        last, self._last = self._last, (now, index)
+        if last is None:
+            return
+        moved = [
+            axis
+            for axis, (old, new) in enumerate(zip(last[1], index, strict=True))
+            if old is not None and new is not None and old != new
+        ]
+        if len(moved) != 1:
+            # Another axis, view or level; nothing to extrapolate from
+            self._speed = 0.0
+            self.cancel()
+            return
+        (axis,) = moved
+        delta = index[axis] - last[1][axis]
+        speed = abs(delta) / max(now - last[0], 1e-3)
+        self._speed = SPEED_SMOOTHING * speed + (1 - SPEED_SMOOTHING) * (
+            self._speed or speed
+        )
+
+        step = abs(delta)
+        count = min(
+            max(math.ceil(self._speed * self.lookahead / step), 1), self.depth
+        )
+        self._reserve_cache(data, count)
+        targets = []
+        for k in range(1, count + 1):
+            position = index[axis] + k * delta
+            if not 0 <= position < data.shape[axis]:
+                break
+            targets.append(index[:axis] + (position,) + index[axis + 1 :])
+
+        for plane in list(self._pending):
+            if plane not in targets or all(
+                future.done() for future in self._pending[plane]
+            ):
+                for future in self._pending.pop(plane):
+                    future.cancel()
+        for plane in targets:
+            if plane not in self._pending:
+                futures = data.prefetch(self._key(plane))
+                if futures:
+                    self._pending[plane] = futures
+        _logger.debug(
+            "Prefetching %d plane(s) of %s along axis %d (%.1f planes/s)",
+            len(self._pending),
+            self.layer.name,
+            axis,
+            self._speed,
+        )
+
+    def _data(self):
+        if self.layer.multiscale:
+            return self.layer.data[self.layer.data_level]
+        return self.layer.data
+
+    def _key(self, index):
+        """The index napari will slice the data with at a plane."""
+        key = []
+        for axis, i in enumerate(index):
+            if i is not None:
+                key.append(slice(i, i + 1))
+            elif self.layer.multiscale:
+                # Multiscale layers only read the part in view
+                corners = self.layer.corner_pixels
+                key.append(
+                    slice(int(corners[0, axis]), int(corners[1, axis]) + 1)
+                )
+            else:
+                key.append(slice(None))
+        return tuple(key)
+
+    def _reserve_cache(self, data, count):
+        """Make room in the cache of data for count planes ahead."""
+        cache = getattr(data, "cache", None)
+        if cache is None:
+            return
+        offset = self.dims.ndim - self.layer.ndim
+        displayed = [axis - offset for axis in self.dims.displayed]
+        chunks = getattr(data, "chunks", None)
+        per_plane = (
+            math.prod(len(chunks[axis]) for axis in displayed) if chunks else 1
+        )
+        # The current plane, those ahead, and the one just passed
+        cache.maxsize = max(cache.maxsize, (count + 2) * per_plane)
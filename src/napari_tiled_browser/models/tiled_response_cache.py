@@ -0,0 +1,171 @@
+"""Persistent cache of Tiled metadata and listing responses.
+
+Responses are stored with their ETag in a SQLite file, so that a new
+napari session can show what it saw last time straight away and then ask
+the server whether anything changed (If-None-Match), which costs a small
+304 response when nothing did.
+"""
+
+import contextlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, NamedTuple
+from urllib.parse import parse_qs, urlparse
+
+import msgpack
+import platformdirs
+from httpx import codes
+from tiled.client.utils import MSGPACK_MIME_TYPE, handle_error, retry_context
+
+_logger = logging.getLogger(__name__)
+
+# Outcomes of get_json()
+CACHED = "cached"  # served from disk without contacting the server
+NOT_MODIFIED = "not_modified"  # served from disk, confirmed by the server
+FETCHED = "fetched"  # new content from the server
+MISSING = "missing"  # not on disk, and the server was not contacted
+
+
+def default_cache_path() -> Path:
+    return Path(platformdirs.user_cache_dir("napari-tiled")) / "responses.db"
+
+
+class CachedResponse(NamedTuple):
+    etag: str
+    content: bytes
+
+    def json(self) -> Any:
+        return msgpack.unpackb(self.content, timestamp=3)
+
+
+class ResponseDiskCache:
+    """SQLite table of responses keyed by request, bounded by entry count.
+
+    The least recently used entries are evicted first.
+    """
+
+    def __init__(
+        self, path: str | os.PathLike | None = None, max_entries=10_000
+    ):
+        self.path = Path(path or default_cache_path())
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # Shared by the worker threads, one statement at a time
+        self._connection = sqlite3.connect(
+            self.path, check_same_thread=False, isolation_level=None
+        )
+        with self._lock:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, etag TEXT, content BLOB, last_used REAL)"
+            )
+            # Eviction finds the entries used least recently
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS responses_last_used "
+                "ON responses (last_used)"
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._connection.execute(
+                "SELECT COUNT(*) FROM responses"
+            ).fetchone()
+        return count
+
+    def get(self, key: str) -> CachedResponse | None:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT etag, content FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._connection.execute(
+                "UPDATE responses SET last_used = ? WHERE key = ?",
+                (time.time(), key),
+            )
+        return CachedResponse(*row)
+
+    def put(self, key: str, etag: str, content: bytes) -> None:
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                (key, etag, content, time.time()),
+            )
+            (count,) = self._connection.execute(
+                "SELECT COUNT(*) FROM responses"
+            ).fetchone()
+            if count > self.max_entries:
+                self._connection.execute(
+                    "DELETE FROM responses WHERE key IN (SELECT key FROM "
+                    "responses ORDER BY last_used LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._connection.execute("DELETE FROM responses")
+
+    def close(self) -> None:
+        with self._lock, contextlib.suppress(sqlite3.Error):
+            self._connection.close()
+
+
+def request_key(url: str, params: dict) -> str:
+    """Identify a GET request by its URL and (sorted) query parameters."""
+    query = {**parse_qs(urlparse(url).query), **params}
+    return json.dumps(
+        [url.split("?", 1)[0], sorted(query.items())], default=str
+    )
+
+
+def get_json(
+    context,
+    url: str,
+    params: dict,
+    cache: ResponseDiskCache | None = None,
+    offline: bool = False,
+) -> tuple[Any, str]:
+    """GET a metadata response, using and updating cache if given.
+
+    With offline=True the server is not contacted: a cached response is
+    returned as is, or (None, MISSING) if there is none. Otherwise a cached
+    response is revalidated with its ETag.
+    Returns the decoded content and one of the outcomes above.
+    """
+    params = {**parse_qs(urlparse(url).query), **params}
+    key = request_key(url, params)
+    cached = cache.get(key) if cache is not None else None
+    if offline:
+        if cached is None:
+            return None, MISSING
+        return cached.json(), CACHED
+
+    headers = {"Accept": MSGPACK_MIME_TYPE}
+    if cached is not None:
+        headers["If-None-Match"] = cached.etag
+    for attempt in retry_context():
+        with attempt:
+            response = context.http_client.get(
+                url, headers=headers, params=params
+            )
+            if (
+                cached is not None
+                and response.status_code == codes.NOT_MODIFIED
+            ):
+                return cached.json(), NOT_MODIFIED
+            handle_error(response)
+    content = response.json()
+    etag = response.headers.get("ETag")
+    if cache is not None and etag is not None:
+        if response.headers.get("Content-Type") == MSGPACK_MIME_TYPE:
+            raw = response.content
+        else:
+            raw = msgpack.packb(content, datetime=True)
+        cache.put(key, etag, raw)
+    return content, FETCHED
@@ -1,20 +1,41 @@
-import json
 import logging
 from collections import defaultdict
 from collections.abc import Callable, Mapping, Sequence
 from datetime import date, datetime
 from math import ceil
+from typing import NamedTuple
 from urllib.parse import ParseResult
 from urllib.parse import urlparse as _urlparse
 
-from httpx import ConnectError
+from httpx import ConnectError, Timeout, TimeoutException
 from qtpy.QtCore import QObject, Signal
 from tiled.client import from_uri
 from tiled.client.array import ArrayClient
 from tiled.client.base import BaseClient
+from tiled.client.container import Container
+from tiled.client.utils import DEFAULT_TIMEOUT_PARAMS
 from tiled.queries import FullText, Key, Regex
 from tiled.structures.core import StructureFamily
 
+from napari_tiled_browser.models.tiled_array import transfer_rate
+from napari_tiled_browser.models.tiled_cache import LRUCache
+from napari_tiled_browser.models.tiled_disk_cache import ChunkDiskCache
+from napari_tiled_browser.models.tiled_listing import (
+    LISTING_FIELDS,
+    RUN_SUMMARY_COLUMNS,
+    ListingItem,
+    fetch_node,
+)
+from napari_tiled_browser.models.tiled_metadata_index import MetadataIndex
+from napari_tiled_browser.models.tiled_open_policy import (
+    UNSUPPORTED,
+    OpenPlan,
+    OpenPolicy,
+    format_bytes,
+    format_seconds,
+)
+from napari_tiled_browser.models.tiled_response_cache import ResponseDiskCache
+
 _logger = logging.getLogger(__name__)
 _logger.setLevel(logging.DEBUG)
 
@@ -34,6 +55,14 @@ def json_decode(obj):
     return str(obj)
 
 
+class NodeInfo(NamedTuple):
+    """What the info pane shows about a selected node."""
+
+    info_text: str
+    metadata: Mapping
+    load_button_enabled: bool
+
+
 class TiledSelectorSignals(QObject):
     """Collection of signals for a TiledSelector model."""
 
@@ -49,8 +78,14 @@ class TiledSelectorSignals(QObject):
     plottable_image_data_received = Signal(
         ArrayClient,  # node
         str,  # child_node_path
+        OpenPlan,  # how to open it
         name="TiledSelector.plottable_image_data_received",
     )
+    plottable_multiscale_data_received = Signal(
+        object,  # container node of the levels, listed off the GUI thread
+        str,  # child_node_path
+        name="TiledSelector.plottable_multiscale_data_received",
+    )
     table_changed = Signal(
         tuple,  # New node path parts, tuple of strings
         name="TiledSelector.table_changed",
@@ -71,7 +106,12 @@ class TiledSelector:
     """View Model for selecting a Tiled CatalogOfBlueskyRuns."""
 
     Signals = TiledSelectorSignals
+    # Size of the "All" page until the listing has been counted; the table
+    # ends where the listing does
+    UNCOUNTED_PAGE_SIZE = 2**62
     SUPPORTED_TYPES = (StructureFamily.array, StructureFamily.container)
+    # Spec of a container holding the resolution levels of one image
+    MULTISCALES_SPEC = "multiscales"
 
     def __init__(
         self,
@@ -80,7 +120,23 @@ class TiledSelector:
         client: BaseClient = None,
         validators: Mapping[str, list[Callable]] = None,
         parent: QObject | None = None,
-        rows_per_page_options: list[int] | None = None,
+        rows_per_page_options: list[int | None] | None = None,
+        page_cache_size: int = 64,
+        search_cache_size: int = 32,
+        node_cache_size: int = 256,
+        node_cache_ttl: float | None = 300,
+        lazy_count: bool = False,
+        slim_listing: bool | None = None,
+        connect_timeout: float = 5,
+        connect_retries: int = 1,
+        connect_backoff: float = 1.0,
+        multiscale: bool = False,
+        chunk_cache: ChunkDiskCache | None = None,
+        response_cache: ResponseDiskCache | None = None,
+        keyset_pagination: bool = False,
+        summary_columns: Mapping[str, str] | None = None,
+        metadata_index: MetadataIndex | None = None,
+        open_policy: OpenPolicy | None = None,
         *args,
         **kwargs,
     ):
@@ -98,6 +154,9 @@ class TiledSelector:
         self.plottable_image_data_received = (
             self.signals.plottable_image_data_received
         )
+        self.plottable_multiscale_data_received = (
+            self.signals.plottable_multiscale_data_received
+        )
         self.table_changed = self.signals.table_changed
         self.url_changed = self.signals.url_changed
         self.url_validation_error = self.signals.url_validation_error
@@ -108,13 +167,68 @@ class TiledSelector:
         self.node_path_parts = ()
         self._current_page = 0
         if rows_per_page_options is None:
-            self._rows_per_page_options = [5, 10, 25]
+            # None stands for all entries on a single page
+            self._rows_per_page_options = [5, 10, 25, 100, 1000, None]
         else:
             self._rows_per_page_options = rows_per_page_options
         self._rows_per_page_index = 0
         self.search_results = None
+        self.search_query = None
         self.display_search_results = False
 
+        # Listing pages already fetched, keyed by page_key()
+        self.page_cache = LRUCache(maxsize=page_cache_size)
+        # Node handles keyed by their path tuple, see get_parent_node()
+        self.node_cache = LRUCache(maxsize=node_cache_size, ttl=node_cache_ttl)
+        # (search results, length) pairs keyed by search_key()
+        self.search_cache = LRUCache(maxsize=search_cache_size)
+        # Info pane summaries keyed by node_info_key()
+        self.info_cache = LRUCache(maxsize=node_cache_size)
+        # Container/search result lengths keyed by listing_key()
+        self.len_cache = LRUCache(maxsize=node_cache_size)
+        # Display the table before the exact count is known
+        self.lazy_count = lazy_count
+        # List only keys and structure families: always (True), never (False)
+        # or only inside a CatalogOfBlueskyRuns (None)
+        self.slim_listing = slim_listing
+        self.in_run_catalog = False
+        # Seconds to wait for the server to accept a connection, and how
+        # often to start over (connect_backoff seconds later, doubling each
+        # time) once tiled's own retries, bounded by TILED_RETRY_TIMEOUT,
+        # have given up
+        self.connect_timeout = connect_timeout
+        self.connect_retries = connect_retries
+        self.connect_backoff = connect_backoff
+        # Open arrays as multiscale pyramids, and containers with a
+        # "multiscales" spec as images
+        self.multiscale = multiscale
+        # Persistent cache of the array chunks of opened nodes, if any
+        self.chunk_cache = chunk_cache
+        # Persistent cache of listing and node responses, if any
+        self.response_cache = response_cache
+        # Fetch pages from cursors the server gave for neighboring pages,
+        # and the last page as the first in reverse order, so that deep
+        # pages cost no more than the first one
+        self.keyset_pagination = keyset_pagination
+        # Listing cursors keyed by listing_key() + (offset, reverse), see
+        # TiledWorker
+        self.page_cursors = LRUCache(maxsize=node_cache_size)
+        # Columns shown for the runs of a CatalogOfBlueskyRuns: names and
+        # metadata paths, fetched with the listing
+        if summary_columns is None:
+            summary_columns = RUN_SUMMARY_COLUMNS
+        self.summary_columns = dict(summary_columns)
+        # (column name, 1 or -1) sorting the table on the server, if any
+        self.sorting = None
+        # Local index of the metadata seen so far, if any, answering
+        # searches before the server does
+        self.metadata_index = metadata_index
+        # (key, ListingItem) pairs found in metadata_index for search_query,
+        # shown until the server's results arrive
+        self.local_results = None
+        # Chooses how arrays are opened, from their size
+        self.open_policy = open_policy or OpenPolicy()
+
     @property
     def url(self) -> str:
         """URL for accessing tiled server data."""
@@ -142,17 +256,194 @@ class TiledSelector:
         """Do not directly replace the root Tiled client."""
         raise NotImplementedError("Call connect_client() instead")
 
+    @property
+    def all_on_one_page(self) -> bool:
+        """Whether every entry is shown on one scrollable page."""
+        return self._rows_per_page_options[self._rows_per_page_index] is None
+
     @property
     def rows_per_page(self):
-        return self._rows_per_page_options[self._rows_per_page_index]
+        rows_per_page = self._rows_per_page_options[self._rows_per_page_index]
+        if rows_per_page is None:
+            # Show every entry on one scrollable page, without counting
+            # them here on the GUI thread
+            node_len = self.node_len_hint
+            if node_len is None:
+                return self.UNCOUNTED_PAGE_SIZE
+            return max(node_len, 1)
+        return rows_per_page
 
     @property
     def node_len(self):
-        """Convenience function for returning total length of node/search result."""
+        """Convenience function for returning total length of node/search result.
+
+        The length is memoized until navigation, a new search or a live
+        child-created event invalidates it.
+        """
+        if self.local_results is not None:
+            return len(self.local_results)
+        key = self.listing_key()
+        length = self.len_cache.get(key)
+        if length is None:
+            length = len(self.get_current_listing())
+            self.len_cache.put(key, length)
+        return length
+
+    @property
+    def node_len_hint(self) -> int | None:
+        """Memoized length of the current listing, or None if not yet known."""
+        return self.len_cache.get(self.listing_key())
+
+    def get_current_listing(self) -> BaseClient:
+        """Fetch the client whose entries populate the table."""
         if self.search_results is not None and self.display_search_results:
-            return len(self.search_results)
+            return self.search_results
+        return self.get_current_node()
+
+    def listing_key(self) -> tuple:
+        """Key identifying the current node listing or search result."""
+        server = self.client.uri if self.client is not None else self.url
+        if self.local_results is not None:
+            query = ("local",) + self.search_query
+        elif self.search_results is not None and self.display_search_results:
+            query = self.search_query
         else:
-            return len(self.get_current_node())
+            query = None
+        if self.sorting is not None:
+            # Ordered differently from the plain listing
+            query = (query, self.sorting)
+        return (server, self.node_path_parts, query)
+
+    @property
+    def listing_fields(self) -> tuple[str] | None:
+        """Fields requested for each table entry, or None for full items."""
+        if self.slim_listing or (
+            self.slim_listing is None and self.in_run_catalog
+        ):
+            return LISTING_FIELDS
+        return None
+
+    @property
+    def table_columns(self) -> dict[str, str]:
+        """Summary columns of the table, by name, with metadata paths."""
+        return self.summary_columns if self.in_run_catalog else {}
+
+    @property
+    def listing_sorting(self) -> list[tuple[str, int]] | None:
+        """Sorting of the listing, by metadata path, for Container.sort()."""
+        if self.sorting is None:
+            return None
+        column, direction = self.sorting
+        return [(self.table_columns[column], direction)]
+
+    def sort_by(self, column: str | None, direction: int = 1) -> None:
+        """Sort the table by a summary column, or restore the usual order.
+
+        Emits the 'table_changed' signal."""
+        sorting = None
+        if column in self.table_columns:
+            sorting = (column, direction)
+        if sorting == self.sorting:
+            return
+        self.sorting = sorting
+        self._current_page = 0
+        self.table_changed.emit(self.node_path_parts)
+
+    def page_key(self, page: int) -> tuple:
+        """Key identifying one page of the current listing in page_cache."""
+        rows_per_page = self.rows_per_page
+        return self.block_key(page * rows_per_page, rows_per_page)
+
+    def block_key(self, offset: int, limit: int) -> tuple:
+        """Key identifying a run of entries of the current listing."""
+        return self.listing_key() + (offset, limit)
+
+    def invalidate_node_len(self, node_path_parts: tuple[str]) -> None:
+        """Forget memoized lengths for any listing of the given node."""
+        node_path_parts = tuple(node_path_parts)
+        self.len_cache.invalidate(lambda key: key[1] == node_path_parts)
+
+    def on_child_created(
+        self,
+        node_path_parts: tuple[str],
+        key: str | None = None,
+        node: BaseClient | None = None,
+    ) -> int | None:
+        """Handle a live notification that a node gained a child.
+
+        Given the key and node of the new child, it is appended to the
+        cached plain listing and count of the node, without new requests,
+        and its position in the listing is returned. Sorted listings and
+        search results, which may place it anywhere or not at all, are
+        forgotten, as is the whole listing if key is not given or its
+        length is not known. Returns None unless the child was appended.
+        """
+        node_path_parts = tuple(node_path_parts)
+        server = self.client.uri if self.client is not None else self.url
+        listing = (server, node_path_parts, None)
+        length = self.len_cache.get(listing)
+
+        def stale(cache_key):
+            return cache_key[1] == node_path_parts and (
+                length is None or cache_key[2] is not None
+            )
+
+        if key is None:
+            length = None
+            self.page_cursors.invalidate(stale)
+        self.len_cache.invalidate(stale)
+        self.page_cache.invalidate(stale)
+        self.search_cache.invalidate(
+            lambda cache_key: cache_key[1] == node_path_parts
+        )
+        if length is None:
+            return None
+
+        blocks = [
+            (block_key, items)
+            for block_key, items in self.page_cache.items()
+            if block_key[:3] == listing
+        ]
+        if any(k == key for _, items in blocks for k, _ in items):
+            # Replayed, and listed already
+            return None
+        # Children are listed in order of creation: the new one goes last
+        entry = (key, node)
+        self.len_cache.put(listing, length + 1)
+        for block_key, items in blocks:
+            offset, limit = block_key[3:]
+            if offset + len(items) == length and len(items) < limit:
+                # Now as a request for the block would return it
+                items.append(entry)
+        self.remember_nodes(node_path_parts, [entry])
+        return length
+
+    def on_child_metadata_updated(
+        self,
+        node_path_parts: tuple[str],
+        key: str,
+        metadata: dict,
+        specs: list | None = None,
+    ) -> None:
+        """Apply a live update of a child's metadata to the cached nodes."""
+        node_path_parts = tuple(node_path_parts)
+        nodes = [self.node_cache.get(node_path_parts + (key,))]
+        for block_key, items in self.page_cache.items():
+            if block_key[1] == node_path_parts:
+                nodes.extend(node for k, node in items if k == key)
+        unique = {id(node): node for node in nodes if node is not None}
+        for node in unique.values():
+            attrs = node.item["attributes"]
+            # Slim listings only have some of the attributes
+            if getattr(node, "summary", None) is not None:
+                # Summarized from the new metadata from now on
+                node.summary = None
+                attrs["metadata"] = metadata
+            elif "metadata" in attrs:
+                attrs["metadata"] = metadata
+            if specs is not None and "specs" in attrs:
+                attrs["specs"] = [spec.dict() for spec in specs]
+        self.info_cache.pop(self.node_info_key(node_path_parts + (key,)))
 
     def is_catalog_of_bluesky_runs(self, node):
         specs = node.item["attributes"]["specs"]
@@ -163,6 +454,10 @@ class TiledSelector:
                 pass
         return False
 
+    def is_multiscales(self, node):
+        specs = node.item["attributes"]["specs"] or []
+        return any(spec["name"] == self.MULTISCALES_SPEC for spec in specs)
+
     def on_url_text_edited(self, new_text: str):
         """Handle a notification that the URL is being edited."""
         _logger.debug("TiledSelector.on_url_text_edited()...")
@@ -203,18 +498,31 @@ class TiledSelector:
         Emits the 'client_connection_error' signal when client does not connect.
         """
         try:
-            new_client = self.client_from_url(self.url)
-        except ConnectError as exception:
-            error_message = str(exception)
-            _logger.error(error_message)
-            self.client_connection_error.emit(error_message)
+            new_client = self.client_from_url(
+                self.url, connect_timeout=self.connect_timeout
+            )
+        except (ConnectError, TimeoutException) as exception:
+            self.report_connection_error(str(exception))
             return
 
+        self.set_client(new_client)
+
+    def set_client(self, new_client: BaseClient) -> None:
+        """Adopt a client connected elsewhere, e.g. in a background thread.
+
+        Emits the 'client_connected' signal.
+        """
         self._client = new_client
+        self.invalidate_node_cache()
         self.client_connected.emit(
             self._client.uri, str(self._client.context.api_uri)
         )
 
+    def report_connection_error(self, error_message: str) -> None:
+        """Emits the 'client_connection_error' signal."""
+        _logger.error(error_message)
+        self.client_connection_error.emit(error_message)
+
     def reset_client_view(self) -> None:
         """Prepare the model to receive content from a Tiled server.
 
@@ -222,6 +530,9 @@ class TiledSelector:
         """
         self.node_path_parts = ()
         self._current_page = 0
+        self.in_run_catalog = False
+        self.sorting = None
+        self.local_results = None
         if self.client is not None:
             self.table_changed.emit(self.node_path_parts)
 
@@ -236,29 +547,77 @@ class TiledSelector:
 
     def on_item_selected(self, child_node_path):
         node_path_parts = self.node_path_parts + (child_node_path,)
-        # node_offset = self.rows_per_page * self._current_page
-        node = self.get_parent_node(node_path_parts)
+        info = self.get_node_info(node_path_parts)
+
+        self.info_text = info.info_text
+        self.selected_metadata = info.metadata
+        self.load_button_enabled = info.load_button_enabled
 
-        # if self.is_catalog_of_bluesky_runs(node):
-        #     self.load_button_enabled = True
-        # else:
-        #     self.load_button_enabled = False
+    def get_node_info(
+        self, node_path_parts: tuple[str], revalidate: bool = False
+    ) -> "NodeInfo":
+        """Summarize a node for the info pane.
 
+        Summaries are cached per node. On a miss this may need to fetch the
+        node, so call it from a worker thread when possible. With revalidate,
+        a node kept in response_cache is checked against the server first.
+        """
+        key = self.node_info_key(node_path_parts)
+        if not revalidate:
+            info = self.info_cache.get(key)
+            if info is not None:
+                return info
+
+        node_path_parts = tuple(node_path_parts)
+        if revalidate and self.response_cache is not None and node_path_parts:
+            node = fetch_node(
+                self.client, node_path_parts, self.response_cache
+            )
+            self.node_cache.put(node_path_parts, node)
+        else:
+            node = self.get_parent_node(node_path_parts)
         attrs = node.item["attributes"]
         family = attrs["structure_family"]
-        metadata = json.dumps(attrs["metadata"], indent=2, default=json_decode)
 
-        info = f"<b>type:</b> {family}<br>"
+        info_text = f"<b>type:</b> {family}<br>"
+        load_button_enabled = family in self.SUPPORTED_TYPES
         if family == StructureFamily.array:
             shape = attrs["structure"]["shape"]
-            info += f"<b>shape:</b> {tuple(shape)}<br>"
-        info += f"<b>metadata:</b> {metadata}"
-        self.info_text = info
+            info_text += f"<b>shape:</b> {tuple(shape)}<br>"
+            plan = self.plan_open(node)
+            info_text += (
+                f"<b>size:</b> {format_bytes(plan.nbytes)} ({node.dtype})<br>"
+            )
+            if plan.mode == UNSUPPORTED:
+                info_text += "<b>opens:</b> no, fewer than 2 dimensions<br>"
+                load_button_enabled = False
+            else:
+                info_text += (
+                    f"<b>opens:</b> {plan.mode}, reading "
+                    f"{format_bytes(plan.first_bytes)} first "
+                    f"({format_seconds(plan.seconds)})<br>"
+                )
+        metadata = attrs["metadata"] or {}
+        info_text += f"<b>metadata:</b> {len(metadata)} keys"
+
+        info = NodeInfo(
+            info_text=info_text,
+            metadata=metadata,
+            load_button_enabled=load_button_enabled,
+        )
+        self.info_cache.put(key, info)
+        if self.metadata_index is not None and node_path_parts:
+            self.metadata_index.add(
+                key[0],
+                node_path_parts[:-1],
+                [(node_path_parts[-1], node.item)],
+            )
+        return info
 
-        if family in self.SUPPORTED_TYPES:
-            self.load_button_enabled = True
-        else:
-            self.load_button_enabled = False
+    def node_info_key(self, node_path_parts: tuple[str]) -> tuple:
+        """Key identifying a node summary in info_cache."""
+        server = self.client.uri if self.client is not None else self.url
+        return (server, tuple(node_path_parts))
 
     # def open_catalog(self, child_node_path):
     #     self.selected_catalog_path = self.node_path_parts + (child_node_path,)
@@ -278,6 +637,8 @@ class TiledSelector:
             self.table_changed.emit(self.node_path_parts)
 
     def on_next_page_clicked(self):
+        if self.all_on_one_page:
+            return
         rows_per_page = self.rows_per_page
         if (
             self._current_page * rows_per_page
@@ -286,6 +647,8 @@ class TiledSelector:
             self.table_changed.emit(self.node_path_parts)
 
     def on_last_page_clicked(self):
+        if self.all_on_one_page:
+            return
         # NOTE: math.ceil gives the wrong answer for really large numbers
         # Solution 4 in this answer: https://stackoverflow.com/a/54585138
         self._current_page = ceil(self.node_len / self.rows_per_page) - 1
@@ -296,19 +659,68 @@ class TiledSelector:
         # node_offset = self.rows_per_page * self._current_page
         return self.get_parent_node(self.node_path_parts)
 
-    def get_parent_node(self, node_path_parts: tuple[str]) -> list:
-        """Fetch a node from Tiled corresponding to the node path."""
+    def get_parent_node(self, node_path_parts: tuple[str]) -> BaseClient:
+        """Fetch a node from Tiled corresponding to the node path.
+
+        Node handles are kept in node_cache. A cache miss is resolved with a
+        single request relative to the deepest cached ancestor.
+        """
         _logger.debug("TiledSelector.get_parent_node(%s)...", node_path_parts)
-        # NOTE: Passing tiled a tuple returns a list of bluesky runs
-        # even if there is only one item in the tuple
-        # This may change in the future when the capability to pass a list
-        # of uids to tiled is removed
-        client = self.client
-        # Walk down one node at a time (slow, but safe).
-        for segment in node_path_parts:
-            client = client[segment]
+        node_path_parts = tuple(node_path_parts)
+        if not node_path_parts:
+            # An empty tuple indicates the root node
+            return self.client
+
+        node = self.node_cache.get(node_path_parts)
+        if node is not None:
+            return node
+
+        if self.response_cache is not None:
+            # What the last session saw, if anything; fresh listings of the
+            # parent replace it through remember_nodes()
+            node = fetch_node(
+                self.client, node_path_parts, self.response_cache, offline=True
+            )
+            if node is None:
+                node = fetch_node(
+                    self.client, node_path_parts, self.response_cache
+                )
+            self.node_cache.put(node_path_parts, node)
+            return node
+
+        ancestor = self.client
+        depth = 0
+        for index in range(len(node_path_parts) - 1, 0, -1):
+            cached = self.node_cache.get(node_path_parts[:index])
+            if cached is not None:
+                ancestor, depth = cached, index
+                break
 
-        return client
+        # NOTE: Passing tiled a tuple returns a list of bluesky runs
+        # even if there is only one item in the tuple, so bypass that
+        # convenience and use the generic lookup, which tiled elides into a
+        # single request for the whole remaining path
+        node = Container.__getitem__(ancestor, node_path_parts[depth:])
+        self.node_cache.put(node_path_parts, node)
+        return node
+
+    def remember_nodes(self, node_path_parts: tuple[str], items) -> None:
+        """Cache node handles for (key, node) pairs listed under a path."""
+        for key, node in items:
+            if getattr(node, "context", None) is None:
+                # Placeholders cannot stand in for a real node handle
+                continue
+            self.node_cache.put(tuple(node_path_parts) + (key,), node)
+
+    def invalidate_node_cache(
+        self, node_path_parts: tuple[str] | None = None
+    ) -> None:
+        """Drop cached node handles at and below a path (or all of them)."""
+        if node_path_parts is None:
+            self.node_cache.clear()
+            return
+        prefix = tuple(node_path_parts)
+        self.node_cache.invalidate(lambda key: key[: len(prefix)] == prefix)
 
     # @functools.lru_cache(maxsize=1)
     def get_node(self, node_path_parts: tuple[str], node_offset: int) -> list:
@@ -334,13 +746,14 @@ class TiledSelector:
         _logger.info("Entering node...")
         self.node_path_parts += (child_node_path,)
         self._current_page = 0
-
-        node = self.client[self.node_path_parts]
-        if self.is_catalog_of_bluesky_runs(node):
-            # Only display search results if we are in a CatalogOfBlueskyRuns
-            self.display_search_results = True
-        else:
-            self.display_search_results = False
+        self.invalidate_node_len(self.node_path_parts)
+
+        node = self.get_current_node()
+        self.in_run_catalog = self.is_catalog_of_bluesky_runs(node)
+        self.sorting = None
+        self.local_results = None
+        # Only display search results if we are in a CatalogOfBlueskyRuns
+        self.display_search_results = self.in_run_catalog
         self.table_changed.emit(self.node_path_parts)
 
     def exit_node(self) -> None:
@@ -350,12 +763,13 @@ class TiledSelector:
         _logger.info("Exiting node...")
         self.node_path_parts = self.node_path_parts[:-1]
         self._current_page = 0
-        node = self.client[self.node_path_parts]
-        if self.is_catalog_of_bluesky_runs(node):
-            # Only display search results if we are in a CatalogOfBlueskyRuns
-            self.display_search_results = True
-        else:
-            self.display_search_results = False
+        self.invalidate_node_len(self.node_path_parts)
+        node = self.get_current_node()
+        self.in_run_catalog = self.is_catalog_of_bluesky_runs(node)
+        self.sorting = None
+        self.local_results = None
+        # Only display search results if we are in a CatalogOfBlueskyRuns
+        self.display_search_results = self.in_run_catalog
         self.table_changed.emit(self.node_path_parts)
 
     def jump_to_node(self, index) -> None:
@@ -365,23 +779,37 @@ class TiledSelector:
         _logger.info("Jumping to node at index %d...", index)
         self.node_path_parts = self.node_path_parts[:index]
         self._current_page = 0
-        node = self.client[self.node_path_parts]
-        if self.is_catalog_of_bluesky_runs(node):
-            # Only display search results if we are in a CatalogOfBlueskyRuns
-            self.display_search_results = True
-        else:
-            self.display_search_results = False
+        self.invalidate_node_len(self.node_path_parts)
+        node = self.get_current_node()
+        self.in_run_catalog = self.is_catalog_of_bluesky_runs(node)
+        self.sorting = None
+        self.local_results = None
+        # Only display search results if we are in a CatalogOfBlueskyRuns
+        self.display_search_results = self.in_run_catalog
         self.table_changed.emit(self.node_path_parts)
 
     def open_node(self, child_node_path: str) -> None:
         """Select a child node if its Tiled structure_family is supported."""
-        node = self.get_current_node()[child_node_path]
+        node = self.get_parent_node(self.node_path_parts + (child_node_path,))
         _logger.debug("New node: %s", node.uri)
         family = node.item["attributes"]["structure_family"]
 
         if family == StructureFamily.array:
-            _logger.info("  Found array, plotting")
-            self.plottable_image_data_received.emit(node, child_node_path)
+            plan = self.plan_open(node)
+            if plan.mode == UNSUPPORTED:
+                _logger.info("  Cannot show an array of shape %s", node.shape)
+                return
+            _logger.info("  Found array, plotting (%s)", plan.mode)
+            self.plottable_image_data_received.emit(
+                node, child_node_path, plan
+            )
+        elif (
+            family == StructureFamily.container
+            and self.multiscale
+            and self.is_multiscales(node)
+        ):
+            _logger.info("  Found multiscale image, plotting")
+            self.plottable_multiscale_data_received.emit(node, child_node_path)
         elif family == StructureFamily.container:
             _logger.debug("Entering container: %s", child_node_path)
             self.enter_node(child_node_path)
@@ -389,32 +817,101 @@ class TiledSelector:
             _logger.info("StructureFamily not supported: %s", family)
             # TODO: Emit an error signal for dialog widget to respond to
 
+    def plan_open(self, node: ArrayClient) -> OpenPlan:
+        """Choose how to open an array node, without reading any data."""
+        return self.open_policy.plan(
+            node.item["attributes"]["structure"],
+            transfer_rate.bytes_per_second,
+        )
+
     def search(self, key, value, search_type):
         """Perform Tiled search."""
-        if self.node_path_parts:
-            _client = self.client[self.node_path_parts]
+        query = self.build_query(key, value, search_type)
+        if query is None:
+            results = None
         else:
-            _client = self.client
-        self.display_search_results = True
+            results = self.get_current_node().search(query)
+        self.set_search_results(results, (search_type, key, value))
+
+    def build_query(self, key, value, search_type):
+        """Translate the search widget's fields into a Tiled query."""
         if search_type == "key_value":
-            results = _client.search(Key(key) == value)
+            return Key(key) == value
         elif search_type == "full_text":
-            results = _client.search(FullText(value))
+            return FullText(value)
         elif search_type == "regex":
-            results = _client.search(Regex(key, pattern=value))
-        else:
-            _logger.info("Unknown search type %s. Returning...", search_type)
-            results = None
-            self.display_search_results = False
+            return Regex(key, pattern=value)
+        _logger.info("Unknown search type %s. Returning...", search_type)
+        return None
+
+    def local_search(self, key, value, search_type) -> list | None:
+        """Search the children of the current node in metadata_index.
+
+        Returns (key, ListingItem) pairs, or None if there is no index or
+        it cannot answer the search.
+        """
+        if self.metadata_index is None:
+            return None
+        server = self.client.uri if self.client is not None else self.url
+        items = self.metadata_index.search(
+            server, self.node_path_parts, key, value, search_type
+        )
+        if items is None:
+            return None
+        return [(key, ListingItem(item)) for key, item in items]
+
+    def set_local_search_results(
+        self, entries: list, search_query: tuple
+    ) -> None:
+        """Display the results of local_search() until the server's arrive.
+
+        Emits the 'table_changed' signal."""
+        self.local_results = list(entries)
+        self.search_query = search_query
+        self.display_search_results = True
+        self._current_page = 0
+        self.len_cache.put(self.listing_key(), len(self.local_results))
+        self.table_changed.emit(self.node_path_parts)
+
+    def search_key(self, key, value, search_type) -> tuple:
+        """Key identifying a search of the current node in search_cache."""
+        server = self.client.uri if self.client is not None else self.url
+        return (server, self.node_path_parts, search_type, key, value)
+
+    def set_search_results(
+        self,
+        results: BaseClient | None,
+        search_query: tuple,
+        length: int | None = None,
+    ) -> None:
+        """Display search results (or the plain node, if results is None).
+
+        Emits the 'table_changed' signal."""
+        self.local_results = None
+        self.display_search_results = results is not None
         self.search_results = results
+        self.search_query = search_query if results is not None else None
+        self.invalidate_node_len(self.node_path_parts)
+        if results is not None and length is not None:
+            search_type, key, value = search_query
+            self.search_cache.put(
+                self.search_key(key, value, search_type), (results, length)
+            )
+            self.len_cache.put(self.listing_key(), length)
         self.table_changed.emit(self.node_path_parts)
 
     @staticmethod
-    def client_from_url(url: str):
+    def client_from_url(url: str, connect_timeout: float | None = None):
         """Create a Tiled client that is connected to the requested URL."""
         _logger.debug("TiledSelector.client_from_url()...")
 
-        return from_uri(url)
+        timeout = None
+        if connect_timeout is not None:
+            # Only connecting is bounded; reads keep tiled's own timeout
+            timeout = Timeout(
+                **{**DEFAULT_TIMEOUT_PARAMS, "connect": connect_timeout}
+            )
+        return from_uri(url, timeout=timeout)
 
 
 def urlparse(url: str) -> ParseResult:
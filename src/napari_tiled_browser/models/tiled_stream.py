@@ -0,0 +1,299 @@
+"""One asyncio event loop for every Tiled websocket subscription.
+
+tiled's Subscription.start() blocks a thread per websocket. StreamLoop
+instead runs a single background thread with an asyncio loop, and follows
+each subscription's websocket in a task on it. The Subscription objects
+are still used to parse messages and run their callbacks, so subscribers
+see no difference. Thousands of nodes cost thousands of sockets but one
+thread.
+"""
+
+import asyncio
+import concurrent.futures
+import logging
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, replace
+
+import httpx
+import websockets.exceptions
+from pydantic import ValidationError
+from tiled.client.stream import (
+    API_KEY_LIFETIME,
+    Subscription,
+    UnparseableMessage,
+    parse_schema,
+    parse_update,
+)
+from websockets.asyncio.client import connect
+
+_logger = logging.getLogger(__name__)
+
+# States of a subscription
+CONNECTING = "connecting"
+LIVE = "live"
+RECONNECTING = "reconnecting"
+CLOSED = "closed"  # the server ended the stream
+FAILED = "failed"  # gave up, see error
+STOPPED = "stopped"  # removed by us
+
+# Close code sent when a message exceeds max_size
+MESSAGE_TOO_BIG = 1009
+
+
+@dataclass(frozen=True)
+class SubscriptionHealth:
+    state: str = CONNECTING
+    received: int = 0  # updates received
+    last_sequence: int | None = None
+    last_message: float | None = None  # time.time() of the latest message
+    reconnects: int = 0
+    error: str | None = None  # the latest connection error
+
+
+class StreamLoop:
+    """Background asyncio loop following any number of subscriptions.
+
+    Connections are retried with exponential backoff, resuming after the
+    last sequence received, and at most max_connecting are being set up
+    at once. on_health, if given, is called from the loop's thread with a
+    subscription's path and SubscriptionHealth whenever its state changes.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 2**24,
+        max_connecting: int = 16,
+        backoff: float = 0.5,
+        max_backoff: float = 30.0,
+        on_health: Callable[[str, SubscriptionHealth], None] | None = None,
+    ):
+        self.max_size = max_size
+        self.max_connecting = max_connecting
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.on_health = on_health
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        # Subscription -> asyncio task following it
+        self._tasks = {}
+        # Subscription path -> SubscriptionHealth
+        self._health = {}
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._tasks)
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(
+                target=self._run,
+                args=(self._loop,),
+                name="tiled-stream-loop",
+                daemon=True,
+            )
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Close every websocket, then stop the loop and join its thread."""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if thread is None:
+            return
+        future = asyncio.run_coroutine_threadsafe(self._cancel_all(), loop)
+        try:
+            future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            # Not the builtin TimeoutError before Python 3.11
+            _logger.warning("Timed out closing Tiled subscriptions")
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout)
+
+    def add(self, sub: Subscription, start: int | None = None) -> None:
+        """Follow sub, replaying from sequence number start if given."""
+        self.start()
+        asyncio.run_coroutine_threadsafe(self._add(sub, start), self._loop)
+
+    def remove(self, sub: Subscription) -> None:
+        with self._lock:
+            task = self._tasks.get(sub)
+            loop = self._loop
+        if task is not None and loop is not None:
+            loop.call_soon_threadsafe(task.cancel)
+
+    def health(self) -> dict[str, SubscriptionHealth]:
+        "Latest health of every subscription, by path"
+        with self._lock:
+            return dict(self._health)
+
+    def _run(self, loop):
+        asyncio.set_event_loop(loop)
+        self._connecting = asyncio.Semaphore(self.max_connecting)
+        try:
+            loop.run_forever()
+        finally:
+            loop.close()
+
+    async def _add(self, sub, start):
+        task = asyncio.create_task(self._follow(sub, start))
+        with self._lock:
+            self._tasks[sub] = task
+        task.add_done_callback(lambda _: self._forget(sub, task))
+
+    def _forget(self, sub, task):
+        path = "/".join(sub.segments)
+        with self._lock:
+            if self._tasks.get(sub) is task:
+                del self._tasks[sub]
+            # Keep the health of subscriptions that ended on their own
+            health = self._health.get(path)
+            if health is not None and health.state == STOPPED:
+                del self._health[path]
+
+    async def _cancel_all(self):
+        with self._lock:
+            tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _report(self, sub, **changes):
+        path = "/".join(sub.segments)
+        with self._lock:
+            old = self._health.get(path)
+            health = replace(old or SubscriptionHealth(), **changes)
+            self._health[path] = health
+        if self.on_health is not None and (
+            old is None or health.state != old.state
+        ):
+            self.on_health(path, health)
+        return health
+
+    async def _follow(self, sub, start):
+        """Receive the updates of sub until its stream ends or is removed."""
+        sequence = None
+        failures = 0
+        reconnects = 0
+        try:
+            while True:
+                try:
+                    # Resume after the last update received, if any
+                    resume = start if sequence is None else sequence + 1
+                    async with self._connecting:
+                        websocket = await self._connect(sub, resume)
+                    failures = 0
+                    self._report(sub, state=LIVE, error=None)
+                    async with websocket:
+                        async for update in self._receive(sub, websocket):
+                            sequence = update.sequence
+                    # The server closed the stream normally
+                    self._report(sub, state=CLOSED)
+                    sub.stream_closed.process(sub)
+                    return
+                except websockets.exceptions.ConnectionClosedError as exc:
+                    if (
+                        exc.sent is not None
+                        and exc.sent.code == MESSAGE_TOO_BIG
+                    ):
+                        _logger.error(
+                            "A message to %s exceeds %d bytes",
+                            sub,
+                            self.max_size,
+                        )
+                        self._report(sub, state=FAILED, error=str(exc))
+                        return
+                    error = exc
+                except (
+                    OSError,
+                    httpx.HTTPError,
+                    websockets.exceptions.InvalidHandshake,
+                ) as exc:
+                    error = exc
+                failures += 1
+                reconnects += 1
+                self._report(
+                    sub,
+                    state=RECONNECTING,
+                    error=str(error),
+                    reconnects=reconnects,
+                )
+                delay = min(
+                    self.backoff * 2 ** (failures - 1), self.max_backoff
+                )
+                _logger.debug(
+                    "Reconnecting to %s in %.1f s: %s", sub, delay, error
+                )
+                await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self._report(sub, state=STOPPED)
+            raise
+        finally:
+            sub.disconnected.process(sub)
+
+    def _health_of(self, sub):
+        with self._lock:
+            return self._health.get(
+                "/".join(sub.segments), SubscriptionHealth()
+            )
+
+    async def _connect(self, sub, start):
+        self._report(sub, state=CONNECTING)
+        context = sub.context
+        headers = {}
+        key_info = None
+        if context.server_info.authentication.providers:
+            # A short-lived API key authenticates the websocket, as in tiled
+            key_info = await asyncio.to_thread(
+                context.create_api_key,
+                expires_in=API_KEY_LIFETIME,
+                note="websocket",
+            )
+            headers["Authorization"] = f"Apikey {key_info['secret']}"
+        elif context.api_key:
+            headers["Authorization"] = f"Apikey {context.api_key}"
+        # The websocket URI that tiled built for sub
+        uri = sub._uri
+        if start is not None:
+            uri = uri.copy_set_param("start", start)
+        try:
+            return await connect(
+                str(uri), additional_headers=headers, max_size=self.max_size
+            )
+        finally:
+            if key_info is not None:
+                await asyncio.to_thread(
+                    context.revoke_api_key, key_info["first_eight"]
+                )
+
+    async def _receive(self, sub, websocket):
+        """Hand the updates of websocket to sub, and yield them."""
+        schema = None
+        received = self._health_of(sub).received
+        async for data in websocket:
+            try:
+                if schema is None:
+                    schema = parse_schema(data)
+                    continue
+                update = parse_update(sub, data, schema)
+            except (UnparseableMessage, ValidationError, ValueError):
+                _logger.exception("Ignoring a message to %s", sub)
+                continue
+            received += 1
+            self._report(
+                sub,
+                received=received,
+                last_sequence=update.sequence,
+                last_message=time.time(),
+            )
+            sub.process(update)
+            yield update
@@ -1,10 +1,35 @@
-from qtpy.QtCore import QObject, QRunnable, QThread, QThreadPool, Signal
+import contextlib
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+
+from qtpy.QtCore import (
+    QObject,
+    QRunnable,
+    Qt,
+    QThreadPool,
+    QTimer,
+    Signal,
+)
 from tiled.client.stream import (
     ArraySubscription,
     ContainerSubscription,
     Subscription,
 )
 
+from napari_tiled_browser.models.tiled_live import (
+    LiveArrayBuffer,
+    read_missed,
+    read_patch,
+)
+from napari_tiled_browser.models.tiled_stream import StreamLoop
+from napari_tiled_browser.models.tiled_subscription_policy import (
+    SubscriptionPolicy,
+)
+
+_logger = logging.getLogger(__name__)
+
 
 class QtExecutor:
     "Wrap QThreadPool in a concurrent.futures.Executor API"
@@ -22,46 +47,151 @@ class QtExecutor:
         pass
 
 
+class SerialExecutor(QtExecutor):
+    """Run tasks in the global QThreadPool one at a time, in order.
+
+    Each subscription has its own, so that its updates are handled in
+    sequence while different subscriptions proceed in parallel.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._tasks = deque()
+        self._lock = threading.Lock()
+        self._running = False
+
+    def submit(self, f, *args):
+        with self._lock:
+            self._tasks.append((f, args))
+            if self._running:
+                return
+            self._running = True
+        super().submit(self._drain)
+
+    def _drain(self):
+        while True:
+            with self._lock:
+                if not self._tasks:
+                    self._running = False
+                    return
+                f, args = self._tasks.popleft()
+            try:
+                f(*args)
+            except Exception:
+                _logger.exception("Error handling a Tiled update")
+
+
 class QtTiledSubscription(QObject):
     stream_closed = Signal(object)
     disconnected = Signal(object)
 
-    def __init__(self, subscription: Subscription):
+    def __init__(self, subscription: Subscription, start: int | None = 1):
         super().__init__()
         self.sub = subscription
+        # Sequence number of the latest update handled; None until the first
+        # one if we start with live updates only
+        self.sequence = None if start is None else start - 1
 
-        self.mapping = {
-            "stream_closed": self.stream_closed,
-            "disconnected": self.disconnected,
-        }
+        self.mapping = {}
 
-        self.sub.stream_closed.add_callback(self._emit)
-        self.sub.disconnected.add_callback(self._emit)
+        # These callbacks are given the Subscription, not an update
+        self.sub.stream_closed.add_callback(self._emit_stream_closed)
+        self.sub.disconnected.add_callback(self._emit_disconnected)
 
     def _emit(self, update):
         self.mapping[update.type].emit(update)
 
+    def _missed(self, update) -> range | None:
+        """Sequence numbers missed just before update, handled in order.
+
+        Returns usually none, or None if update was handled already.
+        """
+        if self.sequence is None:
+            return range(0)
+        if update.sequence <= self.sequence:
+            return None
+        missed = range(self.sequence + 1, update.sequence)
+        if missed:
+            _logger.warning(
+                "Missed updates %d-%d of %s",
+                missed.start,
+                missed.stop - 1,
+                "/".join(self.sub.segments),
+            )
+        return missed
+
+    @contextlib.contextmanager
+    def _handling(self, update):
+        """Record update as handled, unless handling it fails.
+
+        A failed update counts as missed, so the next one makes up for it.
+        """
+        try:
+            yield
+        except Exception:
+            if self.sequence is None:
+                self.sequence = update.sequence - 1
+            raise
+        self.sequence = update.sequence
+
+    def _emit_stream_closed(self, sub):
+        self.stream_closed.emit(sub)
+
+    def _emit_disconnected(self, sub):
+        self.disconnected.emit(sub)
+
 
 class QtArraySubscription(QtTiledSubscription):
-    new_data = Signal(object)  # emits LiveArrayData/LiveArrayRef
+    new_data = Signal(str, object)  # child node path; ArrayPatch
 
-    def __init__(self, subscription: ArraySubscription):
-        super().__init__(subscription)
-        self.mapping.update(
-            {
-                "array-data": self.new_data,
-                "array-ref": self.new_data,
-            }
-        )
-        self.sub.new_data.add_callback(self._emit)
+    def __init__(
+        self,
+        subscription: ArraySubscription,
+        chunks=None,
+        start: int | None = 1,
+        shape=None,
+    ):
+        super().__init__(subscription, start)
+        self.path = "/".join(subscription.segments)
+        # Chunks of the array when subscribing, to place block writes
+        self.chunks = chunks
+        # Shape after the latest update, to recognize appends
+        self._shape = shape
+        self.sub.new_data.add_callback(self._emit_patch)
+
+    def _emit_patch(self, update):
+        # This runs in the thread pool, in order: decode and download here,
+        # not in the GUI thread
+        missed = self._missed(update)
+        if missed is None:
+            return
+        with self._handling(update):
+            patch = read_patch(update, self._shape, self.chunks)
+            fill = None
+            if missed:
+                # Read what the missed updates wrote, rather than replaying
+                fill = read_missed(self.sub, patch, self._shape)
+        if fill is not None:
+            self.new_data.emit(self.path, fill)
+        self._shape = patch.shape
+        self.new_data.emit(self.path, patch)
 
 
 class QtContainerSubscription(QtTiledSubscription):
     child_created = Signal(object)
     child_metadata_updated = Signal(object)
+    # Client of a child that may have been created during missed updates
+    child_missed = Signal(object)
 
-    def __init__(self, subscription: ContainerSubscription):
-        super().__init__(subscription)
+    def __init__(
+        self,
+        subscription: ContainerSubscription,
+        node=None,
+        start: int | None = 1,
+    ):
+        super().__init__(subscription, start)
+        # The container's client, to list children after missed updates
+        self.node = node
 
         self.mapping.update(
             {
@@ -73,71 +203,363 @@ class QtContainerSubscription(QtTiledSubscription):
         self.sub.child_created.add_callback(self._emit)
         self.sub.child_metadata_updated.add_callback(self._emit)
 
+    def _emit(self, update):
+        missed = self._missed(update)
+        if missed is None:
+            return
+        children = []
+        with self._handling(update):
+            if missed and self.node is not None:
+                # Each missed update created at most one child: list as many
+                # of the newest children, rather than replaying them
+                children = list(self.node.items().tail(len(missed)))
+        for _, child in children:
+            self.child_missed.emit(child)
+        self.mapping[update.type].emit(update)
 
-class TiledSubscriptionThread(QThread):
-    "Longrunning thread that follows the lifecycle of the websocket"
 
-    def __init__(
-        self,
-        ts: QtTiledSubscription,
-    ):
+class LiveUpdateQueue(QObject):
+    """Coalesce live array patches into at most one update per frame.
+
+    put() may be called from any thread. Patches wait here, per array,
+    until the next frame, which comes at most max_rate times per second:
+    then they are all written into the array's LiveArrayBuffer and a
+    single `updated` signal is emitted for it. A patch that a later one
+    overwrites completely is dropped without being applied.
+    """
+
+    updated = Signal(object, str, tuple, bool)  # as live_array_updated
+    _wake = Signal()
+
+    def __init__(self, max_rate: float = 30.0):
         super().__init__()
-        self.ts = ts
+        self.max_rate = max_rate
+        # Child node path -> LiveArrayBuffer
+        self.live_arrays = {}
+        # Patches received, merged into an update with others, and dropped
+        self.received = 0
+        self.merged = 0
+        self.dropped = 0
+        # Seconds that the oldest patch of the latest frame had waited
+        self.lag = 0.0
+        self._lock = threading.Lock()
+        # Child node path -> patches in order of arrival
+        self._pending = {}
+        self._oldest = None
+        self._last_flush = 0.0
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self.flush)
+        # Queued, so that the timer is started by the thread that owns it
+        self._wake.connect(self._schedule)
+
+    @property
+    def depth(self) -> int:
+        "Number of patches waiting for the next frame"
+        with self._lock:
+            return sum(len(patches) for patches in self._pending.values())
+
+    def put(self, child_node_path, patch):
+        with self._lock:
+            self.received += 1
+            wake = not self._pending
+            if wake:
+                self._oldest = time.monotonic()
+            patches = self._pending.setdefault(child_node_path, [])
+            kept = [p for p in patches if not _overwrites(patch, p)]
+            self.dropped += len(patches) - len(kept)
+            kept.append(patch)
+            self._pending[child_node_path] = kept
+        if wake:
+            self._wake.emit()
+
+    def _schedule(self):
+        if self._timer.isActive():
+            return
+        wait = self._last_flush + 1 / self.max_rate - time.monotonic()
+        self._timer.start(max(int(wait * 1000), 0))
+
+    def flush(self):
+        "Apply the waiting patches, and emit one update per array."
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            oldest, self._oldest = self._oldest, None
+        now = time.monotonic()
+        self._last_flush = now
+        if not pending:
+            return
+        self.lag = now - oldest
+        for child_node_path, patches in pending.items():
+            live_array = self.live_arrays.get(child_node_path)
+            if live_array is None:
+                live_array = LiveArrayBuffer()
+                self.live_arrays[child_node_path] = live_array
+            region, resized = None, False
+            for patch in patches:
+                written, reshaped = live_array.apply(patch)
+                region = _union(region, written)
+                resized = resized or reshaped
+            self.merged += len(patches) - 1
+            self.updated.emit(live_array, child_node_path, region, resized)
+        _logger.debug(
+            "Live update of %d array(s), %.3f s behind; %d received, "
+            "%d merged, %d dropped",
+            len(pending),
+            self.lag,
+            self.received,
+            self.merged,
+            self.dropped,
+        )
+
+    def clear(self):
+        with self._lock:
+            self._pending.clear()
+        self.live_arrays.clear()
+
+
+def _overwrites(patch, earlier) -> bool:
+    "Whether patch writes everything that earlier did, on the same array"
+    if patch.shape != earlier.shape or len(patch.offset) != len(
+        earlier.offset
+    ):
+        return False
+    return all(
+        o <= e and e + m <= o + n
+        for o, n, e, m in zip(
+            patch.offset,
+            patch.data.shape,
+            earlier.offset,
+            earlier.data.shape,
+            strict=True,
+        )
+    )
 
-    def run(self):
-        # this blocks until self.sub.disconnect()
-        self.ts.sub.start(1)
+
+def _union(region, other):
+    "Smallest region containing both (None is empty)"
+    if region is None or len(region) != len(other):
+        return other
+    return tuple(
+        slice(min(a.start, b.start), max(a.stop, b.stop))
+        for a, b in zip(region, other, strict=True)
+    )
 
 
 class SubscriptionManager(QObject):
     create_subscription = Signal(object)
-    plottable_array_data_received = Signal(
-        object, str  # data to plot; child_node_path, name of image
+    # Node path parts of the parent container; (key, node) of the new child,
+    # or None if unknown
+    child_created = Signal(tuple, object)
+    # Node path parts of the parent container; the update
+    child_metadata_updated = Signal(tuple, object)
+    live_array_updated = Signal(
+        # LiveArrayBuffer; child_node_path, name of image; region written;
+        # whether the shape changed
+        object,
+        str,
+        tuple,
+        bool,
     )
+    # Path of a subscription; its SubscriptionHealth, when the state changes
+    subscription_health_changed = Signal(str, object)
 
-    def __init__(self):
+    def __init__(
+        self,
+        max_rate: float = 30.0,
+        policy: SubscriptionPolicy | None = None,
+    ):
         super().__init__()
-        self.active_subs = []
+        # Which children are followed below a live node, and how many
+        self.policy = policy or SubscriptionPolicy()
+        # Node path parts -> QtTiledSubscription, least recently updated
+        # first. They must be kept alive: tiled holds weak references to
+        # their callbacks
+        self.active_subs = OrderedDict()
+        # Nodes where live mode was switched on; these are never evicted
+        self.roots = set()
+        # Container path parts -> its followed children, oldest first
+        self._children = {}
+        # Node path parts -> sequence number of the latest update handled,
+        # kept after unsubscribing to resume from there
+        self.sequences = {}
+        # All websockets are followed by one asyncio loop in one thread
+        self.stream_loop = StreamLoop(
+            on_health=self.subscription_health_changed.emit
+        )
+        # Array updates are delivered at most max_rate times per second
+        self.live_updates = LiveUpdateQueue(max_rate=max_rate)
+        self.live_updates.updated.connect(self.live_array_updated)
+        self.live_updates.updated.connect(self._on_array_updated)
+        # Child node path -> LiveArrayBuffer
+        self.live_arrays = self.live_updates.live_arrays
         self.create_subscription.connect(self.on_create_subscription)
 
     def on_create_subscription(self, child):
-        sub = child.subscribe(executor=QtExecutor())
+        "Switch on live mode at child, following it and its children."
+        path = tuple(child.path_parts)
+        self.roots.add(path)
+        self._subscribe(child, path)
+
+    def _subscribe(self, child, path):
+        if path in self.active_subs:
+            return
+        # Updates of a subscription are handled in order, to notice gaps
+        sub = child.subscribe(executor=SerialExecutor())
+        # Resume after the latest update handled, if followed before. The
+        # table already lists the children of a new live node, so it starts
+        # with live updates; other nodes replay what they had before we
+        # subscribed.
+        if path in self.sequences:
+            start = self.sequences[path] + 1
+        elif path in self.roots and child.structure_family == "container":
+            start = None
+        else:
+            start = 1
         # Is the child also a container?
         if child.structure_family == "container":
             # Recursively subscribe to the children of this new container.
-            ts = QtContainerSubscription(sub)
+            ts = QtContainerSubscription(sub, node=child, start=start)
             ts.child_created.connect(self.on_new_child)
+            ts.child_metadata_updated.connect(self.on_child_metadata_updated)
+            ts.child_missed.connect(self.on_missed_child)
         elif child.structure_family == "array":
             # Subscribe to data updates (i.e. appended table rows or array slices).
-            ts = QtArraySubscription(sub)
-            ts.new_data.connect(self.on_new_data)
-            # Launch the subscription.
-            # Ask the server to replay from the very first update, if we already
-            # missed some.
+            live_array = self.live_arrays.get("/".join(path))
+            if live_array is None:
+                # Without the data so far, replay from the first update
+                start = 1
+            ts = QtArraySubscription(
+                sub,
+                chunks=child.structure().chunks,
+                start=start,
+                shape=None if live_array is None else live_array.shape,
+            )
+            # Queue patches straight from the subscription's threads, rather
+            # than posting an event to the GUI thread for each one
+            ts.new_data.connect(
+                self.live_updates.put, Qt.ConnectionType.DirectConnection
+            )
         else:
             # Ignore other structures (e.g. tables) for now.
             ts = None
         if ts is None:
             return
-        thread = TiledSubscriptionThread(ts)
-        thread.start(1)
-        self.active_subs.append(thread)
+        self._make_room()
+        self.active_subs[path] = ts
+        # Launch the subscription. The server replays the updates from start
+        # on, if given.
+        self.stream_loop.add(sub, start=start)
+
+        parent = path[:-1]
+        if path not in self.roots and parent in self.active_subs:
+            siblings = self._children.setdefault(parent, [])
+            siblings.append(path)
+            max_children = self.policy.max_children
+            if max_children is not None:
+                # Drop the oldest children, e.g. all but the newest run
+                while len(siblings) > max_children:
+                    self.unsubscribe(siblings[0])
+
+    def _make_room(self):
+        while len(self.active_subs) >= self.policy.max_subscriptions:
+            # The least recently updated subscription that is not a root
+            path = next(
+                (path for path in self.active_subs if path not in self.roots),
+                None,
+            )
+            if path is None:
+                break
+            _logger.debug("Evicting the live subscription to %s", path)
+            self.unsubscribe(path, descendants=False)
+
+    def unsubscribe(self, path: tuple[str], descendants: bool = True):
+        """Stop following path and, by default, the nodes below it."""
+        n = len(path)
+        paths = [
+            other
+            for other in self.active_subs
+            if other == path or (descendants and other[:n] == path)
+        ]
+        for other in paths:
+            ts = self.active_subs.pop(other)
+            self.sequences.pop(other, None)
+            self.roots.discard(other)
+            self._children.pop(other, None)
+            siblings = self._children.get(other[:-1])
+            if siblings is not None and other in siblings:
+                siblings.remove(other)
+            self.live_arrays.pop("/".join(other), None)
+            self.stream_loop.remove(ts.sub)
+
+    def _touch(self, path: tuple[str]):
+        if path in self.active_subs:
+            self.active_subs.move_to_end(path)
+
+    def _on_array_updated(self, live_array, path, region, resized):
+        self._touch(tuple(path.split("/")))
 
     def on_new_child(self, update):
         "A new child node has been created in a container."
+        parent = node_path_parts(update.subscription.segments)
+        # Built from the update, without a request
         child = update.child()
+        self.child_created.emit(parent, (update.key, child))
+        self._touch(parent)
+        self._follow_child(parent, update.key, child)
+
+    def on_missed_child(self, child):
+        "A child node may have been created during missed updates."
+        parent = tuple(child.path_parts[:-1])
+        # It may also be an older child, so the listing must be refetched
+        self.child_created.emit(parent, None)
+        self._follow_child(parent, child.path_parts[-1], child)
 
-        self.create_subscription.emit(child)
+    def on_child_metadata_updated(self, update):
+        "The metadata of a child node has been replaced."
+        parent = node_path_parts(update.subscription.segments)
+        self.child_metadata_updated.emit(parent, update)
+        self._touch(parent)
 
-    def on_new_data(self, update):
-        "Data has been updated (maybe appended) to an array or table."
-        self.plottable_array_data_received.emit(
-            update.data(), "/".join(update.subscription.segments)
+    def _follow_child(self, parent, key, child):
+        # The live node that this container was followed from
+        root = max(
+            (root for root in self.roots if parent[: len(root)] == root),
+            key=len,
+            default=None,
         )
+        if root is None or parent not in self.active_subs:
+            return
+        relative_path = parent[len(root) :] + (key,)
+        specs = [spec.name for spec in child.specs]
+        if not self.policy.admits(
+            relative_path, child.structure_family, specs
+        ):
+            return
+        self._subscribe(child, parent + (key,))
+
+    def subscription_health(self) -> dict:
+        "SubscriptionHealth of every subscription, by path"
+        return self.stream_loop.health()
 
     def clear(self):
-        # TODO: Fix AttributeError
-        # 'ContainerSubscription' object has no attribute 'type'
-        for thread in self.active_subs:
-            thread.ts.sub.disconnect()
+        # Closes every websocket and joins the loop's thread
+        self.stream_loop.stop()
+        # Keep the data and where each node was up to, to resume from there
+        # if live mode is switched on again
+        for path, ts in self.active_subs.items():
+            if ts.sequence is not None:
+                self.sequences[path] = ts.sequence
+        self.live_updates.flush()
         self.active_subs.clear()
+        self.roots.clear()
+        self._children.clear()
+
+    def forget(self):
+        "Drop the data and sequence numbers kept for resuming."
+        self.sequences.clear()
+        self.live_updates.clear()
+
+
+def node_path_parts(segments) -> tuple[str]:
+    "Convert subscription segments into a TiledSelector node path."
+    return tuple(segment for segment in segments if segment.strip("/"))
@@ -0,0 +1,96 @@
+"""Which nodes live mode follows, and how many at once.
+
+Switching on LIVE at a busy catalog root would otherwise subscribe to every
+stream of every new run. A SubscriptionPolicy limits the depth below the
+node where live mode was switched on, filters children by structure
+family, spec and path, and caps the number of subscriptions.
+"""
+
+from fnmatch import fnmatchcase
+
+
+class SubscriptionPolicy:
+    """Rules for recursive live subscriptions.
+
+    Children are judged by their path relative to the node where live mode
+    was switched on (the root, at depth 0):
+
+    - max_depth: deepest level followed; None for no limit
+    - structure_families: families followed, e.g. ("container", "array")
+    - specs: if given, containers must have one of these specs
+    - paths: if given, glob patterns of relative paths, such as
+      "*/primary/*"; a child is followed if it matches one, or is a
+      container that may lead to one. Segments are matched separately, so
+      "*" stays within one segment.
+    - max_children: children followed per container; older ones are
+      dropped, with their descendants, when a new one arrives
+    - max_subscriptions: subscriptions in all; the least recently updated
+      one is dropped to make room
+
+    For example, only the primary stream of the newest run of a catalog:
+    SubscriptionPolicy(paths=["*/primary/*"], max_children=1).
+    """
+
+    def __init__(
+        self,
+        max_depth: int | None = 3,
+        structure_families: tuple[str] = ("container", "array"),
+        specs: tuple[str] | None = None,
+        paths: tuple[str] | None = None,
+        max_children: int | None = None,
+        max_subscriptions: int = 256,
+    ):
+        self.max_depth = max_depth
+        self.structure_families = tuple(structure_families)
+        self.specs = None if specs is None else tuple(specs)
+        self.paths = (
+            None
+            if paths is None
+            else [tuple(p.strip("/").split("/")) for p in paths]
+        )
+        self.max_children = max_children
+        self.max_subscriptions = max_subscriptions
+
+    def __repr__(self):
+        return (
+            f"{type(self).__name__}(max_depth={self.max_depth!r}, "
+            f"structure_families={self.structure_families!r}, "
+            f"specs={self.specs!r}, paths={self.paths!r}, "
+            f"max_children={self.max_children!r}, "
+            f"max_subscriptions={self.max_subscriptions!r})"
+        )
+
+    def admits(
+        self,
+        relative_path: tuple[str],
+        structure_family: str,
+        specs: list[str] = (),
+    ) -> bool:
+        """Whether to follow a child at relative_path below the root."""
+        if self.max_depth is not None and len(relative_path) > self.max_depth:
+            return False
+        if structure_family not in self.structure_families:
+            return False
+        if (
+            self.specs is not None
+            and structure_family == "container"
+            and not set(specs) & set(self.specs)
+        ):
+            return False
+        if self.paths is not None:
+            # A container may lead to a match further down
+            leads = structure_family == "container"
+            return any(
+                (
+                    len(relative_path) == len(pattern)
+                    or (leads and len(relative_path) < len(pattern))
+                )
+                and all(
+                    fnmatchcase(segment, part)
+                    for segment, part in zip(
+                        relative_path, pattern, strict=False
+                    )
+                )
+                for pattern in self.paths
+            )
+        return True
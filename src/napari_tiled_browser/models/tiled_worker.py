@@ -1,47 +1,589 @@
+import logging
+import math
+import sqlite3
+import threading
+import time
+
+import numpy
+from httpx import ConnectError, HTTPError, TimeoutException
 from qtpy.QtCore import QObject, QRunnable, Signal
+from tiled.structures.core import StructureFamily
+
+from napari_tiled_browser.models.tiled_array import (
+    estimate_contrast_limits,
+    exact_contrast_limits,
+    transfer_rate,
+)
+from napari_tiled_browser.models.tiled_listing import (
+    MAX_PAGE_SIZE,
+    fetch_listing,
+)
+
+_logger = logging.getLogger(__name__)
+
+
+class CancellableWorker(QRunnable):
+    """QRunnable that can be told to stop, and then emits no results."""
+
+    def __init__(self):
+        super().__init__()
+        self._cancelled = threading.Event()
+
+    @property
+    def is_cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        """Skip or stop the work, and never emit results."""
+        self._cancelled.set()
 
 
 class TiledWorkerSignals(QObject):
     finished = Signal()
     results = Signal(object)
+    failed = Signal(str)  # error message
 
 
-class TiledWorker(QRunnable):
+class TiledWorker(CancellableWorker):
     def __init__(
         self,
         *,
         client,
-        current_page,
+        offset,
+        limit,
         node_path_parts,
-        rows_per_page,
         search_results,
         display_search_results,
+        cache=None,
+        cache_key=None,
+        node=None,
+        len_cache=None,
+        len_key=None,
+        generation=0,
+        listing_fields=None,
+        response_cache=None,
+        cursors=None,
+        columns=None,
+        sorting=None,
+        metadata_index=None,
         **kwargs,
     ):
         super().__init__()
         self.signals = TiledWorkerSignals()
-        self.rows_per_page = rows_per_page
-        self.current_page = current_page
+        # Tags the request so that superseded results can be recognized
+        self.generation = generation
+        self.offset = offset
+        self.limit = limit
         self.client = client
         self.search_results = search_results
         self.node_path_parts = node_path_parts
         self.display_search_results = display_search_results
+        # Already resolved client for node_path_parts, if the caller has one
+        self.node = node
+        # Optional LRUCache shared with other workers; pages are stored
+        # under cache_key once fetched.
+        self.cache = cache
+        self.cache_key = cache_key
+        # Optional LRUCache receiving the listing length under len_key
+        self.len_cache = len_cache
+        self.len_key = len_key
+        # Request only these fields of each entry, rather than full items
+        self.listing_fields = listing_fields
+        # Optional ResponseDiskCache persisting listings across sessions
+        self.response_cache = response_cache
+        # Optional LRUCache of listing cursors, for keyset pagination: under
+        # len_key + (offset, False), a cursor to the entries from offset
+        # on, and under len_key + (offset, True), to those before offset
+        self.cursors = cursors
+        self.cursor, self.reverse = None, False
+        # Summary columns to select from the metadata of each entry, and
+        # (metadata path, direction) pairs to sort the listing by
+        self.columns = columns
+        self.sorting = sorting
+        # Optional MetadataIndex receiving the metadata of the entries
+        self.metadata_index = metadata_index
 
     def run(self):
-        node_offset = self.rows_per_page * self.current_page
-        selection = slice(node_offset, node_offset + self.rows_per_page)
+        if self.is_cancelled:
+            return
+        results = None
+        if self.cache is not None:
+            results = self.cache.get(self.cache_key)
+        if results is None and self.response_cache is not None:
+            listing = self.fetch(offline=True)
+            if listing is not None:
+                # Show what was seen last time, then check it is current.
+                # Results are emitted again only if they changed.
+                self.store(listing)
+                if not self.is_cancelled:
+                    self.signals.results.emit(listing.items)
+                try:
+                    listing = self.fetch()
+                except HTTPError as exception:
+                    _logger.warning(
+                        "Could not revalidate listing: %s", exception
+                    )
+                    listing = None
+                if listing is not None and listing.modified:
+                    self.store(listing)
+                    if not self.is_cancelled:
+                        self.signals.results.emit(listing.items)
+                self.signals.finished.emit()
+                return
+        if results is None:
+            try:
+                listing = self.fetch()
+            except HTTPError as exception:
+                _logger.warning("Could not fetch listing: %s", exception)
+                self.signals.finished.emit()
+                if not self.is_cancelled:
+                    self.signals.failed.emit(
+                        str(exception) or type(exception).__name__
+                    )
+                return
+            # Still worth keeping, even if the request was superseded
+            self.store(listing)
+            results = listing.items
+
+        self.signals.finished.emit()
+        if not self.is_cancelled:
+            self.signals.results.emit(results)
+
+    def store(self, listing):
+        if self.cache is not None:
+            self.cache.put(self.cache_key, listing.items)
+        if self.len_cache is not None:
+            self.len_cache.put(self.len_key, listing.count)
+        if self.cursors is not None and listing.cursor is not None:
+            if self.reverse:
+                key = self.len_key + (self.offset, True)
+            else:
+                key = self.len_key + (self.offset + len(listing.items), False)
+            self.cursors.put(key, listing.cursor)
+        if self.metadata_index is not None:
+            self.metadata_index.add_listing(
+                self.client.uri,
+                self.node_path_parts,
+                listing.items,
+                self.columns,
+            )
+
+    def plan(self) -> int:
+        """Choose how to fetch the block without a deep offset.
 
+        Sets cursor and reverse: continue from a cursor seen before, in
+        either direction, or fetch the end of the listing as the first
+        entries in reverse order. Without either, the offset is used.
+        Returns the number of entries to request.
+        """
+        self.cursor, self.reverse = None, False
+        if self.cursors is None or self.offset == 0:
+            return self.limit
+        end = self.offset + self.limit
+        self.cursor = self.cursors.get(self.len_key + (self.offset, False))
+        if self.cursor is not None:
+            return self.limit
+        self.cursor = self.cursors.get(self.len_key + (end, True))
+        if self.cursor is not None:
+            self.reverse = True
+            return self.limit
+        length = None
+        if self.len_cache is not None:
+            length = self.len_cache.get(self.len_key)
+        if length is not None and end >= length:
+            # The last entries: the first ones in reverse order
+            self.reverse = True
+            return max(length - self.offset, 0)
+        return self.limit
+
+    def fetch(self, offline=False):
+        """Fetch the listing, or with offline=True read it from disk.
+
+        Returns None if offline and the listing is not on disk.
+        """
         if self.search_results is not None and self.display_search_results:
             catalog_or_search_results = self.search_results
-            results = catalog_or_search_results.items()[selection]
+        elif self.node is not None:
+            catalog_or_search_results = self.node
+        elif self.node_path_parts:
+            catalog_or_search_results = self.client[self.node_path_parts]
         else:
             catalog_or_search_results = self.client
-            if self.node_path_parts:
-                results = catalog_or_search_results[
-                    self.node_path_parts
-                ].items()[selection]
+        if self.sorting:
+            catalog_or_search_results = catalog_or_search_results.sort(
+                *self.sorting
+            )
+        # With listing_fields=None this requests what items() would, but
+        # can go through the response cache
+        limit = self.plan()
+        offset = self.offset
+        if self.reverse:
+            # Counted from the end, which the block reaches
+            offset = 0
+        return fetch_listing(
+            catalog_or_search_results,
+            offset,
+            limit,
+            fields=self.listing_fields,
+            cache=self.response_cache,
+            offline=offline,
+            cursor=self.cursor,
+            reverse=self.reverse,
+            columns=self.columns,
+        )
+
+
+class TiledLengthWorkerSignals(QObject):
+    results = Signal(object, object)  # listing key, length
+    failed = Signal(object, str)  # listing key, error message
+
+
+class TiledLengthWorker(QRunnable):
+    """Count the entries of a container or search result off the GUI thread."""
+
+    def __init__(self, *, node, cache, cache_key, **kwargs):
+        super().__init__()
+        self.signals = TiledLengthWorkerSignals()
+        self.node = node
+        self.cache = cache
+        self.cache_key = cache_key
+
+    def run(self):
+        try:
+            length = len(self.node)
+        except HTTPError as exception:
+            _logger.warning("Could not count entries: %s", exception)
+            self.signals.failed.emit(
+                self.cache_key, str(exception) or type(exception).__name__
+            )
+            return
+        self.cache.put(self.cache_key, length)
+        self.signals.results.emit(self.cache_key, length)
+
+
+class TiledInfoWorkerSignals(QObject):
+    results = Signal(tuple, object)  # node path parts, NodeInfo
+    failed = Signal(tuple, str)  # node path parts, error message
+
+
+class TiledInfoWorker(QRunnable):
+    """Build the info pane summary of a node off the GUI thread."""
+
+    def __init__(
+        self, *, get_node_info, node_path_parts, revalidate=False, **kwargs
+    ):
+        super().__init__()
+        self.signals = TiledInfoWorkerSignals()
+        self.get_node_info = get_node_info
+        self.node_path_parts = node_path_parts
+        # Follow a summary built from cached data with a checked one
+        self.revalidate = revalidate
+
+    def run(self):
+        try:
+            info = self.get_node_info(self.node_path_parts)
+        except HTTPError as exception:
+            _logger.warning("Could not load node: %s", exception)
+            self.signals.failed.emit(
+                self.node_path_parts,
+                str(exception) or type(exception).__name__,
+            )
+            return
+        self.signals.results.emit(self.node_path_parts, info)
+        if not self.revalidate:
+            return
+        try:
+            fresh = self.get_node_info(self.node_path_parts, revalidate=True)
+        except HTTPError as exception:
+            _logger.warning("Could not revalidate node: %s", exception)
+            return
+        if fresh != info:
+            self.signals.results.emit(self.node_path_parts, fresh)
+
+
+class TiledSearchWorkerSignals(QObject):
+    # generation, node path parts, search results, length, elapsed seconds
+    results = Signal(int, tuple, object, int, float)
+    failed = Signal(int, str)  # generation, error message
+
+
+class TiledSearchWorker(CancellableWorker):
+    """Run a Tiled search and count its results off the GUI thread."""
+
+    def __init__(
+        self, *, node, node_path_parts, query, generation=0, **kwargs
+    ):
+        super().__init__()
+        self.signals = TiledSearchWorkerSignals()
+        self.node = node
+        self.node_path_parts = node_path_parts
+        self.query = query
+        self.generation = generation
+
+    def run(self):
+        if self.is_cancelled:
+            return
+        start = time.monotonic()
+        try:
+            results = self.node.search(self.query)
+            length = len(results)
+        except HTTPError as exception:
+            _logger.warning("Search failed: %s", exception)
+            if not self.is_cancelled:
+                self.signals.failed.emit(
+                    self.generation, str(exception) or type(exception).__name__
+                )
+            return
+        elapsed = time.monotonic() - start
+        if not self.is_cancelled:
+            self.signals.results.emit(
+                self.generation, self.node_path_parts, results, length, elapsed
+            )
+
+
+class TiledIndexWorkerSignals(QObject):
+    progress = Signal(tuple, int)  # node path parts, entries indexed
+    finished = Signal(tuple, int)
+
+
+class TiledIndexWorker(CancellableWorker):
+    """Add the metadata of a subtree to a MetadataIndex.
+
+    The node at node_path_parts is looked up with get_node, and its
+    containers are listed page by page, with full metadata, down to
+    max_depth levels below it.
+    """
+
+    def __init__(
+        self,
+        *,
+        get_node,
+        node_path_parts,
+        index,
+        server,
+        max_depth=2,
+        page_size=MAX_PAGE_SIZE,
+        **kwargs,
+    ):
+        super().__init__()
+        self.signals = TiledIndexWorkerSignals()
+        self.get_node = get_node
+        self.node_path_parts = tuple(node_path_parts)
+        self.index = index
+        self.server = server
+        self.max_depth = max_depth
+        self.page_size = page_size
+        self.indexed = 0
+
+    def run(self):
+        try:
+            node = self.get_node(self.node_path_parts)
+            self._crawl(node, self.node_path_parts, 1)
+        except (HTTPError, KeyError, sqlite3.Error) as exception:
+            # Gone from the server since it was listed, or the index failed
+            _logger.warning("Stopped indexing: %r", exception)
+        finally:
+            self.signals.finished.emit(self.node_path_parts, self.indexed)
+
+    def _crawl(self, node, node_path_parts, depth):
+        offset = 0
+        while not self.is_cancelled:
+            listing = fetch_listing(node, offset, self.page_size, fields=None)
+            self.index.add_listing(self.server, node_path_parts, listing.items)
+            self.indexed += len(listing.items)
+            self.signals.progress.emit(self.node_path_parts, self.indexed)
+            if depth < self.max_depth:
+                for key, child in listing.items:
+                    if self.is_cancelled:
+                        return
+                    if child.structure_family == StructureFamily.container:
+                        self._crawl(child, node_path_parts + (key,), depth + 1)
+            offset += len(listing.items)
+            if len(listing.items) < self.page_size or offset >= listing.count:
+                return
+
+
+class TiledConnectWorkerSignals(QObject):
+    connected = Signal(int, object)  # generation, root client
+    failed = Signal(int, str)  # generation, error message
+
+
+class TiledConnectWorker(CancellableWorker):
+    """Connect (and authenticate) to a Tiled server off the GUI thread.
+
+    Connection errors and timeouts are retried up to `retries` more times,
+    waiting `backoff` seconds before the first retry and twice as long
+    before each one after that.
+    """
+
+    def __init__(
+        self,
+        *,
+        url,
+        client_from_url,
+        connect_timeout=None,
+        retries=1,
+        backoff=1.0,
+        generation=0,
+        **kwargs,
+    ):
+        super().__init__()
+        self.signals = TiledConnectWorkerSignals()
+        self.url = url
+        self.client_from_url = client_from_url
+        self.connect_timeout = connect_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.generation = generation
+
+    def run(self):
+        delay = self.backoff
+        for attempt in range(self.retries + 1):
+            if self.is_cancelled:
+                return
+            try:
+                client = self.client_from_url(
+                    self.url, connect_timeout=self.connect_timeout
+                )
+            except (ConnectError, TimeoutException) as exception:
+                error_message = str(exception) or type(exception).__name__
+                if attempt == self.retries:
+                    break
+                # Returns early (True) if cancelled while waiting
+                if self._cancelled.wait(delay):
+                    return
+                delay *= 2
+            except (HTTPError, ValueError) as exception:
+                # Not worth retrying, e.g. a bad URL or failed login
+                error_message = str(exception) or type(exception).__name__
+                break
             else:
-                results = catalog_or_search_results.items()[selection]
+                if not self.is_cancelled:
+                    self.signals.connected.emit(self.generation, client)
+                return
 
-        self.signals.finished.emit()
-        self.signals.results.emit(results)
+        if not self.is_cancelled:
+            self.signals.failed.emit(self.generation, error_message)
+
+
+class TiledArrayWorkerSignals(QObject):
+    results = Signal(object)  # numpy array
+    failed = Signal(str)  # error message
+
+
+class TiledArrayWorker(CancellableWorker):
+    """Read a whole array node into memory off the GUI thread.
+
+    The array is read with node.read(), in one request unless it is larger
+    than the Tiled client splits responses at.
+    """
+
+    def __init__(self, *, node, **kwargs):
+        super().__init__()
+        self.signals = TiledArrayWorkerSignals()
+        self.node = node
+
+    def run(self):
+        if self.is_cancelled:
+            return
+        try:
+            start = time.monotonic()
+            array = numpy.asarray(self.node.read())
+            transfer_rate.record(array.nbytes, time.monotonic() - start)
+        except HTTPError as exception:
+            _logger.warning("Could not read %s: %s", self.node, exception)
+            if not self.is_cancelled:
+                self.signals.failed.emit(
+                    str(exception) or type(exception).__name__
+                )
+            return
+        if not self.is_cancelled:
+            self.signals.results.emit(array)
+
+
+class TiledMultiscaleWorkerSignals(QObject):
+    results = Signal(list)  # array nodes, from full to lowest resolution
+    failed = Signal(str)  # error message
+
+
+class TiledMultiscaleWorker(CancellableWorker):
+    """List the levels of a multiscale image off the GUI thread.
+
+    Only the array children of the container are levels.
+    """
+
+    def __init__(self, *, node, **kwargs):
+        super().__init__()
+        self.signals = TiledMultiscaleWorkerSignals()
+        self.node = node
+
+    def run(self):
+        if self.is_cancelled:
+            return
+        try:
+            levels = [
+                level
+                for _, level in self.node.items()
+                if level.item["attributes"]["structure_family"]
+                == StructureFamily.array
+            ]
+        except HTTPError as exception:
+            _logger.warning("Could not list %s: %s", self.node, exception)
+            error_message = str(exception) or type(exception).__name__
+        else:
+            if levels:
+                levels.sort(
+                    key=lambda level: math.prod(level.shape), reverse=True
+                )
+                if not self.is_cancelled:
+                    self.signals.results.emit(levels)
+                return
+            error_message = "No array levels"
+        if not self.is_cancelled:
+            self.signals.failed.emit(error_message)
+
+
+class TiledContrastWorkerSignals(QObject):
+    results = Signal(tuple, bool)  # (low, high), exact
+    failed = Signal(str)  # error message
+
+
+class TiledContrastWorker(CancellableWorker):
+    """Work out contrast limits for a LazyTiledArray off the GUI thread.
+
+    A sampled estimate is emitted first. With exact=True, the limits over
+    the whole array follow once every block has been read.
+    """
+
+    def __init__(self, *, data, exact=False, **kwargs):
+        super().__init__()
+        self.signals = TiledContrastWorkerSignals()
+        self.data = data
+        self.exact = exact
+
+    def run(self):
+        if self.is_cancelled:
+            return
+        try:
+            self._run()
+        except HTTPError as exception:
+            _logger.warning(
+                "Could not read %s for contrast limits: %s",
+                self.data,
+                exception,
+            )
+            if not self.is_cancelled:
+                self.signals.failed.emit(
+                    str(exception) or type(exception).__name__
+                )
+
+    def _run(self):
+        limits = estimate_contrast_limits(self.data)
+        if self.is_cancelled:
+            return
+        self.signals.results.emit(limits, False)
+        if not self.exact:
+            return
+        limits = exact_contrast_limits(self.data, self._cancelled.is_set)
+        if limits is not None and not self.is_cancelled:
+            self.signals.results.emit(limits, True)
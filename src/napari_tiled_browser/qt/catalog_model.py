@@ -0,0 +1,295 @@
+import logging
+from collections.abc import Mapping
+from datetime import datetime
+
+from qtpy.QtCore import QAbstractTableModel, QModelIndex, Qt, QTimer, Signal
+from qtpy.QtGui import QIcon
+
+from napari_tiled_browser.models.tiled_cache import LRUCache
+from napari_tiled_browser.models.tiled_listing import summarize
+
+_logger = logging.getLogger(__name__)
+
+# The invalid index standing for the (only) parent of a table's rows
+_ROOT = QModelIndex()
+
+
+class QTiledCatalogModel(QAbstractTableModel):
+    """Table model listing one page of a Tiled container or search result.
+
+    Rows are loaded lazily in blocks of BLOCK_SIZE entries. The view asks for
+    more rows through canFetchMore()/fetchMore() as the user scrolls, and
+    rows whose block is not loaded yet are requested via `block_requested`.
+    Only the most recently used blocks are kept, so memory use does not
+    grow with the size of the page.
+
+    Besides the key, rows may show summary columns, such as the scan_id
+    and plan_name of Bluesky runs, from the metadata of each entry.
+    """
+
+    BLOCK_SIZE = 100
+    PARENT_ROW_TEXT = ".."
+    PLACEHOLDER_TEXT = "..."
+    KEY_HEADER = "key"
+
+    block_requested = Signal(
+        int,  # listing offset of the block
+        int,  # number of entries in the block
+    )
+
+    def __init__(
+        self,
+        icons: Mapping[str, QIcon] | None = None,
+        default_icon: QIcon | None = None,
+        max_blocks: int = 20,
+        parent=None,
+    ):
+        super().__init__(parent)
+        # Icons are built once and shared by every row of a structure family
+        self.icons = dict(icons or {})
+        self.default_icon = default_icon
+        self._blocks = LRUCache(maxsize=max_blocks)
+        # Blocks waiting to be requested, and blocks requested but not loaded
+        self._queued = set()
+        self._requested = set()
+        self._offset = 0
+        self._total = 0
+        self._row_count = 0
+        self._has_parent_row = False
+        # Summary column names -> metadata paths
+        self._columns = {}
+
+        self._request_timer = QTimer(self)
+        self._request_timer.setSingleShot(True)
+        self._request_timer.setInterval(0)
+        self._request_timer.timeout.connect(self._flush_requests)
+
+    @property
+    def offset(self) -> int:
+        """Listing offset of the first entry on the page."""
+        return self._offset
+
+    @property
+    def has_parent_row(self) -> bool:
+        return self._has_parent_row
+
+    @property
+    def columns(self) -> list[str]:
+        """Names of the summary columns, after the key column."""
+        return list(self._columns)
+
+    def set_columns(self, columns: Mapping[str, str]) -> None:
+        """Show summary columns, given as names and metadata paths."""
+        columns = dict(columns)
+        if columns == self._columns:
+            return
+        self.beginResetModel()
+        self._columns = columns
+        self.endResetModel()
+
+    def reset_page(
+        self, offset: int, total: int, has_parent_row: bool = False
+    ) -> None:
+        """Show a new page of up to total entries starting at offset."""
+        self.beginResetModel()
+        self._blocks.clear()
+        self._queued.clear()
+        self._requested.clear()
+        self._offset = offset
+        self._total = total
+        self._row_count = min(total, self.BLOCK_SIZE)
+        self._has_parent_row = has_parent_row
+        self.endResetModel()
+        if self._row_count:
+            self._request_block(0)
+
+    def set_block(self, offset: int, items: list) -> None:
+        """Store (key, node) pairs fetched for the block starting at offset."""
+        block, remainder = divmod(offset - self._offset, self.BLOCK_SIZE)
+        if remainder or not 0 <= block * self.BLOCK_SIZE < self._total:
+            _logger.debug("Ignoring block at offset %d", offset)
+            return
+        items = list(items)
+        self._blocks.put(block, items)
+        self._requested.discard(block)
+
+        start = block * self.BLOCK_SIZE
+        if len(items) < self._block_len(block):
+            # The listing ended early; nothing exists past this block.
+            self.limit_total(start + len(items))
+
+        stop = min(start + len(items), self._row_count)
+        if stop > start:
+            self.dataChanged.emit(
+                self.index(start + self._has_parent_row, 0),
+                self.index(
+                    stop + self._has_parent_row - 1, self.columnCount() - 1
+                ),
+            )
+
+    def fail_block(self, offset: int) -> None:
+        """Forget the request for the block at offset, so it is retried."""
+        block, remainder = divmod(offset - self._offset, self.BLOCK_SIZE)
+        if not remainder:
+            self._requested.discard(block)
+
+    def limit_total(self, total: int) -> None:
+        """End the page after total entries, if it is longer than that."""
+        if total >= self._total:
+            return
+        self._total = total
+        if self._row_count > total:
+            first = total + self._has_parent_row
+            last = self._row_count + self._has_parent_row - 1
+            self.beginRemoveRows(QModelIndex(), first, last)
+            self._row_count = total
+            self.endRemoveRows()
+
+    def append_entry(self, position: int, entry: tuple) -> bool:
+        """Add a (key, node) pair at a listing position just past the page.
+
+        Returns False, and changes nothing, unless the page ends there.
+        """
+        index = position - self._offset
+        if index != self._total:
+            return False
+        self._total += 1
+        block, remainder = divmod(index, self.BLOCK_SIZE)
+        items = self._blocks.get(block)
+        if items is not None and len(items) == remainder:
+            items.append(entry)
+        if self._row_count == index:
+            # Every row was shown already; otherwise fetchMore() adds it
+            row = index + self._has_parent_row
+            self.beginInsertRows(QModelIndex(), row, row)
+            self._row_count += 1
+            self.endInsertRows()
+        return True
+
+    def is_parent_row(self, row: int) -> bool:
+        return self._has_parent_row and row == 0
+
+    def entry(self, row: int) -> tuple | None:
+        """Return the loaded (key, node) pair shown on a row, if any."""
+        position = row - self._has_parent_row
+        if not 0 <= position < self._row_count:
+            return None
+        block, index = divmod(position, self.BLOCK_SIZE)
+        items = self._blocks.get(block)
+        if items is None:
+            self._request_block(block)
+            return None
+        if index >= len(items):
+            return None
+        return items[index]
+
+    def key(self, row: int) -> str | None:
+        entry = self.entry(row)
+        return None if entry is None else entry[0]
+
+    def rowCount(self, parent=_ROOT):
+        if parent.isValid():
+            return 0
+        return self._row_count + self._has_parent_row
+
+    def columnCount(self, parent=_ROOT):
+        if parent.isValid():
+            return 0
+        return 1 + len(self._columns)
+
+    def canFetchMore(self, parent=_ROOT):
+        if parent.isValid():
+            return False
+        return self._row_count < self._total
+
+    def fetchMore(self, parent=_ROOT):
+        if parent.isValid():
+            return
+        count = min(self.BLOCK_SIZE, self._total - self._row_count)
+        if count <= 0:
+            return
+        first = self._row_count + self._has_parent_row
+        self.beginInsertRows(QModelIndex(), first, first + count - 1)
+        self._row_count += count
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row = index.row()
+        column = index.column()
+        if self.is_parent_row(row):
+            if role == Qt.ItemDataRole.DisplayRole and column == 0:
+                return self.PARENT_ROW_TEXT
+            return None
+
+        entry = self.entry(row)
+        if column > 0:
+            if role != Qt.ItemDataRole.DisplayRole or entry is None:
+                return None
+            name = self.columns[column - 1]
+            summary = summarize(entry[1], self._columns)
+            return format_value(name, summary.get(name))
+        if role == Qt.ItemDataRole.DisplayRole:
+            return self.PLACEHOLDER_TEXT if entry is None else entry[0]
+        if role == Qt.ItemDataRole.DecorationRole and entry is not None:
+            return self.icon_for(entry[1])
+        return None
+
+    def headerData(
+        self, section, orientation, role=Qt.ItemDataRole.DisplayRole
+    ):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            if section == 0:
+                return self.KEY_HEADER
+            return self.columns[section - 1]
+        if self.is_parent_row(section):
+            return ""
+        return str(self._offset + section - self._has_parent_row + 1)
+
+    def icon_for(self, node) -> QIcon | None:
+        family = node.item["attributes"]["structure_family"]
+        return self.icons.get(family, self.default_icon)
+
+    def _block_len(self, block: int) -> int:
+        start = block * self.BLOCK_SIZE
+        return min(self.BLOCK_SIZE, self._total - start)
+
+    def _request_block(self, block: int) -> None:
+        if block in self._requested:
+            return
+        self._requested.add(block)
+        self._queued.add(block)
+        # Requests are batched and sent once control returns to the event
+        # loop, so that data() never starts work while the view is painting.
+        self._request_timer.start()
+
+    def _flush_requests(self):
+        queued, self._queued = self._queued, set()
+        for block in sorted(queued):
+            if block in self._blocks:
+                continue
+            limit = self._block_len(block)
+            if limit > 0:
+                self.block_requested.emit(
+                    self._offset + block * self.BLOCK_SIZE, limit
+                )
+
+
+def format_value(name: str, value) -> str:
+    """Text for the value of a summary column.
+
+    Numbers in a column named "time", or ending with "_time", are taken as
+    POSIX timestamps, as in Bluesky documents.
+    """
+    if value is None:
+        return ""
+    if isinstance(value, list):
+        return ", ".join(map(str, value))
+    if (name == "time" or name.endswith("_time")) and isinstance(
+        value, int | float
+    ):
+        return datetime.fromtimestamp(value).isoformat(" ", "seconds")
+    return str(value)
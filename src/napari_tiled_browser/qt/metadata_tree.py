@@ -0,0 +1,74 @@
+import json
+import logging
+from collections.abc import Mapping
+
+from qtpy.QtWidgets import QTreeWidget, QTreeWidgetItem, QWidget
+
+from napari_tiled_browser.models.tiled_selector import json_decode
+
+_logger = logging.getLogger(__name__)
+
+
+class QTiledMetadataTree(QTreeWidget):
+    """Collapsible view of a metadata document.
+
+    Only the top level is built when a document is shown. The children of a
+    mapping or list are created the first time its item is expanded, so
+    large documents cost nothing until the user looks inside them.
+    """
+
+    MAX_CHILDREN = 500
+    MAX_VALUE_LEN = 200
+
+    def __init__(self, parent: QWidget | None = None) -> None:
+        super().__init__(parent)
+        self.setColumnCount(2)
+        self.setHeaderLabels(["Key", "Value"])
+        # Values of collapsed items whose children are not built yet
+        self._unexpanded = {}
+        self.itemExpanded.connect(self._on_item_expanded)
+
+    def set_metadata(self, metadata: Mapping) -> None:
+        self.clear()
+        self._add_children(self.invisibleRootItem(), metadata)
+
+    def clear(self) -> None:
+        self._unexpanded.clear()
+        super().clear()
+
+    def _add_children(self, parent: QTreeWidgetItem, value) -> None:
+        if isinstance(value, Mapping):
+            entries = list(value.items())
+        else:
+            entries = list(enumerate(value))
+
+        for key, child in entries[: self.MAX_CHILDREN]:
+            item = QTreeWidgetItem(parent, [str(key), self._summary(child)])
+            if _is_collection(child) and child:
+                item.setChildIndicatorPolicy(
+                    QTreeWidgetItem.ChildIndicatorPolicy.ShowIndicator
+                )
+                self._unexpanded[id(item)] = (item, child)
+
+        hidden = len(entries) - self.MAX_CHILDREN
+        if hidden > 0:
+            QTreeWidgetItem(parent, ["...", f"{hidden} more"])
+
+    def _on_item_expanded(self, item: QTreeWidgetItem) -> None:
+        entry = self._unexpanded.pop(id(item), None)
+        if entry is not None:
+            self._add_children(item, entry[1])
+
+    def _summary(self, value) -> str:
+        if isinstance(value, Mapping):
+            return f"{{...}} {len(value)} keys"
+        if _is_collection(value):
+            return f"[...] {len(value)} items"
+        text = json.dumps(value, default=json_decode)
+        if len(text) > self.MAX_VALUE_LEN:
+            text = text[: self.MAX_VALUE_LEN - 3] + "..."
+        return text
+
+
+def _is_collection(value) -> bool:
+    return isinstance(value, Mapping | list | tuple)
@@ -1,6 +1,8 @@
+import contextlib
 import logging
+from functools import partial
 
-from qtpy.QtCore import QTimer
+from qtpy.QtCore import QThreadPool, QTimer
 from qtpy.QtWidgets import (
     QCheckBox,
     QGridLayout,
@@ -10,11 +12,18 @@ from qtpy.QtWidgets import (
 )
 
 from napari_tiled_browser.models.tiled_selector import TiledSelector
+from napari_tiled_browser.models.tiled_worker import TiledSearchWorker
 
 _logger = logging.getLogger(__name__)
 
 
 class QTiledSearchWidget(QWidget):
+    # Bounds for the debounce interval, which follows server latency
+    MIN_DEBOUNCE_MS = 200
+    MAX_DEBOUNCE_MS = 1500
+    # Weight of the newest sample in the latency moving average
+    LATENCY_SMOOTHING = 0.3
+
     def __init__(
         self,
         model: TiledSelector,
@@ -38,6 +47,10 @@ class QTiledSearchWidget(QWidget):
         self.regex_checkbox = QCheckBox("Use RegEx pattern")
         self.full_text_hint = QLabel("Whole words only")
         self.full_text_hint.setVisible(False)
+        # Why the last search failed, if it did
+        self.error_label = QLabel()
+        self.error_label.setWordWrap(True)
+        self.error_label.setVisible(False)
 
         layout = QGridLayout()
         # widget, row, column
@@ -49,6 +62,7 @@ class QTiledSearchWidget(QWidget):
         layout.addWidget(self.full_text_checkbox, 1, 0, 1, 2)
         layout.addWidget(self.regex_checkbox, 1, 2, 1, 2)
         layout.addWidget(self.full_text_hint, 1, 2, 1, 2)
+        layout.addWidget(self.error_label, 2, 0, 1, 4)
 
         self.setLayout(layout)
 
@@ -57,15 +71,28 @@ class QTiledSearchWidget(QWidget):
         )
         self.regex_checkbox.clicked.connect(self.on_regex_checkbox_checked)
 
+        self.thread_pool = QThreadPool.globalInstance()
+        # Searches are tagged so that only the latest one is displayed
+        self._generation = 0
+        self._active_worker = None
+        # Moving average of search round trips, in seconds
+        self.latency = None
+
         self.debounce = QTimer()
         self.debounce.setInterval(1000)
         self.debounce.setSingleShot(True)
         self.debounce.timeout.connect(self.debounced_search)
 
-        self.key_entry.textChanged.connect(self.debounce.start)
-        self.value_entry.textChanged.connect(self.debounce.start)
+        self.key_entry.textChanged.connect(self.on_text_changed)
+        self.value_entry.textChanged.connect(self.on_text_changed)
 
     def _search(self):
+        key, value, search_type = self._read_query()
+        self.run_search(key, value, search_type)
+        return search_type
+
+    def _read_query(self):
+        """The key, value and search type entered."""
         key = self.key_entry.text()
         _logger.debug("Key: %s", key)
         value = self.value_entry.text()
@@ -88,8 +115,119 @@ class QTiledSearchWidget(QWidget):
         # every other combo should not search
         else:
             search_type = "no_search"
-        self.model.search(key, value, search_type)
-        return search_type
+        return key, value, search_type
+
+    def run_search(self, key, value, search_type):
+        """Search in the background, unless the result is already known."""
+        self._cancel_active_worker()
+        self.error_label.setVisible(False)
+
+        query = self.model.build_query(key, value, search_type)
+        if query is None:
+            self.model.set_search_results(None, (search_type, key, value))
+            return
+
+        cached = self.model.search_cache.get(
+            self.model.search_key(key, value, search_type)
+        )
+        if cached is not None:
+            _logger.debug("Search served from cache")
+            results, length = cached
+            self.model.set_search_results(
+                results, (search_type, key, value), length
+            )
+            return
+
+        self.show_local_results(key, value, search_type)
+        search_query = (search_type, key, value)
+        runnable = TiledSearchWorker(
+            node=self.model.get_current_node(),
+            node_path_parts=self.model.node_path_parts,
+            query=query,
+            generation=self._generation,
+        )
+        runnable.signals.results.connect(
+            partial(self._on_search_results, search_query)
+        )
+        runnable.signals.failed.connect(self._on_search_failed)
+        self._active_worker = runnable
+        self.thread_pool.start(runnable)
+
+    def show_local_results(self, key, value, search_type):
+        """Show what the metadata index finds until the server answers."""
+        search_query = (search_type, key, value)
+        if (
+            self.model.local_results is not None
+            and self.model.search_query == search_query
+        ):
+            return
+        local_results = self.model.local_search(key, value, search_type)
+        if local_results is None:
+            return
+        # Once shown, local results follow the text even if there are none
+        if local_results or self.model.local_results is not None:
+            self.model.set_local_search_results(local_results, search_query)
+
+    def _on_search_results(
+        self,
+        search_query,
+        generation,
+        node_path_parts,
+        results,
+        length,
+        elapsed,
+    ):
+        self._update_debounce_interval(elapsed)
+        if (
+            generation != self._generation
+            or node_path_parts != self.model.node_path_parts
+        ):
+            _logger.debug(
+                "Discarding stale search (generation %d)", generation
+            )
+            return
+        self._active_worker = None
+        self.model.set_search_results(results, search_query, length)
+
+    def _on_search_failed(self, generation, error_message):
+        if generation != self._generation:
+            return
+        self._active_worker = None
+        self.error_label.setText(f"Search failed: {error_message}")
+        self.error_label.setVisible(True)
+
+    def _cancel_active_worker(self):
+        runnable, self._active_worker = self._active_worker, None
+        if runnable is None:
+            return
+        runnable.cancel()
+        # Drop it from the queue if it has not started yet. Qt has already
+        # deleted a runnable that finished, which raises RuntimeError.
+        with contextlib.suppress(RuntimeError):
+            self.thread_pool.tryTake(runnable)
+
+    def _update_debounce_interval(self, elapsed):
+        """Wait longer between keystroke searches on slower servers."""
+        if self.latency is None:
+            self.latency = elapsed
+        else:
+            self.latency += self.LATENCY_SMOOTHING * (elapsed - self.latency)
+        interval = int(2000 * self.latency)
+        interval = max(
+            self.MIN_DEBOUNCE_MS, min(interval, self.MAX_DEBOUNCE_MS)
+        )
+        self.debounce.setInterval(interval)
+
+    def on_text_changed(self):
+        # Whatever is in flight no longer matches the text
+        self._generation += 1
+        self._cancel_active_worker()
+        if self.model.metadata_index is not None:
+            # The index answers at once; the server after a pause in typing
+            key, value, search_type = self._read_query()
+            if search_type != "no_search":
+                self.show_local_results(key, value, search_type)
+        self.debounce.start()
 
     def debounced_search(self):
         self._search()
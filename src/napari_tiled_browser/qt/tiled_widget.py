@@ -8,12 +8,14 @@ Replace code below according to your needs.
 """
 
 import collections
+import contextlib
 import logging
 import os
 from datetime import date, datetime
+from functools import partial
 
 from napari.resources._icons import ICONS
-from qtpy.QtCore import Qt, QThreadPool, Signal
+from qtpy.QtCore import QSignalBlocker, Qt, QThreadPool, Signal
 from qtpy.QtGui import QIcon, QPixmap
 from qtpy.QtWidgets import (
     QAbstractItemView,
@@ -21,11 +23,11 @@ from qtpy.QtWidgets import (
     QHBoxLayout,
     QLabel,
     QLineEdit,
+    QMenu,
     QPushButton,
     QSplitter,
     QStyle,
-    QTableWidget,
-    QTableWidgetItem,
+    QTableView,
     QTextEdit,
     QVBoxLayout,
     QWidget,
@@ -35,9 +37,39 @@ from tiled.client.container import Container
 from tiled.profiles import load_profiles
 from tiled.structures.core import StructureFamily
 
+from napari_tiled_browser.models.tiled_array import (
+    LazyTiledArray,
+    multiscale_levels,
+)
+from napari_tiled_browser.models.tiled_disk_cache import ChunkDiskCache
+from napari_tiled_browser.models.tiled_metadata_index import MetadataIndex
+from napari_tiled_browser.models.tiled_open_policy import (
+    EAGER,
+    PREVIEW,
+    OpenPolicy,
+)
+from napari_tiled_browser.models.tiled_prefetch import (
+    SlicePrefetcher,
+    slice_index,
+)
+from napari_tiled_browser.models.tiled_response_cache import ResponseDiskCache
 from napari_tiled_browser.models.tiled_selector import TiledSelector
 from napari_tiled_browser.models.tiled_subscriber import SubscriptionManager
-from napari_tiled_browser.models.tiled_worker import TiledWorker
+from napari_tiled_browser.models.tiled_subscription_policy import (
+    SubscriptionPolicy,
+)
+from napari_tiled_browser.models.tiled_worker import (
+    TiledArrayWorker,
+    TiledConnectWorker,
+    TiledContrastWorker,
+    TiledIndexWorker,
+    TiledInfoWorker,
+    TiledLengthWorker,
+    TiledMultiscaleWorker,
+    TiledWorker,
+)
+from napari_tiled_browser.qt.catalog_model import QTiledCatalogModel
+from napari_tiled_browser.qt.metadata_tree import QTiledMetadataTree
 from napari_tiled_browser.qt.tiled_search import QTiledSearchWidget
 
 _logger = logging.getLogger(__name__)
@@ -59,6 +91,22 @@ def json_decode(obj):
     return str(obj)
 
 
+def _env_flag(name: str) -> bool:
+    return os.environ.get(name, "").lower() in ("1", "true", "yes")
+
+
+def _env_number(name: str, default, kind=int):
+    """Read a number from the environment, or default if unset or invalid."""
+    value = os.environ.get(name)
+    if not value:
+        return default
+    try:
+        return kind(value)
+    except ValueError:
+        _logger.warning("Ignoring %s=%r; using %r", name, value, default)
+        return default
+
+
 class DummyClient:
     "Placeholder for a structure family we cannot (yet) handle"
 
@@ -84,16 +132,113 @@ class QTiledBrowser(QWidget):
         profile = os.environ.get("TILED_PROFILE", "")
         default_url = os.environ.get("TILED_DEFAULT_URL", "")
 
-        profiles = load_profiles()
-        _, profile_details = profiles.get(profile, (None, {}))
-        url = profile_details.get("uri", default_url)
+        url = default_url
+        if profile:
+            _, profile_details = load_profiles().get(profile, (None, {}))
+            url = profile_details.get("uri", default_url)
         _logger.debug("Will attempt to connect to Tiled at %s", url)
 
-        self.model = TiledSelector(url=url)
+        lazy_count = _env_flag("TILED_LAZY_COUNT")
+        # Follow the sampled contrast limits of a new layer with exact ones
+        self.exact_contrast = _env_flag("TILED_EXACT_CONTRAST")
+
+        multiscale = _env_flag("TILED_MULTISCALE")
+        # Page through listings with the server's cursors, not offsets
+        keyset_pagination = _env_flag("TILED_KEYSET_PAGINATION")
+
+        # Planes to read ahead of a moving dims slider; 0 turns it off
+        self.prefetch_depth = int(os.environ.get("TILED_PREFETCH_DEPTH", 4))
+        # Layer -> its SlicePrefetcher
+        self._prefetchers = {}
+        self.viewer.layers.events.removed.connect(self._on_layer_removed)
+
+        # On-disk cache of array chunks, capped at TILED_CHUNK_CACHE_SIZE MiB
+        chunk_cache_size = _env_number("TILED_CHUNK_CACHE_SIZE", 1024)
+        chunk_cache = None
+        if _env_flag("TILED_CHUNK_CACHE") and chunk_cache_size > 0:
+            chunk_cache = ChunkDiskCache(
+                os.environ.get("TILED_CHUNK_CACHE_DIR") or None,
+                max_bytes=chunk_cache_size * 2**20,
+            )
+
+        # On-disk cache of listings and metadata, revalidated with ETags,
+        # capped at TILED_METADATA_CACHE_SIZE entries
+        response_cache_size = _env_number("TILED_METADATA_CACHE_SIZE", 10_000)
+        response_cache = None
+        if _env_flag("TILED_METADATA_CACHE") and response_cache_size > 0:
+            response_cache = ResponseDiskCache(
+                os.environ.get("TILED_METADATA_CACHE_PATH") or None,
+                max_entries=response_cache_size,
+            )
+
+        # Local index of the metadata seen so far, answering searches at once
+        metadata_index = None
+        if _env_flag("TILED_METADATA_INDEX"):
+            metadata_index = MetadataIndex(
+                os.environ.get("TILED_METADATA_INDEX_PATH") or None
+            )
+
+        # Arrays up to TILED_EAGER_MAX_SIZE MiB are read whole; larger ones
+        # are read plane by plane, or previewed as a downsampled pyramid if
+        # a plane exceeds TILED_PLANE_MAX_SIZE MiB. Estimates assume
+        # TILED_ASSUMED_RATE MiB/s until array reads have been timed.
+        open_policy = OpenPolicy(
+            eager_max_bytes=_env_number("TILED_EAGER_MAX_SIZE", 64) * 2**20,
+            plane_max_bytes=_env_number("TILED_PLANE_MAX_SIZE", 64) * 2**20,
+            assumed_rate=_env_number("TILED_ASSUMED_RATE", 10.0, float)
+            * 2**20,
+        )
+
+        self.model = TiledSelector(
+            url=url,
+            lazy_count=lazy_count,
+            multiscale=multiscale,
+            chunk_cache=chunk_cache,
+            response_cache=response_cache,
+            keyset_pagination=keyset_pagination,
+            metadata_index=metadata_index,
+            open_policy=open_policy,
+        )
 
         self.thread_pool = QThreadPool.globalInstance()
 
-        self.sub_manager = SubscriptionManager()
+        # Which nodes below a live node are followed, e.g.
+        # TILED_LIVE_PATHS="*/primary/*" and TILED_LIVE_MAX_CHILDREN=1 for
+        # the primary stream of the newest run only
+        max_depth = _env_number("TILED_LIVE_MAX_DEPTH", 3)
+        paths = os.environ.get("TILED_LIVE_PATHS")
+        specs = os.environ.get("TILED_LIVE_SPECS")
+        policy = SubscriptionPolicy(
+            # Negative for no limit
+            max_depth=max_depth if max_depth >= 0 else None,
+            specs=specs.split(",") if specs else None,
+            paths=paths.split(",") if paths else None,
+            max_children=_env_number("TILED_LIVE_MAX_CHILDREN", None),
+            max_subscriptions=_env_number("TILED_LIVE_MAX_SUBSCRIPTIONS", 256),
+        )
+        # Most live array updates shown per second; more are coalesced
+        self.sub_manager = SubscriptionManager(
+            max_rate=_env_number("TILED_LIVE_MAX_RATE", 30.0, float),
+            policy=policy,
+        )
+        # Path -> state of each subscription, and the number in each state
+        self._subscription_states = {}
+        self._subscription_state_counts = collections.Counter()
+
+        # Listing keys with a TiledLengthWorker in flight
+        self._pending_len_keys = set()
+        # Page requests are tagged so that only the latest one is rendered
+        self._generation = 0
+        self._active_workers = []
+        # Node whose summary the info pane should show
+        self._selected_node_path = None
+        # Only the latest connection attempt may install its client
+        self._connect_generation = 0
+        self._connect_worker = None
+        # The crawl adding a subtree to the metadata index, if any
+        self._index_worker = None
+        # The work opening the node last loaded, if still in flight
+        self._open_worker = None
 
         self.create_layout()
         self.connect_model_signals()
@@ -101,11 +246,17 @@ class QTiledBrowser(QWidget):
         self.connect_self_signals()
         self.initialize_values()
 
+        if url:
+            # Warm up the connection and first page before they are needed
+            self.start_connect()
+
     def create_layout(self):
         # Connection elements
         self.url_entry = QLineEdit()
         self.connect_button = QPushButton("Connect")
         self.connection_label = QLabel("No url connected")
+        self.index_label = QLabel()
+        self.index_label.setVisible(False)
         self.connection_widget = QWidget()
 
         # Connection layout
@@ -113,6 +264,7 @@ class QTiledBrowser(QWidget):
         connection_layout.addWidget(self.url_entry)
         connection_layout.addWidget(self.connect_button)
         connection_layout.addWidget(self.connection_label)
+        connection_layout.addWidget(self.index_label)
         connection_layout.addStretch()
         self.connection_widget.setLayout(connection_layout)
 
@@ -150,29 +302,51 @@ class QTiledBrowser(QWidget):
         self._rebuild_current_path_layout()
 
         # Catalog table elements
-        self.catalog_table = QTableWidget(0, 1)
+        self.catalog_model = QTiledCatalogModel(
+            icons={
+                StructureFamily.container: self.style().standardIcon(
+                    QStyle.SP_DirHomeIcon
+                ),
+                StructureFamily.array: QIcon(QPixmap(ICONS["new_image"])),
+            },
+            default_icon=self.style().standardIcon(
+                QStyle.SP_TitleBarContextHelpButton
+            ),
+            parent=self,
+        )
+        self.catalog_table = QTableView()
+        self.catalog_table.setModel(self.catalog_model)
         self.catalog_table.horizontalHeader().setStretchLastSection(True)
         self.catalog_table.setEditTriggers(
-            QTableWidget.EditTrigger.NoEditTriggers
+            QAbstractItemView.EditTrigger.NoEditTriggers
         )  # disable editing
-        self.catalog_table.horizontalHeader().hide()  # remove header
+        # The header is shown for summary columns, which sort on a click
+        self.catalog_table.horizontalHeader().hide()
+        self.catalog_table.horizontalHeader().setSectionsClickable(True)
         self.catalog_table.setSelectionMode(
             QAbstractItemView.SelectionMode.SingleSelection
         )  # disable multi-select
+        self.catalog_table.setSelectionBehavior(
+            QAbstractItemView.SelectionBehavior.SelectRows
+        )
+        self.catalog_table.setContextMenuPolicy(
+            Qt.ContextMenuPolicy.CustomContextMenu
+        )
         self.catalog_live_button = QPushButton("LIVE")
         self.catalog_live_button.setCheckable(True)
         self.catalog_table_widget = QWidget()
-        self.catalog_breadcrumbs = None
 
         # Info layout
         self.info_box = QTextEdit()
         self.info_box.setReadOnly(True)
+        self.metadata_tree = QTiledMetadataTree()
         self.load_button = QPushButton("Open")
         self.load_button.setEnabled(False)
         catalog_info_layout = QHBoxLayout()
         catalog_info_layout.addWidget(self.catalog_table)
         load_layout = QVBoxLayout()
         load_layout.addWidget(self.info_box)
+        load_layout.addWidget(self.metadata_tree)
         load_layout.addWidget(self.load_button)
         catalog_info_layout.addLayout(load_layout)
 
@@ -246,87 +420,215 @@ class QTiledBrowser(QWidget):
         _logger.debug("QTiledWidget.reset_rows_per_page()...")
 
         self.rows_per_page_selector.addItems(
-            [str(option) for option in self.model._rows_per_page_options]
+            [
+                "All" if option is None else str(option)
+                for option in self.model._rows_per_page_options
+            ]
         )
         self.rows_per_page_selector.setCurrentIndex(
             self.model._rows_per_page_index
         )
 
     def fetch_table_data(self):
-        runnable = TiledWorker(
-            rows_per_page=self.model.rows_per_page,
-            current_page=self.model._current_page,
+        self._generation += 1
+        self._cancel_active_workers()
+
+        offset = self.model._current_page * self.model.rows_per_page
+        total = self._page_total(offset)
+        self._show_columns()
+        # Resetting the model requests the first block of the page
+        self.catalog_model.reset_page(
+            offset, total, has_parent_row=bool(self.model.node_path_parts)
+        )
+        self._clear_metadata()
+
+    def _page_total(self, offset):
+        """Entries on the page starting at offset, as far as is known."""
+        rows_per_page = self.model.rows_per_page
+        node_len = self.model.node_len_hint
+        if node_len is None:
+            return rows_per_page
+        return max(min(rows_per_page, node_len - offset), 0)
+
+    def _show_columns(self):
+        """Show the summary columns of the listing, and how it is sorted."""
+        columns = self.model.table_columns
+        self.catalog_model.set_columns(columns)
+        header = self.catalog_table.horizontalHeader()
+        header.setVisible(bool(columns))
+        header.setSortIndicatorShown(bool(columns))
+        section, order = -1, Qt.SortOrder.AscendingOrder
+        if self.model.sorting is not None:
+            column, direction = self.model.sorting
+            section = 1 + self.catalog_model.columns.index(column)
+            if direction < 0:
+                order = Qt.SortOrder.DescendingOrder
+        with QSignalBlocker(header):
+            header.setSortIndicator(section, order)
+
+    def _on_sort_indicator_changed(self, section, order):
+        # Sorted on the server; the key column restores the usual order
+        column = None
+        if section > 0:
+            column = self.catalog_model.columns[section - 1]
+        direction = -1 if order == Qt.SortOrder.DescendingOrder else 1
+        self.model.sort_by(column, direction)
+        if column is None:
+            self._show_columns()
+
+    def fetch_block(self, offset, limit):
+        """Load a block of the current listing, from cache when possible."""
+        if self.model.local_results is not None:
+            # Found in the metadata index; the server's results follow
+            self.populate_table(
+                offset, self.model.local_results[offset : offset + limit]
+            )
+            return
+        cached = self.model.page_cache.get(self.model.block_key(offset, limit))
+        if cached is not None:
+            _logger.debug("Entries %d+%d served from cache", offset, limit)
+            self.populate_table(offset, cached)
+            return
+        runnable = self._create_worker(
+            offset, limit, generation=self._generation
+        )
+        runnable.signals.results.connect(
+            partial(self._on_table_data_received, self._generation, offset)
+        )
+        runnable.signals.failed.connect(
+            partial(self._on_table_data_failed, self._generation, offset)
+        )
+        runnable.signals.finished.connect(
+            partial(self._on_worker_finished, runnable)
+        )
+        self._active_workers.append(runnable)
+        self.thread_pool.start(runnable)
+
+    def _cancel_active_workers(self):
+        """Cancel the page requests in flight, if any."""
+        runnables, self._active_workers = self._active_workers, []
+        for runnable in runnables:
+            runnable.cancel()
+            # Drop it from the queue if it has not started yet. Qt has
+            # already deleted a runnable that finished, which raises
+            # RuntimeError.
+            with contextlib.suppress(RuntimeError):
+                self.thread_pool.tryTake(runnable)
+
+    def _on_worker_finished(self, runnable):
+        with contextlib.suppress(ValueError):
+            self._active_workers.remove(runnable)
+
+    def _on_table_data_received(self, generation, offset, results):
+        if generation != self._generation:
+            _logger.debug("Discarding stale page (generation %d)", generation)
+            return
+        self.populate_table(offset, results)
+
+    def _on_table_data_failed(self, generation, offset, error_message):
+        if generation != self._generation:
+            return
+        # Requested again when its rows are next shown
+        self.catalog_model.fail_block(offset)
+
+    def prefetch_neighbor_pages(self, results):
+        """Speculatively fetch the start of the pages either side."""
+        if self.model.local_results is not None or self.model.all_on_one_page:
+            return
+        current_page = self.model._current_page
+        rows_per_page = self.model.rows_per_page
+        neighbors = []
+        if current_page > 0:
+            neighbors.append(current_page - 1)
+        node_len = self.model.node_len_hint
+        if node_len is not None:
+            has_next_page = (current_page + 1) * rows_per_page < node_len
+        else:
+            # A full block suggests there may be more entries after it
+            has_next_page = len(results) == min(
+                rows_per_page, QTiledCatalogModel.BLOCK_SIZE
+            )
+        if has_next_page:
+            neighbors.append(current_page + 1)
+
+        for page in neighbors:
+            offset = page * rows_per_page
+            # The first block of the page, as the catalog model requests it
+            limit = min(
+                self._page_total(offset), QTiledCatalogModel.BLOCK_SIZE
+            )
+            if limit <= 0:
+                continue
+            if self.model.block_key(offset, limit) in self.model.page_cache:
+                continue
+            _logger.debug("Prefetching page %d", page)
+            self.thread_pool.start(self._create_worker(offset, limit))
+
+    def _create_worker(self, offset, limit, generation=0):
+        return TiledWorker(
+            generation=generation,
+            offset=offset,
+            limit=limit,
             client=self.model.client,
             search_results=self.model.search_results,
             node_path_parts=self.model.node_path_parts,
             display_search_results=self.model.display_search_results,
+            node=self.model.node_cache.get(self.model.node_path_parts),
+            cache=self.model.page_cache,
+            cache_key=self.model.block_key(offset, limit),
+            len_cache=self.model.len_cache,
+            len_key=self.model.listing_key(),
+            listing_fields=self.model.listing_fields,
+            response_cache=self.model.response_cache,
+            cursors=(
+                self.model.page_cursors
+                if self.model.keyset_pagination
+                else None
+            ),
+            columns=self.model.table_columns,
+            sorting=self.model.listing_sorting,
+            metadata_index=self.model.metadata_index,
         )
-        runnable.signals.results.connect(self.populate_table)
-        self.thread_pool.start(runnable)
 
-    def populate_table(self, results):
-        _logger.debug("QTiledBrowser.populate_table()...")
-        original_state = {}
-        self.search_widget.setVisible(True)
-        self.catalog_table_widget.setVisible(True)
-
-        original_state["blockSignals"] = self.catalog_table.blockSignals(True)
+    def fetch_node_len(self):
+        """Count the current listing in the background."""
+        key = self.model.listing_key()
+        if key in self._pending_len_keys:
+            return
+        self._pending_len_keys.add(key)
+        runnable = TiledLengthWorker(
+            node=self.model.get_current_listing(),
+            cache=self.model.len_cache,
+            cache_key=key,
+        )
+        runnable.signals.results.connect(self._on_node_len_received)
+        runnable.signals.failed.connect(self._on_node_len_failed)
+        self.thread_pool.start(runnable)
 
-        # Remove all rows first
-        while self.catalog_table.rowCount() > 0:
-            self.catalog_table.removeRow(0)
+    def _on_node_len_received(self, key, length):
+        self._pending_len_keys.discard(key)
+        if key == self.model.listing_key():
+            if self.model.all_on_one_page:
+                # The page was open-ended until now
+                self.catalog_model.limit_total(length)
+            self._set_current_location_label()
 
-        if self.model.node_path_parts:
-            # add breadcrumbs
-            self.catalog_breadcrumbs = QTableWidgetItem("..")
-            self.catalog_table.insertRow(0)
-            self.catalog_table.setItem(0, 0, self.catalog_breadcrumbs)
+    def _on_node_len_failed(self, key, error_message):
+        # Counted again the next time the length is needed
+        self._pending_len_keys.discard(key)
 
-        # Then add new rows
-        rows_per_page = self.model.rows_per_page
-        for _ in range(rows_per_page):
-            last_row_position = self.catalog_table.rowCount()
-            self.catalog_table.insertRow(last_row_position)
-        node_offset = rows_per_page * self.model._current_page
+    def populate_table(self, offset, results):
+        _logger.debug("QTiledBrowser.populate_table(%d)...", offset)
+        self.search_widget.setVisible(True)
+        self.catalog_table_widget.setVisible(True)
 
         items = results
-        # Loop over rows, filling in keys until we run out of keys.
-        start = 1 if self.model.node_path_parts else 0
-        for row_index, (key, value) in zip(
-            range(start, self.catalog_table.rowCount()), items, strict=False
-        ):
-            family = value.item["attributes"]["structure_family"]
-            # TODO: make this dictionary with StructureFamily type as key
-            # and action for StructureFamily as value
-            if family == StructureFamily.container:
-                icon = self.style().standardIcon(QStyle.SP_DirHomeIcon)
-            elif family == StructureFamily.array:
-                icon = QIcon(QPixmap(ICONS["new_image"]))
-            else:
-                icon = self.style().standardIcon(
-                    QStyle.SP_TitleBarContextHelpButton
-                )
-            self.catalog_table.setItem(
-                row_index, 0, QTableWidgetItem(icon, key)
-            )
-
-        # remove extra rows
-        for _ in range(self.model.rows_per_page - len(items)):
-            self.catalog_table.removeRow(self.catalog_table.rowCount() - 1)
-
-        headers = [
-            str(x + 1)
-            for x in range(
-                node_offset, node_offset + self.catalog_table.rowCount()
-            )
-        ]
-        if self.model.node_path_parts:
-            headers = [""] + headers
+        self.model.remember_nodes(self.model.node_path_parts, items)
+        self.catalog_model.set_block(offset, items)
 
-        self.catalog_table.setVerticalHeaderLabels(headers)
-        self._clear_metadata()
-        self.catalog_table.blockSignals(original_state["blockSignals"])
-        self._set_current_location_label()
+        if offset == self.catalog_model.offset:
+            self._set_current_location_label()
+            self.prefetch_neighbor_pages(items)
 
     def connect_model_signals(self):
         """Connect dialog slots to model signals."""
@@ -339,8 +641,8 @@ class QTiledBrowser(QWidget):
 
         @self.model.client_connection_error.connect
         def on_client_connection_error(error_msg: str):
-            # TODO: Display the error message; suggest a remedy
-            ...
+            # TODO: Suggest a remedy
+            self.connection_label.setText(f"Could not connect: {error_msg}")
 
         @self.model.table_changed.connect
         def on_table_changed(node_path_parts: tuple[str]):
@@ -356,17 +658,122 @@ class QTiledBrowser(QWidget):
         self.model.url_changed.connect(self.reset_url_entry)
 
         @self.model.plottable_image_data_received.connect
-        def on_plottable_image_data_received(node, child_node_path):
-            layer = self.viewer.add_image(node, name=child_node_path)
-            layer.reset_contrast_limits()
+        def on_plottable_image_data_received(node, child_node_path, plan):
+            if plan.mode == EAGER:
+                # Small enough to read at once, off the GUI thread
+                self.load_array(node, child_node_path)
+                return
+            # Read only the chunks napari slices, not the whole array
+            data = LazyTiledArray(node, disk_cache=self.model.chunk_cache)
+            if plan.mode == PREVIEW or self.model.multiscale:
+                # Only the coarsest level is read until the user zooms in
+                layer = self.viewer.add_image(
+                    multiscale_levels(
+                        data, min_size=self.model.open_policy.preview_size
+                    ),
+                    name=child_node_path,
+                    multiscale=True,
+                )
+            else:
+                layer = self.viewer.add_image(data, name=child_node_path)
+            # napari would reduce over the whole array; sample it instead
+            self.estimate_contrast_limits(layer, data)
+            self.attach_prefetcher(layer)
+
+        @self.model.plottable_multiscale_data_received.connect
+        def on_plottable_multiscale_data_received(node, child_node_path):
+            # Listing the levels is a request of its own
+            runnable = TiledMultiscaleWorker(node=node)
+            runnable.signals.results.connect(
+                partial(
+                    self._on_multiscale_levels_received,
+                    runnable,
+                    child_node_path,
+                )
+            )
+            runnable.signals.failed.connect(
+                partial(self._on_open_failed, runnable, child_node_path)
+            )
+            self._start_open_worker(runnable)
+
+        @self.sub_manager.child_created.connect
+        def on_child_created(node_path_parts: tuple[str], entry):
+            shown = (
+                node_path_parts == self.model.node_path_parts
+                and not self.model.display_search_results
+            )
+            if entry is None:
+                position = self.model.on_child_created(node_path_parts)
+            else:
+                position = self.model.on_child_created(node_path_parts, *entry)
+            if node_path_parts != self.model.node_path_parts:
+                return
+            if shown and position is not None and self.model.sorting is None:
+                # Insert the row in place, if it belongs on this page
+                page_end = self.catalog_model.offset + self.model.rows_per_page
+                if self.model.all_on_one_page or position < page_end:
+                    self.catalog_model.append_entry(position, entry)
+            elif shown and self.model.node_len_hint is None:
+                # The listing shown was forgotten
+                self.fetch_table_data()
+            self._set_current_location_label()
+
+        @self.sub_manager.child_metadata_updated.connect
+        def on_child_metadata_updated(node_path_parts: tuple[str], update):
+            self.model.on_child_metadata_updated(
+                node_path_parts, update.key, update.metadata, update.specs
+            )
+            node_path_parts = node_path_parts + (update.key,)
+            if (
+                node_path_parts == self._selected_node_path
+                and node_path_parts in self.model.node_cache
+            ):
+                # Summarized from the updated node, without a request
+                self._show_node_info(update.key)
+
+        @self.sub_manager.subscription_health_changed.connect
+        def on_subscription_health_changed(path, health):
+            if health.error and health.state != "live":
+                _logger.info(
+                    "Subscription to %s %s: %s",
+                    path,
+                    health.state,
+                    health.error,
+                )
+            previous = self._subscription_states.pop(path, None)
+            if previous is not None:
+                self._subscription_state_counts[previous] -= 1
+            # Stopped subscriptions, e.g. evicted ones, are not counted
+            if health.state != "stopped":
+                self._subscription_states[path] = health.state
+                self._subscription_state_counts[health.state] += 1
+            self.catalog_live_button.setToolTip(
+                ", ".join(
+                    f"{n} {state}"
+                    for state, n in sorted(
+                        self._subscription_state_counts.items()
+                    )
+                    if n
+                )
+            )
 
-        @self.sub_manager.plottable_array_data_received.connect
-        def on_plottable_array_data_received(node, child_node_path):
+        @self.sub_manager.live_array_updated.connect
+        def on_live_array_updated(
+            live_array, child_node_path, region, resized
+        ):
             try:
-                self.viewer.layers[child_node_path].data = node
+                layer = self.viewer.layers[child_node_path]
             except KeyError:
-                layer = self.viewer.add_image(node, name=child_node_path)
-                layer.reset_contrast_limits()
+                # The data is in memory, and napari sets contrast limits
+                # from it when creating the layer
+                self.viewer.add_image(live_array.data, name=child_node_path)
+                return
+            if resized or layer.data is not live_array.data:
+                # A view of the same buffer; only the new shape is news
+                layer.data = live_array.data
+            elif self._region_in_view(layer, region):
+                # Written in place; redraw if the patch is on screen
+                layer.refresh(extent=False)
 
     def connect_model_slots(self):
         """Connect model slots to dialog signals."""
@@ -376,7 +783,7 @@ class QTiledBrowser(QWidget):
         self.url_entry.editingFinished.connect(
             self.model.on_url_editing_finished
         )
-        self.connect_button.clicked.connect(self.model.on_connect_clicked)
+        self.connect_button.clicked.connect(self.start_connect)
         self.first_page.clicked.connect(self.model.on_first_page_clicked)
         self.next_page.clicked.connect(self.model.on_next_page_clicked)
         self.previous_page.clicked.connect(self.model.on_prev_page_clicked)
@@ -391,59 +798,317 @@ class QTiledBrowser(QWidget):
             self._on_catalog_live_button_clicked
         )
 
-        self.catalog_table.itemDoubleClicked.connect(
-            self._on_item_double_click
+        self.catalog_model.block_requested.connect(self.fetch_block)
+        self.catalog_table.horizontalHeader().sortIndicatorChanged.connect(
+            self._on_sort_indicator_changed
+        )
+        self.catalog_table.doubleClicked.connect(self._on_item_double_click)
+        self.catalog_table.customContextMenuRequested.connect(
+            self._on_catalog_context_menu
+        )
+        self.catalog_table.selectionModel().selectionChanged.connect(
+            self._on_item_selected
         )
-        self.catalog_table.itemSelectionChanged.connect(self._on_item_selected)
 
     def initialize_values(self):
         self.reset_url_entry()
         self.reset_rows_per_page()
 
+    def _start_open_worker(self, runnable):
+        """Run the work opening a node, instead of any still in flight."""
+        self._cancel_open_worker()
+        self._open_worker = runnable
+        self.thread_pool.start(runnable)
+
+    def _cancel_open_worker(self):
+        runnable, self._open_worker = self._open_worker, None
+        if runnable is None:
+            return
+        runnable.cancel()
+        # Qt has already deleted a runnable that finished
+        with contextlib.suppress(RuntimeError):
+            self.thread_pool.tryTake(runnable)
+
+    def closeEvent(self, event):
+        self._cancel_open_worker()
+        super().closeEvent(event)
+
+    def _on_multiscale_levels_received(self, runnable, name, nodes):
+        if runnable is not self._open_worker:
+            # Another node was opened since
+            return
+        self._open_worker = None
+        levels = [
+            LazyTiledArray(node, disk_cache=self.model.chunk_cache)
+            for node in nodes
+        ]
+        layer = self.viewer.add_image(levels, name=name, multiscale=True)
+        self.estimate_contrast_limits(layer, levels[-1])
+        self.attach_prefetcher(layer)
+
+    def _on_open_failed(self, runnable, name, error_message):
+        if runnable is not self._open_worker:
+            return
+        self._open_worker = None
+        self.info_box.setText(f"Could not open {name}: {error_message}")
+
+    def load_array(self, node, name):
+        """Read a whole array in the background, then add it as a layer."""
+        runnable = TiledArrayWorker(node=node)
+        runnable.signals.results.connect(
+            partial(self._on_array_received, runnable, name)
+        )
+        runnable.signals.failed.connect(
+            partial(self._on_open_failed, runnable, name)
+        )
+        self._start_open_worker(runnable)
+
+    def _on_array_received(self, runnable, name, array):
+        if runnable is not self._open_worker:
+            # Another node was selected or opened since
+            return
+        self._open_worker = None
+        self.viewer.add_image(array, name=name)
+
+    def estimate_contrast_limits(self, layer, data):
+        """Set the contrast limits of a layer from Tiled data, off-thread."""
+        runnable = TiledContrastWorker(data=data, exact=self.exact_contrast)
+        runnable.signals.results.connect(
+            partial(self._on_contrast_limits_received, layer)
+        )
+        runnable.signals.failed.connect(
+            partial(self._on_contrast_limits_failed, layer)
+        )
+        self.thread_pool.start(runnable)
+
+    def _on_contrast_limits_received(self, layer, limits, exact):
+        if layer not in self.viewer.layers:
+            return
+        _logger.debug(
+            "%s contrast limits of %s: %s",
+            "Exact" if exact else "Estimated",
+            layer.name,
+            limits,
+        )
+        layer.contrast_limits_range = limits
+        layer.contrast_limits = limits
+
+    def _on_contrast_limits_failed(self, layer, error_message):
+        if layer not in self.viewer.layers:
+            return
+        # The layer keeps its default limits
+        self.viewer.status = (
+            f"Could not set contrast limits of {layer.name}: {error_message}"
+        )
+
+    def attach_prefetcher(self, layer):
+        """Read ahead of the dims sliders while they move through layer."""
+        if self.prefetch_depth > 0:
+            self._prefetchers[layer] = SlicePrefetcher(
+                layer, self.viewer.dims, depth=self.prefetch_depth
+            )
+
+    def _on_layer_removed(self, event):
+        prefetcher = self._prefetchers.pop(event.value, None)
+        if prefetcher is not None:
+            prefetcher.close()
+
+    def _region_in_view(self, layer, region) -> bool:
+        index = slice_index(layer, self.viewer.dims, layer.data.shape)
+        return all(
+            i is None or part.start <= i < part.stop
+            for i, part in zip(index, region, strict=True)
+        )
+
+    def start_connect(self):
+        """Connect to the model's URL in the background."""
+        self._connect_generation += 1
+        if self._connect_worker is not None:
+            self._connect_worker.cancel()
+            with contextlib.suppress(RuntimeError):
+                self.thread_pool.tryTake(self._connect_worker)
+
+        self.connection_label.setText(f"Connecting to {self.model.url}...")
+        runnable = TiledConnectWorker(
+            url=self.model.url,
+            client_from_url=self.model.client_from_url,
+            connect_timeout=self.model.connect_timeout,
+            retries=self.model.connect_retries,
+            backoff=self.model.connect_backoff,
+            generation=self._connect_generation,
+        )
+        runnable.signals.connected.connect(self._on_client_connected)
+        runnable.signals.failed.connect(self._on_connect_failed)
+        self._connect_worker = runnable
+        self.thread_pool.start(runnable)
+
+    def _on_client_connected(self, generation, client):
+        if generation != self._connect_generation:
+            return
+        self._connect_worker = None
+        # Live data of another server must not be resumed
+        self.sub_manager.clear()
+        self.sub_manager.forget()
+        self.catalog_live_button.setChecked(False)
+        self.model.set_client(client)
+        # Starts loading the first page of the root node
+        self.model.reset_client_view()
+
+    def _on_connect_failed(self, generation, error_message):
+        if generation != self._connect_generation:
+            return
+        self._connect_worker = None
+        self.model.report_connection_error(error_message)
+
     def _on_catalog_live_button_clicked(self):
         # TODO: add check for CatalogOfBlueskyRuns and enable/disable live button as needed
         # subscribe to table data if live button checked
         if self.catalog_live_button.isChecked():
             # self.subscribe_to_table_data()
-            child = self.model.client[self.model.node_path_parts]
+            child = self.model.get_current_node()
             self.sub_manager.create_subscription.emit(child)
         else:
             # cleanup subscriptions
             self.sub_manager.clear()
 
-    def _on_load(self):
-        selected = self.catalog_table.selectedItems()
+    def _selected_row(self):
+        """Return the index of the selected table row, or None."""
+        selected = self.catalog_table.selectionModel().selectedRows()
         if not selected:
+            return None
+        return selected[0].row()
+
+    def _on_load(self):
+        row = self._selected_row()
+        if row is None:
             return
-        item = selected[0]
-        if item is self.catalog_breadcrumbs:
+        self._open_row(row)
+
+    def _open_row(self, row):
+        if self.catalog_model.is_parent_row(row):
             self.model.exit_node()
             return
-        self.model.open_node(item.text())
+        child_node_path = self.catalog_model.key(row)
+        if child_node_path is None:
+            # Still loading
+            return
+        self.model.open_node(child_node_path)
+
+    def _on_catalog_context_menu(self, position):
+        if self.model.metadata_index is None:
+            return
+        # The container clicked, or else the one listed
+        node_path_parts = self.model.node_path_parts
+        row = self.catalog_table.indexAt(position).row()
+        if row >= 0 and not self.catalog_model.is_parent_row(row):
+            entry = self.catalog_model.entry(row)
+            if entry is None or (
+                entry[1].item["attributes"]["structure_family"]
+                != StructureFamily.container
+            ):
+                return
+            node_path_parts += (entry[0],)
+        menu = QMenu(self)
+        action = menu.addAction("Index for offline search")
+        position = self.catalog_table.viewport().mapToGlobal(position)
+        if menu.exec(position) is action:
+            self.index_subtree(node_path_parts)
+
+    def index_subtree(self, node_path_parts):
+        """Add the metadata below a container to the index, off-thread."""
+        if self._index_worker is not None:
+            self._index_worker.cancel()
+        runnable = TiledIndexWorker(
+            get_node=self.model.get_parent_node,
+            node_path_parts=node_path_parts,
+            index=self.model.metadata_index,
+            server=self.model.client.uri,
+        )
+        runnable.signals.progress.connect(self._on_index_progress)
+        runnable.signals.finished.connect(
+            partial(self._on_index_finished, runnable)
+        )
+        self._index_worker = runnable
+        self.index_label.setText(f"Indexing /{'/'.join(node_path_parts)}...")
+        self.index_label.setVisible(True)
+        self.thread_pool.start(runnable)
+
+    def _on_index_progress(self, node_path_parts, indexed):
+        self.index_label.setText(
+            f"Indexing /{'/'.join(node_path_parts)}: {indexed} entries"
+        )
+
+    def _on_index_finished(self, runnable, node_path_parts, indexed):
+        if runnable is not self._index_worker:
+            return
+        self._index_worker = None
+        self.index_label.setText(
+            f"Indexed /{'/'.join(node_path_parts)}: {indexed} entries"
+        )
 
     def _on_breadcrumb_clicked(self, node_index):
         self.model.jump_to_node(node_index)
 
-    def _on_item_double_click(self, item):
-        if item is self.catalog_breadcrumbs:
-            self.model.exit_node()
-            return
-        self.model.open_node(item.text())
+    def _on_item_double_click(self, index):
+        self._open_row(index.row())
 
     def _on_item_selected(self):
-        selected = self.catalog_table.selectedItems()
-        if not selected or (item := selected[0]) is self.catalog_breadcrumbs:
+        # Whatever was being opened is no longer wanted
+        self._cancel_open_worker()
+        row = self._selected_row()
+        if row is None or self.catalog_model.is_parent_row(row):
             self._clear_metadata()
             return
 
-        child_node_path = item.text()
+        child_node_path = self.catalog_model.key(row)
+        if child_node_path is None:
+            self._clear_metadata()
+            return
+
+        node_path_parts = self.model.node_path_parts + (child_node_path,)
+        self._selected_node_path = node_path_parts
+        key = self.model.node_info_key(node_path_parts)
+        if key in self.model.info_cache:
+            self._show_node_info(child_node_path)
+            return
+
+        self.info_box.setText("Loading...")
+        self.metadata_tree.clear()
+        self.load_button.setEnabled(False)
+        runnable = TiledInfoWorker(
+            get_node_info=self.model.get_node_info,
+            node_path_parts=node_path_parts,
+            revalidate=self.model.response_cache is not None,
+        )
+        runnable.signals.results.connect(self._on_node_info_received)
+        runnable.signals.failed.connect(self._on_node_info_failed)
+        self.thread_pool.start(runnable)
+
+    def _on_node_info_received(self, node_path_parts, info):
+        if node_path_parts != self._selected_node_path:
+            # The selection moved on while this was loading
+            return
+        self._show_node_info(node_path_parts[-1])
+
+    def _on_node_info_failed(self, node_path_parts, error_message):
+        if node_path_parts != self._selected_node_path:
+            return
+        self.info_box.setText(
+            f"Could not load {node_path_parts[-1]}: {error_message}"
+        )
+
+    def _show_node_info(self, child_node_path):
+        # The summary is cached by now, so this does not block
         self.model.on_item_selected(child_node_path)
 
         self.info_box.setText(self.model.info_text)
+        self.metadata_tree.set_metadata(self.model.selected_metadata)
         self.load_button.setEnabled(self.model.load_button_enabled)
 
     def _clear_metadata(self):
+        self._selected_node_path = None
         self.info_box.setText("")
+        self.metadata_tree.clear()
         # self.load_button.setEnabled(False)
 
     def _set_current_location_label(self):
@@ -451,13 +1116,29 @@ class QTiledBrowser(QWidget):
         starting_index = (
             self.model._current_page * self.model.rows_per_page + 1
         )
-        ending_index = min(
-            self.model.rows_per_page * (self.model._current_page + 1),
-            self.model.node_len,
-        )
-        current_location_text = (
-            f"{starting_index}-{ending_index} of {self.model.node_len}"
+        ending_index = self.model.rows_per_page * (
+            self.model._current_page + 1
         )
+        # Never counted on the GUI thread
+        node_len = self.model.node_len_hint
+
+        if node_len is None:
+            # Filled in when the count arrives
+            self.fetch_node_len()
+            if not self.model.lazy_count:
+                current_location_text = "Counting..."
+            else:
+                # The range before the count, which may cut it short
+                if self.model.all_on_one_page:
+                    ending_index = "..."
+                current_location_text = (
+                    f"{starting_index}-{ending_index} of ..."
+                )
+        else:
+            ending_index = min(ending_index, node_len)
+            current_location_text = (
+                f"{starting_index}-{ending_index} of {node_len}"
+            )
         self.current_location_label.setText(current_location_text)
 
 